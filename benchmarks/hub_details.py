@@ -0,0 +1,62 @@
+"""Benchmark of hub subscription-details parsing
+
+Compare the lxml XPath parser against the BeautifulSoup parser it replaced.
+
+    python -m benchmarks.hub_details [--number 2000]
+"""
+import argparse
+import re
+import timeit
+from os.path import dirname, join
+
+import bs4
+from dateutil.parser import parse
+
+from tubee.helper.hub import parse_details
+
+DATA_DIR = join(dirname(__file__), "..", "tubee", "tests", "data")
+FIELDS = [
+    "last_challenge",
+    "expiration",
+    "last_subscribe",
+    "last_unsubscribe",
+    "last_challenge_error",
+    "last_notification_error",
+    "last_notification",
+]
+
+
+def _parse_detail(query, fuzzy=False):
+    try:
+        parsed_datetime = parse(query, fuzzy=fuzzy)
+    except ValueError:
+        parsed_datetime = None
+    if not fuzzy or not parsed_datetime:
+        return parsed_datetime
+    summary = re.search(r"\((.*)\)", query).groups()[0]
+    return (parsed_datetime, summary)
+
+
+def parse_with_bs4(text):
+    parsed = bs4.BeautifulSoup(text, "lxml").find_all("dd")
+    results = {"state": parsed[1].string, "stat": parsed[8].string.strip("\n ")}
+    for key, index in zip(FIELDS, list(range(2, 10)) + [10]):
+        fuzzy = bool(index == 6 or index == 7)
+        results[key] = _parse_detail(parsed[index].string, fuzzy=fuzzy)
+    return results
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--number", type=int, default=2000)
+    args = arg_parser.parse_args()
+
+    with open(join(DATA_DIR, "Pubsubhubbub Details.html")) as file:
+        text = file.read()
+    for name, func in [("bs4", parse_with_bs4), ("lxml", parse_details)]:
+        seconds = min(timeit.repeat(lambda: func(text), number=args.number, repeat=5))
+        print(f"{name:<5}{seconds / args.number * 1e6:10.1f} us/page")
+
+
+if __name__ == "__main__":
+    main()
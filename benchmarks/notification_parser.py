@@ -0,0 +1,40 @@
+"""Benchmark of hub notification parsing
+
+Compare the lxml streaming parser against the BeautifulSoup lookup it replaced.
+
+    python -m benchmarks.notification_parser [--number 2000]
+"""
+import argparse
+import timeit
+from os.path import dirname, join
+
+import bs4
+
+from tubee.helper.feed import parse_notification
+
+DATA_DIR = join(dirname(__file__), "..", "tubee", "tests", "data")
+
+
+def parse_with_bs4(data):
+    tag = bs4.BeautifulSoup(data, "xml").find("yt:videoId")
+    return tag.string if tag else None
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--number", type=int, default=2000)
+    args = arg_parser.parse_args()
+
+    for fixture in ["youtube_notification.xml", "youtube_notification_deleted.xml"]:
+        with open(join(DATA_DIR, fixture)) as file:
+            data = file.read()
+        print(fixture)
+        for name, func in [("bs4", parse_with_bs4), ("lxml", parse_notification)]:
+            seconds = min(
+                timeit.repeat(lambda: func(data), number=args.number, repeat=5)
+            )
+            print(f"  {name:<5}{seconds / args.number * 1e6:10.1f} us/payload")
+
+
+if __name__ == "__main__":
+    main()
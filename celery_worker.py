@@ -2,10 +2,13 @@ import json
 import logging
 from os.path import exists, isfile, join
 
-from celery.signals import after_setup_logger
+from celery.signals import after_setup_logger, worker_process_shutdown
 
 from app import app
 from tubee import celery
+from tubee.helper.callback_log import callback_log
+from tubee.helper.extractor import extractor_pool
+from tubee.helper.quota import quota_ledger
 
 # Push flask context for celery
 app.app_context().push()
@@ -18,3 +21,16 @@ def setup_loggers(logger, *args, **kwargs):
         with open(external_config) as json_file:
             logging.config.dictConfig(json.load(json_file))
         logging.info("External Celery Config Loaded")
+
+
+# Write buffered callback records and quota ledger before worker process exits
+@worker_process_shutdown.connect
+def drain_callback_log(*args, **kwargs):
+    callback_log.close()
+    quota_ledger.close()
+
+
+# Stop extraction workers of the process
+@worker_process_shutdown.connect
+def stop_extractor_pool(*args, **kwargs):
+    extractor_pool.close()
@@ -16,6 +16,8 @@ from flask_sqlalchemy import SQLAlchemy
 from sentry_sdk.integrations.flask import FlaskIntegration
 
 from tubee.config import config
+from tubee.helper.extractor import extractor_pool
+from tubee.helper.http import http_client
 
 __version__ = subprocess.check_output(
     ["git", "rev-parse", "--short", "HEAD"], text=True
@@ -72,6 +74,8 @@ def create_app(config_name, coverage=None):
     moment.init_app(app)
     oauth.init_app(app)
     celery.conf.update(app.config)
+    http_client.init_app(app)
+    extractor_pool.init_app(app)
 
     # Extensions Settings
     login_manager.login_view = "user.login"
@@ -27,6 +27,45 @@ class Config:
     REMEMBER_COOKIE_DURATION = timedelta(days=30)
     REMEMBER_COOKIE_SECURE = True
     CELERY_RESULT_BACKEND = "rpc://"
+    CELERYBEAT_SCHEDULE = {
+        "channels-renew-due": {
+            "task": "tubee.tasks.channels_renew_due",
+            "schedule": 60 * 5,
+        },
+        "channels-audit": {
+            "task": "tubee.tasks.channels_audit",
+            "schedule": 60 * 60 * 24,
+        },
+        "retention": {
+            "task": "tubee.tasks.retention_apply",
+            "schedule": 60 * 60 * 24,
+        },
+    }
+    RETENTION_POLICIES = {
+        "callback": {"days": int(os.environ.get("RETENTION_CALLBACK_DAYS", 30))},
+        "notification": {
+            "days": int(os.environ.get("RETENTION_NOTIFICATION_DAYS", 90))
+        },
+    }
+    RETENTION_BATCH_SIZE = 1000
+    RETENTION_ARCHIVE_DIR = os.environ.get("RETENTION_ARCHIVE_DIR")
+    DISPATCH_INDEX_TTL = int(os.environ.get("DISPATCH_INDEX_TTL", 60))
+    ACTION_EXECUTOR_MAX_WORKERS = int(os.environ.get("ACTION_EXECUTOR_MAX_WORKERS", 8))
+    ACTION_EXECUTOR_LIMITS = {
+        "Notification": 16,
+        "Playlist": 4,
+        "Download": 4,
+        "Pushover": 8,
+        "Line Notify": 8,
+    }
+
+    # Outbound HTTP
+    HTTP_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", 3.05))
+    HTTP_READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", 30))
+    HTTP_RETRIES = int(os.environ.get("HTTP_RETRIES", 2))
+    HTTP_RETRY_BACKOFF = 0.5
+    HTTP_POOL_CONNECTIONS = 10
+    HTTP_POOL_MAXSIZE = int(os.environ.get("HTTP_POOL_MAXSIZE", 10))
 
     # Sentry
     SENTRY_DSN = os.environ.get("SENTRY_DSN")
@@ -36,10 +75,55 @@ class Config:
 
     # YouTube Data API
     YOUTUBE_API_DEVELOPER_KEY = os.environ.get("YOUTUBE_API_DEVELOPER_KEY")
+    YOUTUBE_API_DEVELOPER_KEYS = [
+        key
+        for key in os.environ.get(
+            "YOUTUBE_API_DEVELOPER_KEYS", YOUTUBE_API_DEVELOPER_KEY or ""
+        ).split(",")
+        if key
+    ]
+    YOUTUBE_API_KEY_DAILY_LIMIT = int(
+        os.environ.get("YOUTUBE_API_KEY_DAILY_LIMIT", 10000)
+    )
     YOUTUBE_API_CLIENT_SECRET_FILE = os.environ.get("YOUTUBE_API_CLIENT_SECRET_FILE")
     YOUTUBE_READ_WRITE_SSL_SCOPE = ["https://www.googleapis.com/auth/youtube.force-ssl"]
     YOUTUBE_API_SERVICE_NAME = "youtube"
     YOUTUBE_API_VERSION = "v3"
+    YOUTUBE_API_CLIENT_CACHE_SIZE = 128
+    YOUTUBE_API_CLIENT_CACHE_TTL = 3600
+    YOUTUBE_API_ETAG_CACHE_SIZE = int(
+        os.environ.get("YOUTUBE_API_ETAG_CACHE_SIZE", 1024)
+    )
+    YOUTUBE_API_ETAG_CACHE_TTL = 60 * 60 * 24
+    YOUTUBE_API_RETRIES = 3
+    YOUTUBE_API_BACKOFF_BASE = 0.5
+    YOUTUBE_API_BACKOFF_MAX = 8
+    YOUTUBE_API_BREAKER_THRESHOLD = 5
+    YOUTUBE_API_BREAKER_RESET_TIMEOUT = 30
+    QUOTA_DAILY_LIMIT = int(
+        os.environ.get(
+            "QUOTA_DAILY_LIMIT",
+            YOUTUBE_API_KEY_DAILY_LIMIT * max(len(YOUTUBE_API_DEVELOPER_KEYS), 1),
+        )
+    )
+    QUOTA_BUDGETS = {
+        "interactive": 0.3,
+        "renewal": 0.2,
+        "backfill": 0.3,
+        "action": 0.2,
+    }
+    QUOTA_BURST = 0.25
+    QUOTA_FLUSH_INTERVAL = 10
+    VIDEO_RESOLVER_WINDOW = float(os.environ.get("VIDEO_RESOLVER_WINDOW", 0.2))
+    VIDEO_RESOLVER_BATCH_SIZE = 50
+    VIDEO_RESOLVER_TIMEOUT = 30
+    VIDEO_FILE_URL_CACHE_SIZE = 256
+    VIDEO_FILE_URL_DEFAULT_TTL = 60 * 60
+    VIDEO_FILE_URL_EXPIRY_MARGIN = 60 * 10
+    EXTRACTOR_POOL_SIZE = int(os.environ.get("EXTRACTOR_POOL_SIZE", 2))
+    EXTRACTOR_TIMEOUT = float(os.environ.get("EXTRACTOR_TIMEOUT", 60))
+    EXTRACTOR_MAX_QUEUE = int(os.environ.get("EXTRACTOR_MAX_QUEUE", 16))
+    EXTRACTOR_MAX_CALLS = int(os.environ.get("EXTRACTOR_MAX_CALLS", 100))
 
     # Line Notify API
     LINENOTIFY_CLIENT_ID = os.environ.get("LINENOTIFY_CLIENT_ID")
@@ -52,6 +136,24 @@ class Config:
     # PubSubHubBub
     HUB_GOOGLE_HUB = "https://pubsubhubbub.appspot.com"
     HUB_YOUTUBE_TOPIC = "https://www.youtube.com/xml/feeds/videos.xml?"
+    HUB_CONCURRENCY = int(os.environ.get("HUB_CONCURRENCY", 10))
+    HUB_RATE_LIMIT = float(os.environ.get("HUB_RATE_LIMIT", 20))
+    HUB_CALLBACK_ASYNC = bool(os.environ.get("HUB_CALLBACK_ASYNC"))
+    CALLBACK_LOG_DURABILITY = os.environ.get("CALLBACK_LOG_DURABILITY", "buffered")
+    CALLBACK_LOG_BATCH_SIZE = int(os.environ.get("CALLBACK_LOG_BATCH_SIZE", 500))
+    CALLBACK_LOG_FLUSH_INTERVAL = float(
+        os.environ.get("CALLBACK_LOG_FLUSH_INTERVAL", 1.0)
+    )
+    CALLBACK_LOG_JOURNAL_DIR = os.environ.get("CALLBACK_LOG_JOURNAL_DIR")
+    NOTIFICATION_DEDUP_SIZE = int(os.environ.get("NOTIFICATION_DEDUP_SIZE", 10000))
+    NOTIFICATION_DEDUP_TTL = float(os.environ.get("NOTIFICATION_DEDUP_TTL", 86400))
+    NOTIFICATION_DEDUP_BACKEND = os.environ.get("NOTIFICATION_DEDUP_BACKEND")
+    NOTIFICATION_DEDUP_URL = os.environ.get("NOTIFICATION_DEDUP_URL")
+    HUB_RENEWAL_INTERVAL = 60 * 60 * 24 * 4
+    HUB_RENEWAL_MARGIN = 60 * 60 * 24
+    HUB_RENEWAL_RETRY = 60 * 60
+    HUB_RENEWAL_CLAIM_TIMEOUT = 60 * 30
+    HUB_RENEWAL_BATCH_SIZE = 50
     # HUB_RECEIVE_DOMAIN = os.environ.get("HUB_RECEIVE_DOMAIN", SERVER_NAME)
 
     @staticmethod
@@ -84,6 +186,9 @@ class TestingConfig(Config):
     WTF_CSRF_ENABLED = False
     SQLALCHEMY_DATABASE_URI = os.environ.get("TEST_DATABASE_URL", "sqlite://")
     BROKER_URL = os.environ.get("TEST_BROKER_URL")
+    CALLBACK_LOG_DURABILITY = "sync"
+    NOTIFICATION_DEDUP_SIZE = 0
+    QUOTA_FLUSH_INTERVAL = 0
 
     @classmethod
     def init_app(cls, app):
@@ -34,6 +34,39 @@ class APIError(TubeeError):
         super().__init__(f"Error <{error_type}> from {service}: {message}")
 
 
+class QuotaExceeded(APIError):
+    """Raised when budget of a work class can not afford a YouTube API call
+
+    Extends:
+        APIError
+    """
+
+    def __init__(self, work_class, retry_after, *args):
+        self.work_class = work_class
+        self.retry_after = retry_after
+        super().__init__(
+            "YouTube",
+            f"Quota budget of {work_class} exhausted, retry after {retry_after:.0f}s",
+            error_type="QuotaExceeded",
+        )
+
+
+class CircuitOpen(APIError):
+    """Raised when YouTube API calls fail fast while the API is unhealthy
+
+    Extends:
+        APIError
+    """
+
+    def __init__(self, retry_after, *args):
+        self.retry_after = retry_after
+        super().__init__(
+            "YouTube",
+            f"API is unhealthy, retry after {retry_after:.0f}s",
+            error_type="CircuitOpen",
+        )
+
+
 class InvalidAction(UserError, ValueError):
     """Raised when user filled in invalid parameter
 
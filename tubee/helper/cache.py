@@ -0,0 +1,87 @@
+"""In-process Cache
+
+A thread-safe mapping which evicts least recently used entries beyond maxsize,
+and entries older than ttl seconds.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Least recently used cache with time-to-live
+
+    Arguments:
+        maxsize {int} -- maximum number of entries
+
+    Keyword Arguments:
+        ttl {float} -- default seconds an entry stays valid, None to never expire
+    """
+
+    def __init__(self, maxsize, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._data = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING, touch=False) is not _MISSING
+
+    def get(self, key, default=None, touch=True):
+        """Get value of a key
+
+        Arguments:
+            key {hashable} -- key of the entry
+
+        Keyword Arguments:
+            default {object} -- returned if key is missing or expired
+            touch {bool} -- mark entry as recently used (default: {True})
+
+        Returns:
+            object -- the cached value
+        """
+        with self._lock:
+            try:
+                expire_at, value = self._data[key]
+            except KeyError:
+                return default
+            if expire_at is not None and expire_at <= time.monotonic():
+                del self._data[key]
+                return default
+            if touch:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        """Set value of a key
+
+        Arguments:
+            key {hashable} -- key of the entry
+            value {object} -- value to be cached
+
+        Keyword Arguments:
+            ttl {float} -- seconds this entry stays valid, overriding default
+        """
+        ttl = self.ttl if ttl is None else ttl
+        expire_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (expire_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        """Remove a key and return its value"""
+        with self._lock:
+            expire_at, value = self._data.pop(key, (None, default))
+            return value
+
+    def clear(self):
+        """Remove all entries"""
+        with self._lock:
+            self._data.clear()
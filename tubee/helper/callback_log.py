@@ -0,0 +1,375 @@
+"""Buffered Callback Log
+
+Record callback audit rows, and channel columns derived from callbacks,
+without committing once per callback. Records are queued in memory and written
+by a background thread in batches, one multi-row statement per table, when
+either the batch is full or the oldest record has waited long enough.
+
+Behaviour is read from config:
+    CALLBACK_LOG_DURABILITY {str} -- "sync" to write before returning,
+                                     "buffered" to write in background, queued
+                                     records are lost if process crashes,
+                                     "journal" to also append records to a
+                                     local file, replayed after a crash
+    CALLBACK_LOG_BATCH_SIZE {int} -- maximum records written per batch
+    CALLBACK_LOG_FLUSH_INTERVAL {float} -- seconds a record may stay queued
+    CALLBACK_LOG_JOURNAL_DIR {str} -- directory of journal files, default to
+                                      instance folder
+
+Queued records are drained on interpreter exit, and should be drained by
+calling close when a worker process shuts down. Records which can not be
+written are moved to a rejected file next to journals, so they neither block
+nor get replayed.
+"""
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from glob import glob
+
+from flask import current_app
+from sqlalchemy import bindparam
+
+from .. import db
+
+_STOP = object()
+JOURNAL_PREFIX = "callback-log."
+REJECTED_PREFIX = "callback-log-rejected."
+REPLAY_SUFFIX = ".replay-"
+
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return {"$datetime": value.isoformat()}
+    raise TypeError(f"{value!r} is not JSON serializable")
+
+
+def _decode(value):
+    if "$datetime" in value:
+        return datetime.fromisoformat(value["$datetime"])
+    return value
+
+
+class CallbackLog:
+    """Queue of callback rows and channel updates, written in batches"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._atexit = False
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._queue = queue.Queue()
+        self._thread = None
+        self._app = None
+        self._journal = None
+        # Journal lines of records not written yet, keyed by id of record
+        self._journaled = {}
+
+    @staticmethod
+    def _journal_path(pid, prefix=JOURNAL_PREFIX):
+        directory = current_app.config.get("CALLBACK_LOG_JOURNAL_DIR")
+        return os.path.join(
+            directory or current_app.instance_path, f"{prefix}{pid}.jsonl"
+        )
+
+    def _ensure_writer(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked, records and thread of parent are not ours
+                self._reset()
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._app = current_app._get_current_object()
+            if self._app.config["CALLBACK_LOG_DURABILITY"] == "journal":
+                path = self._journal_path(self._pid)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                self._journal = open(path, "a", encoding="utf-8")
+            self._thread = threading.Thread(
+                target=self._run, name="tubee-callback-log", daemon=True
+            )
+            self._thread.start()
+            if not self._atexit:
+                atexit.register(self.close)
+                self._atexit = True
+
+    def _put(self, record):
+        if current_app.config["CALLBACK_LOG_DURABILITY"] == "sync":
+            self._write([record])
+            return
+        self._ensure_writer()
+        with self._lock:
+            if self._journal:
+                line = json.dumps(record, default=_encode) + "\n"
+                self._journal.write(line)
+                self._journal.flush()
+                os.fsync(self._journal.fileno())
+                self._journaled[id(record)] = line
+            self._queue.put(record)
+
+    def record(self, channel_id, type, infos, timestamp=None, video_id=None):
+        """Queue a callback row
+
+        Arguments:
+            channel_id {str} -- ID of the channel which receives the callback
+            type {str} -- type of the callback
+            infos {dict} -- details of the request context
+
+        Keyword Arguments:
+            timestamp {datetime.datetime} -- when callback is received,
+                                             default to now
+            video_id {str} -- ID of the video the callback is about
+        """
+        self._put(
+            (
+                "callback",
+                {
+                    "channel_id": channel_id,
+                    "video_id": video_id,
+                    "type": type,
+                    "infos": infos,
+                    "timestamp": timestamp or datetime.utcnow(),
+                },
+            )
+        )
+
+    def update_channel(self, channel_id, values):
+        """Queue an update of channel columns
+
+        Arguments:
+            channel_id {str} -- ID of the channel
+            values {dict} -- column values to set
+        """
+        self._put(("channel", dict(values, id=channel_id)))
+
+    def _drain(self, limit):
+        records = []
+        while len(records) < limit:
+            try:
+                record = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if record is not _STOP:
+                records.append(record)
+        return records
+
+    def flush(self):
+        """Write every queued record now, in the calling thread
+
+        Returns:
+            int -- number of records written
+        """
+        count = 0
+        batch_size = current_app.config["CALLBACK_LOG_BATCH_SIZE"]
+        while True:
+            records = self._drain(batch_size)
+            if not records:
+                return count
+            self._write_batch(records)
+            count += len(records)
+
+    def close(self):
+        """Stop background writer and write every queued record
+
+        Called on interpreter exit, and by worker process shutdown.
+        """
+        with self._lock:
+            if self._pid != os.getpid() or self._app is None:
+                return
+            thread, app = self._thread, self._app
+        if thread is not None and thread.is_alive():
+            self._queue.put(_STOP)
+            thread.join(timeout=app.config["CALLBACK_LOG_FLUSH_INTERVAL"] + 10)
+        with app.app_context():
+            try:
+                self.flush()
+            finally:
+                db.session.remove()
+        with self._lock:
+            if self._journal:
+                self._journal.close()
+                self._journal = None
+            self._thread = None
+
+    def replay(self):
+        """Write records left in journals of processes which are gone
+
+        Called once by the writer thread when it starts. Each journal is
+        claimed by renaming it before being read, so it is replayed by one
+        process only. Claimed journals whose replaying process is gone are
+        claimed again.
+
+        Records are written at least once, records committed right before a
+        crash may be written again.
+
+        Returns:
+            int -- number of records replayed
+        """
+        if current_app.config["CALLBACK_LOG_DURABILITY"] != "journal":
+            return 0
+        count = 0
+        journals = glob(self._journal_path("*"))
+        journals += glob(self._journal_path("*") + REPLAY_SUFFIX + "*")
+        for path in journals:
+            name = os.path.basename(path)
+            if REPLAY_SUFFIX in name:
+                pid = int(name.rsplit(REPLAY_SUFFIX, 1)[1])
+            else:
+                pid = int(name[len(JOURNAL_PREFIX) :].split(".")[0])
+            if pid == os.getpid() or _is_running(pid):
+                continue
+            claimed = f"{path.split(REPLAY_SUFFIX)[0]}{REPLAY_SUFFIX}{os.getpid()}"
+            try:
+                os.rename(path, claimed)
+            except FileNotFoundError:
+                # Claimed by another process
+                continue
+            with open(claimed, encoding="utf-8") as file:
+                records = [
+                    tuple(json.loads(line, object_hook=_decode))
+                    for line in file
+                    if line.strip()
+                ]
+            for offset in range(0, len(records), 500):
+                self._write_or_reject(records[offset : offset + 500])
+            os.remove(claimed)
+            count += len(records)
+            current_app.logger.info(f"Callback log: {len(records)} records replayed")
+        return count
+
+    def _run(self):
+        app = self._app
+        batch_size = app.config["CALLBACK_LOG_BATCH_SIZE"]
+        interval = app.config["CALLBACK_LOG_FLUSH_INTERVAL"]
+        stopping = False
+        with app.app_context():
+            try:
+                self.replay()
+            except Exception:
+                db.session.rollback()
+                app.logger.exception("Callback log: journal replay failed")
+            finally:
+                db.session.remove()
+        while not stopping:
+            record = self._queue.get()
+            if record is _STOP:
+                break
+            records = [record]
+            deadline = time.monotonic() + interval
+            while len(records) < batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    record = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if record is _STOP:
+                    stopping = True
+                    break
+                records.append(record)
+            with app.app_context():
+                try:
+                    self._write_batch(records)
+                finally:
+                    db.session.remove()
+
+    def _write_batch(self, records):
+        """Write records, and drop them from the journal"""
+        with self._write_lock:
+            self._write_or_reject(records)
+        with self._lock:
+            for record in records:
+                self._journaled.pop(id(record), None)
+            if self._journal:
+                self._compact_journal()
+
+    def _compact_journal(self):
+        """Keep only records not written yet in journal, called with lock"""
+        if not self._journaled:
+            self._journal.seek(0)
+            self._journal.truncate()
+            return
+        path = self._journal.name
+        with open(f"{path}.tmp", "w", encoding="utf-8") as file:
+            file.writelines(self._journaled.values())
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(f"{path}.tmp", path)
+        self._journal.close()
+        self._journal = open(path, "a", encoding="utf-8")
+
+    def _write_or_reject(self, records):
+        """Write records, one by one if batch fails, rejecting failed ones"""
+        try:
+            self._write(records)
+            return
+        except Exception:
+            db.session.rollback()
+            current_app.logger.exception(
+                f"Callback log: batch of {len(records)} records failed"
+            )
+        rejected = []
+        for record in records:
+            try:
+                self._write([record])
+            except Exception:
+                db.session.rollback()
+                rejected.append(record)
+                current_app.logger.exception(
+                    f"Callback log: record rejected {record!r}"
+                )
+        if not rejected:
+            return
+        path = self._journal_path(os.getpid(), prefix=REJECTED_PREFIX)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "a", encoding="utf-8") as file:
+                for record in rejected:
+                    file.write(json.dumps(record, default=_encode) + "\n")
+        except (OSError, TypeError):
+            current_app.logger.exception(
+                f"Callback log: {len(rejected)} rejected records lost"
+            )
+
+    @staticmethod
+    def _write(records):
+        from ..models import Callback, Channel
+
+        callbacks = [values for kind, values in records if kind == "callback"]
+        updates = {}
+        for kind, values in records:
+            if kind == "channel":
+                # Parameter can not share name with column being set
+                row = {f"_{key}": value for key, value in values.items()}
+                updates.setdefault(tuple(sorted(values)), []).append(row)
+        if callbacks:
+            db.session.execute(Callback.__table__.insert(), callbacks)
+        table = Channel.__table__
+        for keys, rows in updates.items():
+            db.session.execute(
+                table.update()
+                .where(table.c.id == bindparam("_id"))
+                .values({key: bindparam(f"_{key}") for key in keys if key != "id"}),
+                rows,
+            )
+        db.session.commit()
+        current_app.logger.debug(f"Callback log: {len(records)} records written")
+
+
+def _is_running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+callback_log = CallbackLog()
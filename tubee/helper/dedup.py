@@ -0,0 +1,160 @@
+"""Hub Notification Dedup Filter
+
+YouTube re-sends a notification whenever title, description or thumbnail of
+a video is edited, and hub may deliver the same notification more than once.
+An exact repeat carries the same (video_id, updated) pair, so remembering
+recent pairs lets the endpoint drop it before touching the database.
+
+Pairs are remembered in an in-process LRU, optionally backed by a backend
+shared across workers, which is asked only when the LRU misses. A pair whose
+notification fails to be processed must be forgotten, so redelivery by hub
+is processed.
+
+Settings are read from config:
+    NOTIFICATION_DEDUP_SIZE {int} -- pairs kept in process, 0 to disable
+    NOTIFICATION_DEDUP_TTL {float} -- seconds a pair is remembered
+    NOTIFICATION_DEDUP_BACKEND {str} -- None for in-process only, or
+                                        "redis" to share pairs through
+                                        NOTIFICATION_DEDUP_URL
+"""
+import threading
+
+from flask import current_app
+
+from .cache import TTLCache
+
+KEY_PREFIX = "tubee:notification:"
+
+
+class RedisBackend:
+    """Share pairs through Redis, require redis package
+
+    Arguments:
+        url {str} -- Redis URL
+        ttl {float} -- seconds a pair is remembered
+    """
+
+    def __init__(self, url, ttl):
+        try:
+            import redis
+        except ImportError as error:
+            raise RuntimeError("redis package is required by RedisBackend") from error
+        self.client = redis.Redis.from_url(url)
+        self.ttl = int(ttl)
+
+    def add(self, key):
+        """Remember a key, return False if it was already remembered"""
+        return bool(self.client.set(KEY_PREFIX + key, 1, nx=True, ex=self.ttl))
+
+    def discard(self, key):
+        """Forget a key"""
+        self.client.delete(KEY_PREFIX + key)
+
+
+BACKENDS = {"redis": RedisBackend}
+
+
+class DedupFilter:
+    """Reject (video_id, updated) pairs which are already seen
+
+    Keyword Arguments:
+        maxsize {int} -- pairs kept in process (default: {10000})
+        ttl {float} -- seconds a pair is remembered (default: {86400})
+        backend {object} -- shared backend with add(key) -> bool and
+                            discard(key)
+    """
+
+    def __init__(self, maxsize=10000, ttl=86400, backend=None):
+        self._lock = threading.Lock()
+        self.cache = TTLCache(maxsize, ttl=ttl)
+        self.backend = backend
+        self.counters = {"hits": 0, "misses": 0, "errors": 0}
+
+    def _count(self, counter):
+        with self._lock:
+            self.counters[counter] += 1
+
+    def seen(self, video_id, updated):
+        """Check and remember a notification entry
+
+        Arguments:
+            video_id {str} -- ID of the video
+            updated {str} -- updated timestamp of the entry
+
+        Returns:
+            bool -- True if the same pair is already seen
+        """
+        if not updated:
+            return False
+        key = f"{video_id}:{updated}"
+        with self._lock:
+            if key in self.cache:
+                self.counters["hits"] += 1
+                return True
+            self.cache.set(key, True)
+        if self.backend is not None:
+            try:
+                if not self.backend.add(key):
+                    self._count("hits")
+                    return True
+            except Exception:
+                # Shared backend is an optimization, never drop on its failure
+                self._count("errors")
+                current_app.logger.exception("Notification dedup backend failed")
+        self._count("misses")
+        return False
+
+    def forget(self, video_id, updated):
+        """Drop a pair, so the same entry will be processed if delivered again"""
+        if not updated:
+            return
+        key = f"{video_id}:{updated}"
+        self.cache.pop(key)
+        if self.backend is not None:
+            try:
+                self.backend.discard(key)
+            except Exception:
+                self._count("errors")
+                current_app.logger.exception("Notification dedup backend failed")
+
+    def stats(self):
+        """Counters of hits (rejected), misses (passed) and backend errors
+
+        Returns:
+            dict -- counters, with hit ratio and number of pairs kept
+        """
+        with self._lock:
+            stats = dict(self.counters)
+        total = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = stats["hits"] / total if total else 0.0
+        stats["size"] = len(self.cache)
+        return stats
+
+
+_filter = None
+_filter_lock = threading.Lock()
+
+
+def get_dedup_filter():
+    """Filter of current process, built from app config on first use
+
+    Returns:
+        DedupFilter -- None if disabled by NOTIFICATION_DEDUP_SIZE
+    """
+    global _filter
+    config = current_app.config
+    if not config["NOTIFICATION_DEDUP_SIZE"]:
+        return None
+    with _filter_lock:
+        if _filter is None:
+            backend = None
+            if config["NOTIFICATION_DEDUP_BACKEND"]:
+                backend = BACKENDS[config["NOTIFICATION_DEDUP_BACKEND"]](
+                    config["NOTIFICATION_DEDUP_URL"], config["NOTIFICATION_DEDUP_TTL"]
+                )
+            _filter = DedupFilter(
+                config["NOTIFICATION_DEDUP_SIZE"],
+                ttl=config["NOTIFICATION_DEDUP_TTL"],
+                backend=backend,
+            )
+        return _filter
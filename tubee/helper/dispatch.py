@@ -0,0 +1,124 @@
+"""Action Dispatch Index
+
+Map a channel to every action that should be executed when it uploads, so
+that fanning out a new video costs a constant number of queries regardless
+of how many users subscribe to the channel.
+
+The index is cached per process, and invalidated when any row that takes part
+in the resolution (Action, Tag, SubscriptionTag, Subscription) is changed.
+Since other processes can not be notified, entries also expire after
+DISPATCH_INDEX_TTL seconds.
+"""
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy import and_, event, or_
+from sqlalchemy.orm import joinedload
+
+from ..models import Action, Subscription, SubscriptionTag, Tag
+
+DEFAULT_TTL = 60
+
+
+class DispatchIndex:
+    """In-process cache of channel_id -> [action_id, ...]"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index = {}
+
+    @staticmethod
+    def resolve(channel_id):
+        """Query actions from subscriptions and tagged subscriptions of a channel
+
+        Arguments:
+            channel_id {str} -- ID of the channel
+
+        Returns:
+            list -- Action with user eagerly loaded, ordered by id
+        """
+        return (
+            Action.query.options(joinedload(Action.user))
+            .outerjoin(
+                SubscriptionTag,
+                and_(
+                    SubscriptionTag.tag_id == Action.tag_id,
+                    SubscriptionTag.username == Action.username,
+                    SubscriptionTag.channel_id == channel_id,
+                ),
+            )
+            .filter(
+                or_(
+                    Action.channel_id == channel_id,
+                    SubscriptionTag.channel_id == channel_id,
+                )
+            )
+            .order_by(Action.id)
+            .all()
+        )
+
+    def get(self, channel_id):
+        """Get actions to execute for a channel
+
+        Arguments:
+            channel_id {str} -- ID of the channel
+
+        Returns:
+            list -- (user, action) pairs
+        """
+        ttl = current_app.config.get("DISPATCH_INDEX_TTL", DEFAULT_TTL)
+        with self._lock:
+            cached = self._index.get(channel_id)
+        if cached and time.monotonic() - cached[0] < ttl:
+            action_ids = cached[1]
+            if not action_ids:
+                return []
+            actions = {
+                action.id: action
+                for action in Action.query.options(joinedload(Action.user))
+                .filter(Action.id.in_(action_ids))
+                .all()
+            }
+            if len(actions) == len(action_ids):
+                return [(actions[i].user, actions[i]) for i in action_ids]
+            # Rows are removed by another process, rebuild
+
+        actions = self.resolve(channel_id)
+        with self._lock:
+            self._index[channel_id] = (
+                time.monotonic(),
+                [action.id for action in actions],
+            )
+        return [(action.user, action) for action in actions]
+
+    def invalidate(self, channel_id=None):
+        """Drop cached entry of a channel, or every entry if not given"""
+        with self._lock:
+            if channel_id is None:
+                self._index.clear()
+            else:
+                self._index.pop(channel_id, None)
+
+
+dispatch_index = DispatchIndex()
+
+
+def _invalidate_channel(mapper, connection, target):
+    dispatch_index.invalidate(target.channel_id)
+
+
+def _invalidate_action(mapper, connection, target):
+    # Tag action applies to every channel tagged with it
+    dispatch_index.invalidate(target.channel_id if not target.tag_id else None)
+
+
+def _invalidate_all(mapper, connection, target):
+    dispatch_index.invalidate()
+
+
+for _event in ["after_insert", "after_update", "after_delete"]:
+    event.listen(Action, _event, _invalidate_action)
+    event.listen(Subscription, _event, _invalidate_channel)
+    event.listen(SubscriptionTag, _event, _invalidate_channel)
+    event.listen(Tag, _event, _invalidate_all)
@@ -0,0 +1,115 @@
+"""ETag Cache of YouTube API Reads
+
+Keep the last response of each list request made with a developer key, with
+its etag, and send the etag back in If-None-Match. When YouTube answers 304
+Not Modified, the kept response is returned instead, so the caller can tell
+nothing has changed by comparing etags of resources.
+
+Responses are copied in and out of the cache, callers may modify them.
+Requests authorized by user credentials are never cached, their responses
+depend on the user.
+
+Settings are read from config:
+    YOUTUBE_API_ETAG_CACHE_SIZE {int} -- responses kept, 0 to disable
+    YOUTUBE_API_ETAG_CACHE_TTL {float} -- seconds a response is kept
+"""
+import copy
+import threading
+from urllib.parse import urlencode
+
+from flask import current_app
+
+from .cache import TTLCache
+
+
+class ETagCache:
+    """Responses of list requests keyed by URI, with per-endpoint counters"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cache = TTLCache(maxsize=1024)
+        self._stats = {}
+
+    @staticmethod
+    def key(request, query):
+        """Cache key of a list request made with developer key
+
+        Arguments:
+            request {googleapiclient.http.HttpRequest} -- the request
+            query {dict} -- parsed query string of its URI
+
+        Returns:
+            str -- None if the request can not be cached
+        """
+        if request.method != "GET" or not current_app.config.get(
+            "YOUTUBE_API_ETAG_CACHE_SIZE"
+        ):
+            return None
+        # Any key of the pool is answered the same
+        query = {name: value for name, value in query.items() if name != "key"}
+        return f"{request.methodId}?{urlencode(sorted(query.items()), doseq=True)}"
+
+    def _count(self, endpoint, counter):
+        with self._lock:
+            counters = self._stats.setdefault(
+                endpoint, {"hits": 0, "misses": 0, "changed": 0}
+            )
+            counters[counter] += 1
+
+    def prepare(self, request, cache_key):
+        """Add If-None-Match header of the cached response to request
+
+        Returns:
+            dict -- cached response, None if not cached
+        """
+        cached = self._cache.get(cache_key)
+        if cached is None:
+            return None
+        request.headers["If-None-Match"] = cached["etag"]
+        return cached
+
+    def hit(self, endpoint, cached):
+        """Response of a request answered with 304 Not Modified"""
+        self._count(endpoint, "hits")
+        return copy.deepcopy(cached)
+
+    def store(self, endpoint, cache_key, response, cached=None):
+        """Keep a fresh response which carries an etag
+
+        Arguments:
+            endpoint {str} -- API method id
+            cache_key {str} -- key from ETagCache.key
+            response {dict} -- response of the request
+
+        Keyword Arguments:
+            cached {dict} -- response previously cached, if any
+
+        Returns:
+            dict -- the response
+        """
+        self._count(endpoint, "changed" if cached else "misses")
+        if isinstance(response, dict) and response.get("etag"):
+            self._cache.maxsize = current_app.config["YOUTUBE_API_ETAG_CACHE_SIZE"]
+            self._cache.set(
+                cache_key,
+                copy.deepcopy(response),
+                ttl=current_app.config["YOUTUBE_API_ETAG_CACHE_TTL"],
+            )
+        return response
+
+    def stats(self):
+        """Hits (304), misses (not cached) and changed responses per endpoint
+
+        Returns:
+            dict -- counters and hit rate, keyed by API method id
+        """
+        with self._lock:
+            stats = {
+                endpoint: dict(counters) for endpoint, counters in self._stats.items()
+            }
+        for counters in stats.values():
+            counters["hit_rate"] = counters["hits"] / sum(counters.values())
+        return stats
+
+
+etag_cache = ETagCache()
@@ -0,0 +1,134 @@
+"""Concurrent Action Executor
+
+Execute actions of a video on bounded thread pools. Each ActionType owns a
+pool, and notification actions also acquire a slot of their notification
+Service, so one slow service can not hold up the others.
+
+Limits are read from config:
+    ACTION_EXECUTOR_MAX_WORKERS {int} -- default pool size of an ActionType,
+                                         1 to execute actions sequentially
+    ACTION_EXECUTOR_LIMITS {dict} -- concurrency cap keyed by ActionType or
+                                     Service value
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+from .. import db
+
+
+class ActionExecutor:
+    """Run actions concurrently within the Flask application context"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pools = {}
+        self._semaphores = {}
+
+    def _get_pool(self, key):
+        with self._lock:
+            if key not in self._pools:
+                self._pools[key] = ThreadPoolExecutor(
+                    max_workers=current_app.config["ACTION_EXECUTOR_LIMITS"].get(
+                        key, current_app.config["ACTION_EXECUTOR_MAX_WORKERS"]
+                    ),
+                    thread_name_prefix=f"tubee-{key.lower()}",
+                )
+            return self._pools[key]
+
+    def _get_semaphore(self, key):
+        with self._lock:
+            if key not in self._semaphores:
+                limit = current_app.config["ACTION_EXECUTOR_LIMITS"].get(key)
+                self._semaphores[key] = (
+                    threading.BoundedSemaphore(limit) if limit else None
+                )
+            return self._semaphores[key]
+
+    @staticmethod
+    def service_key(action):
+        """Notification Service of an action
+
+        Arguments:
+            action {models.Action} -- action to be executed
+
+        Returns:
+            str -- Service value, None if action is not a valid notification
+        """
+        from ..models import ActionType, Service
+
+        if action.type is not ActionType.Notification:
+            return None
+        try:
+            return Service(action.details.get("service")).value
+        except ValueError:
+            return None
+
+    def _execute_one(self, action, label, parameters):
+        service = self.service_key(action)
+        semaphore = self._get_semaphore(service) if service else None
+        if semaphore:
+            semaphore.acquire()
+        try:
+            results = action.execute(**parameters)
+        except Exception as error:
+            results = {
+                "error": error.__class__.__name__,
+                "description": str(error),
+            }
+            current_app.logger.exception(f"{label}-{action.id}: {error}")
+        else:
+            current_app.logger.info(f"{label}-{action.id}")
+        finally:
+            if semaphore:
+                semaphore.release()
+        return results
+
+    def _execute_in_context(self, app, action, label, parameters):
+        with app.app_context():
+            # Each thread owns a session, bring loaded action (and user) into it
+            action = db.session.merge(action, load=False)
+            return self._execute_one(action, label, parameters)
+
+    def execute(self, actions, label="Action", **parameters):
+        """Execute actions and collect results
+
+        Arguments:
+            actions {list} -- models.Action to be executed, with user loaded
+
+        Keyword Arguments:
+            label {str} -- prefix of log messages (default: {"Action"})
+            **parameters {dict} -- passed to models.Action.execute
+
+        Returns:
+            dict -- Results or error description of each action, keyed by id
+        """
+        max_workers = current_app.config["ACTION_EXECUTOR_MAX_WORKERS"]
+        if max_workers <= 1 or len(actions) <= 1:
+            return {
+                action.id: self._execute_one(action, label, parameters)
+                for action in actions
+            }
+
+        app = current_app._get_current_object()
+        futures = {
+            action.id: self._get_pool(action.type.value).submit(
+                self._execute_in_context, app, action, label, parameters
+            )
+            for action in actions
+        }
+        response = {}
+        for action_id, future in futures.items():
+            try:
+                response[action_id] = future.result()
+            except Exception as error:
+                response[action_id] = {
+                    "error": error.__class__.__name__,
+                    "description": str(error),
+                }
+                current_app.logger.exception(f"{label}-{action_id}: {error}")
+        return response
+
+
+action_executor = ActionExecutor()
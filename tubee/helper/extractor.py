@@ -0,0 +1,251 @@
+"""youtube_dl Extraction Pool
+
+Run youtube_dl extract_info in separate worker processes, so a hung or slow
+extraction never blocks a web or Celery thread, and its CPU-bound work does
+not hold the GIL of the caller. Workers are plain subprocesses talking JSON
+lines over pipes, so the pool also works inside daemonic Celery workers.
+
+Each worker keeps a YoutubeDL instance per options warm between calls, and is
+killed when a call times out, or recycled after serving max_calls calls.
+Callers beyond the pool size wait in line, at most max_queue of them.
+
+Settings are read from config by init_app:
+    EXTRACTOR_POOL_SIZE {int} -- number of worker processes
+    EXTRACTOR_TIMEOUT {float} -- default seconds a call may take
+    EXTRACTOR_MAX_QUEUE {int} -- callers allowed to wait for a worker
+    EXTRACTOR_MAX_CALLS {int} -- calls served by a worker before recycling
+"""
+import atexit
+import json
+import os
+import selectors
+import subprocess
+import sys
+import threading
+import time
+
+DEFAULT_SETTINGS = {
+    "pool_size": 2,
+    "timeout": 60,
+    "max_queue": 16,
+    "max_calls": 100,
+}
+YOUTUBE_DL_OPTIONS = {
+    "skip_download": True,
+    "ignoreerrors": True,
+    "extract_flat": True,
+}
+# Run this file alone, so workers load youtube_dl only and not the app. Not
+# as a script, whose directory on sys.path would shadow stdlib http
+WORKER_COMMAND = [
+    sys.executable,
+    "-c",
+    f"import runpy; runpy.run_path({os.path.abspath(__file__)!r}, run_name='__main__')",
+]
+
+
+class ExtractorError(Exception):
+    """Extraction failed in worker"""
+
+
+class ExtractorTimeout(ExtractorError):
+    """Extraction did not finish in time, worker is killed"""
+
+
+class ExtractorBusy(ExtractorError):
+    """Too many callers are waiting for a worker"""
+
+
+class _Worker:
+    def __init__(self, command):
+        self.calls = 0
+        self.process = subprocess.Popen(
+            command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, bufsize=0
+        )
+
+    @property
+    def alive(self):
+        return self.process.poll() is None
+
+    def call(self, request, timeout):
+        self.calls += 1
+        self.process.stdin.write(json.dumps(request).encode("utf-8") + b"\n")
+        deadline = time.monotonic() + timeout
+        line = b""
+        with selectors.DefaultSelector() as selector:
+            selector.register(self.process.stdout, selectors.EVENT_READ)
+            while not line.endswith(b"\n"):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not selector.select(remaining):
+                    self.kill()
+                    raise ExtractorTimeout(f"Extraction took over {timeout}s")
+                chunk = os.read(self.process.stdout.fileno(), 65536)
+                if not chunk:
+                    self.kill()
+                    raise ExtractorError("Worker exited during extraction")
+                line += chunk
+        response = json.loads(line)
+        if "error" in response:
+            raise ExtractorError(response["error"])
+        return response["result"]
+
+    def kill(self):
+        if self.alive:
+            self.process.kill()
+        self.process.wait()
+        self.process.stdin.close()
+        self.process.stdout.close()
+
+
+class ExtractorPool:
+    """Pool of extraction worker processes
+
+    Keyword Arguments:
+        command {list} -- command line of a worker (default: {WORKER_COMMAND})
+        **settings {dict} -- overrides of DEFAULT_SETTINGS
+    """
+
+    def __init__(self, command=None, **settings):
+        self._lock = threading.Lock()
+        self._atexit = False
+        self.command = command or WORKER_COMMAND
+        self.settings = dict(DEFAULT_SETTINGS, **settings)
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._idle = []
+        self._busy = 0
+        self._waiting = 0
+        self._available = threading.Condition(self._lock)
+
+    def init_app(self, app):
+        """Load settings from app config"""
+        self.configure(
+            pool_size=app.config["EXTRACTOR_POOL_SIZE"],
+            timeout=app.config["EXTRACTOR_TIMEOUT"],
+            max_queue=app.config["EXTRACTOR_MAX_QUEUE"],
+            max_calls=app.config["EXTRACTOR_MAX_CALLS"],
+        )
+
+    def configure(self, **settings):
+        """Update settings, idle workers are replaced on next call"""
+        with self._lock:
+            self.settings.update(settings)
+        self.close()
+
+    def _acquire(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked, pipes of parent's workers are not ours
+                self._reset()
+            if not self._idle and self._busy >= self.settings["pool_size"]:
+                if self._waiting >= self.settings["max_queue"]:
+                    raise ExtractorBusy(f"{self._waiting} callers are waiting")
+                self._waiting += 1
+                try:
+                    while not self._idle and self._busy >= self.settings["pool_size"]:
+                        self._available.wait()
+                finally:
+                    self._waiting -= 1
+            self._busy += 1
+            worker = self._idle.pop() if self._idle else None
+            if not self._atexit:
+                atexit.register(self.close)
+                self._atexit = True
+        if worker is None or not worker.alive:
+            try:
+                worker = _Worker(self.command)
+            except Exception:
+                self._release(None)
+                raise
+        return worker
+
+    def _release(self, worker):
+        with self._lock:
+            self._busy -= 1
+            if worker is not None:
+                if worker.alive and worker.calls < self.settings["max_calls"]:
+                    self._idle.append(worker)
+                    worker = None
+            self._available.notify()
+        if worker is not None:
+            worker.kill()
+
+    def extract(self, url, options=None, timeout=None):
+        """Run YoutubeDL.extract_info in a worker
+
+        Arguments:
+            url {str} -- video ID or URL
+
+        Keyword Arguments:
+            options {dict} -- additional YoutubeDL options
+            timeout {float} -- seconds to wait, default to pool setting
+
+        Raises:
+            ExtractorBusy -- too many callers are waiting
+            ExtractorTimeout -- worker did not answer in time
+            ExtractorError -- worker failed
+
+        Returns:
+            dict -- info dict, None if youtube_dl ignored an error
+        """
+        timeout = timeout or self.settings["timeout"]
+        worker = self._acquire()
+        try:
+            return worker.call({"url": url, "options": options or {}}, timeout)
+        except ExtractorError:
+            raise
+        except Exception as error:
+            worker.kill()
+            raise ExtractorError(str(error)) from error
+        finally:
+            self._release(worker)
+
+    def close(self):
+        """Stop idle workers, busy workers are stopped when released"""
+        with self._lock:
+            if self._pid != os.getpid():
+                return
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            worker.kill()
+
+    def stats(self):
+        """Number of idle, busy and waiting callers"""
+        with self._lock:
+            return {
+                "idle": len(self._idle),
+                "busy": self._busy,
+                "waiting": self._waiting,
+            }
+
+
+def _serve():
+    """Worker loop, answer one JSON line per request line"""
+    import youtube_dl
+
+    # youtube_dl may print to stdout, keep it for responses only
+    output = os.fdopen(os.dup(sys.stdout.fileno()), "w", encoding="utf-8")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    services = {}
+    for line in sys.stdin:
+        request = json.loads(line)
+        key = json.dumps(request["options"], sort_keys=True)
+        try:
+            if key not in services:
+                services[key] = youtube_dl.YoutubeDL(
+                    dict(YOUTUBE_DL_OPTIONS, **request["options"])
+                )
+            result = services[key].extract_info(request["url"])
+            response = json.dumps({"result": result}, default=str)
+        except Exception as error:
+            response = json.dumps({"error": f"{error.__class__.__name__}: {error}"})
+        output.write(response + "\n")
+        output.flush()
+
+
+extractor_pool = ExtractorPool()
+
+if __name__ == "__main__":
+    _serve()
@@ -0,0 +1,116 @@
+"""YouTube Atom Feed Parser
+
+Parse the Atom payload pushed by hub when a channel uploads, updates or
+deletes a video.
+https://developers.google.com/youtube/v3/guides/push_notifications
+
+Variables:
+    NAMESPACES {dict} -- XML namespaces used in YouTube Atom payload
+"""
+import logging
+from io import BytesIO
+from typing import List, NamedTuple, Optional
+
+from lxml import etree
+
+NAMESPACES = {
+    "atom": "http://www.w3.org/2005/Atom",
+    "yt": "http://www.youtube.com/xml/schemas/2015",
+    "at": "http://purl.org/atompub/tombstones/1.0",
+}
+ENTRY_TAG = f"{{{NAMESPACES['atom']}}}entry"
+DELETED_ENTRY_TAG = f"{{{NAMESPACES['at']}}}deleted-entry"
+VIDEO_ID_PREFIX = "yt:video:"
+CHANNEL_URI_PREFIX = "/channel/"
+
+_video_id = etree.XPath("string(yt:videoId)", namespaces=NAMESPACES)
+_channel_id = etree.XPath("string(yt:channelId)", namespaces=NAMESPACES)
+_title = etree.XPath("string(atom:title)", namespaces=NAMESPACES)
+_published = etree.XPath("string(atom:published)", namespaces=NAMESPACES)
+_updated = etree.XPath("string(atom:updated)", namespaces=NAMESPACES)
+_deleted_by_uri = etree.XPath("string(at:by/atom:uri)", namespaces=NAMESPACES)
+
+logger = logging.getLogger("tubee.feed")
+
+
+class FeedEntry(NamedTuple):
+    """A video entry in hub notification
+
+    Timestamps are kept as the raw ISO 8601 strings sent by YouTube.
+
+    Variables:
+        video_id {str} -- ID of the video
+        channel_id {str} -- ID of the channel which owns the video
+        title {str} -- title of the video, None for deleted entry
+        published {str} -- when the video is published, None for deleted entry
+        updated {str} -- when the video is last modified or deleted
+        deleted {bool} -- the entry is a deleted-entry (tombstone)
+    """
+
+    video_id: str
+    channel_id: Optional[str]
+    title: Optional[str]
+    published: Optional[str]
+    updated: Optional[str]
+    deleted: bool = False
+
+
+def _parse_entry(element):
+    return FeedEntry(
+        video_id=_video_id(element) or None,
+        channel_id=_channel_id(element) or None,
+        title=_title(element) or None,
+        published=_published(element) or None,
+        updated=_updated(element) or None,
+    )
+
+
+def _parse_deleted_entry(element):
+    video_id = element.get("ref", "")
+    if video_id.startswith(VIDEO_ID_PREFIX):
+        video_id = video_id[len(VIDEO_ID_PREFIX) :]
+    uri = _deleted_by_uri(element)
+    channel_id = None
+    if CHANNEL_URI_PREFIX in uri:
+        channel_id = uri.rsplit(CHANNEL_URI_PREFIX, 1)[1] or None
+    return FeedEntry(
+        video_id=video_id or None,
+        channel_id=channel_id,
+        title=None,
+        published=None,
+        updated=element.get("when"),
+        deleted=True,
+    )
+
+
+def parse_notification(data) -> List[FeedEntry]:
+    """Extract entries from a hub notification
+
+    Arguments:
+        data {str or bytes} -- Atom payload received from hub
+
+    Returns:
+        list -- FeedEntry of each entry, in document order. If the payload is
+                not a valid XML document, entries parsed before the error.
+    """
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    entries = []
+    context = etree.iterparse(
+        BytesIO(data),
+        events=("end",),
+        tag=(ENTRY_TAG, DELETED_ENTRY_TAG),
+        resolve_entities=False,
+        no_network=True,
+        huge_tree=False,
+    )
+    try:
+        for _, element in context:
+            if element.tag == ENTRY_TAG:
+                entries.append(_parse_entry(element))
+            else:
+                entries.append(_parse_deleted_entry(element))
+            element.clear()
+    except etree.XMLSyntaxError as error:
+        logger.warning(f"Notification parsed {len(entries)} entries until {error}")
+    return [entry for entry in entries if entry.video_id]
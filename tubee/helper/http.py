@@ -0,0 +1,172 @@
+"""Outbound HTTP Client
+
+A shared requests.Session for every outbound call of the app (hub, image
+download, token revocation), which keeps alive a connection pool per host and
+never waits on a remote endpoint without timeout.
+
+Idempotent requests are retried with exponential backoff on connection error,
+timeout or a retryable status code. Request count, error count and latency are
+recorded per host.
+
+Settings are read from config by init_app:
+    HTTP_CONNECT_TIMEOUT {float} -- seconds to establish a connection
+    HTTP_READ_TIMEOUT {float} -- seconds to wait between bytes received
+    HTTP_RETRIES {int} -- additional attempts of an idempotent request
+    HTTP_RETRY_BACKOFF {float} -- base seconds of exponential backoff
+    HTTP_POOL_CONNECTIONS {int} -- number of hosts kept in pool
+    HTTP_POOL_MAXSIZE {int} -- connections kept alive per host
+"""
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_SETTINGS = {
+    "connect_timeout": 3.05,
+    "read_timeout": 30,
+    "retries": 2,
+    "retry_backoff": 0.5,
+    "pool_connections": 10,
+    "pool_maxsize": 10,
+}
+IDEMPOTENT_METHODS = frozenset(["GET", "HEAD", "OPTIONS", "PUT", "DELETE"])
+RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+
+
+class HTTPClient:
+    """Pooled HTTP client with timeouts, retries and per-host counters
+
+    Keyword Arguments:
+        **settings {dict} -- overrides of DEFAULT_SETTINGS
+    """
+
+    def __init__(self, **settings):
+        self._lock = threading.Lock()
+        self._session = None
+        self._stats = {}
+        self.settings = dict(DEFAULT_SETTINGS, **settings)
+
+    def init_app(self, app):
+        """Load settings from app config and reset connection pool"""
+        self.configure(
+            connect_timeout=app.config["HTTP_CONNECT_TIMEOUT"],
+            read_timeout=app.config["HTTP_READ_TIMEOUT"],
+            retries=app.config["HTTP_RETRIES"],
+            retry_backoff=app.config["HTTP_RETRY_BACKOFF"],
+            pool_connections=app.config["HTTP_POOL_CONNECTIONS"],
+            pool_maxsize=app.config["HTTP_POOL_MAXSIZE"],
+        )
+
+    def configure(self, **settings):
+        """Update settings, connection pool is rebuilt on next request"""
+        with self._lock:
+            self.settings.update(settings)
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+    @property
+    def session(self):
+        """requests.Session -- shared session, built on first use"""
+        with self._lock:
+            if self._session is None:
+                adapter = HTTPAdapter(
+                    pool_connections=self.settings["pool_connections"],
+                    pool_maxsize=self.settings["pool_maxsize"],
+                    max_retries=0,
+                )
+                session = requests.Session()
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._session = session
+            return self._session
+
+    @property
+    def timeout(self):
+        """tuple -- default (connect, read) timeout"""
+        return (self.settings["connect_timeout"], self.settings["read_timeout"])
+
+    def _record(self, host, elapsed, error=False, retry=False):
+        with self._lock:
+            stats = self._stats.setdefault(
+                host,
+                {
+                    "requests": 0,
+                    "errors": 0,
+                    "retries": 0,
+                    "time": 0.0,
+                    "max_time": 0.0,
+                },
+            )
+            stats["requests"] += 1
+            stats["errors"] += int(error)
+            stats["retries"] += int(retry)
+            stats["time"] += elapsed
+            stats["max_time"] = max(stats["max_time"], elapsed)
+
+    def request(self, method, url, idempotent=None, **kwargs):
+        """Send a request through the shared session
+
+        Arguments:
+            method {str} -- HTTP method
+            url {str} -- URL to request
+
+        Keyword Arguments:
+            idempotent {bool} -- allow retry, default to True for idempotent
+                                 HTTP methods
+            **kwargs {dict} -- passed to requests.Session.request, timeout
+                               defaults to configured (connect, read) timeout
+
+        Raises:
+            requests.RequestException -- Raised when the last attempt failed
+
+        Returns:
+            requests.Response -- response of the last attempt
+        """
+        method = method.upper()
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+        kwargs.setdefault("timeout", self.timeout)
+        retries = self.settings["retries"] if idempotent else 0
+        host = urlparse(url).netloc
+        for attempt in range(retries + 1):
+            retryable = attempt < retries
+            start = time.perf_counter()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                self._record(host, time.perf_counter() - start, True, retryable)
+                if not retryable:
+                    raise
+            else:
+                failed = response.status_code in RETRY_STATUSES
+                self._record(
+                    host, time.perf_counter() - start, failed, failed and retryable
+                )
+                if not (failed and retryable):
+                    return response
+                response.close()
+            time.sleep(self.settings["retry_backoff"] * 2 ** attempt)
+
+    def get(self, url, **kwargs):
+        """Send a GET request, see request"""
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        """Send a POST request, see request"""
+        return self.request("POST", url, **kwargs)
+
+    def stats(self):
+        """Counters of each host
+
+        Returns:
+            dict -- requests, errors, retries, time and max_time (in seconds)
+                    of requests sent, keyed by host
+        """
+        with self._lock:
+            return {host: dict(stats) for host, stats in self._stats.items()}
+
+
+http_client = HTTPClient()
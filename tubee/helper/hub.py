@@ -13,16 +13,42 @@ Variables:
                                   request to hub
 """
 import re
+from datetime import datetime, timedelta, timezone
 from urllib.parse import urljoin, urlparse
 
-import bs4
-import requests
 from dateutil.parser import parse
+from lxml import etree
+
+from .http import http_client
 
 DEFAULT_HEADERS = {
     "Content-Type": "application/x-www-form-urlencoded; charset=utf-8",
 }
 REQUIRED_PARAMETERS = ["hub.callback", "hub.mode", "hub.topic"]
+DETAILS_LABELS = {
+    "State": "state",
+    "Aggregate statistics": "stat",
+    "Last successful verification": "last_challenge",
+    "Expiration time": "expiration",
+    "Last subscribe request": "last_subscribe",
+    "Last unsubscribe request": "last_unsubscribe",
+    "Last verification error": "last_challenge_error",
+    "Last delivery error": "last_notification_error",
+    "Content delivered": "last_notification",
+}
+SUMMARY_FIELDS = ["last_challenge_error", "last_notification_error"]
+MONTHS = {
+    month: index + 1
+    for index, month in enumerate(
+        "Jan Feb Mar Apr May Jun Jul Aug Sep Oct Nov Dec".split()
+    )
+}
+# RFC 2822 date used by hub, e.g. "Sun, 19 Jul 2020 10:34:26 +0000"
+TIMESTAMP_PATTERN = re.compile(
+    r"\w{3}, (\d{1,2}) (\w{3}) (\d{4}) (\d{2}):(\d{2}):(\d{2}) ([+-])(\d{2})(\d{2})$"
+)
+
+_details_terms = etree.XPath("//dl/dt")
 
 
 class MissingRequiredParameterError(Exception):
@@ -63,11 +89,12 @@ def _formal_post_request(hub, endpoint, **data):
     if callback_scheme == "http" and data["hub.secret"]:
         raise NonSecureHubSecretError()
 
-    # Sending Requests
-    response = requests.post(
-        url=urljoin(hub, endpoint),
+    # Sending Requests, (un)subscribe request is idempotent to hub
+    response = http_client.post(
+        urljoin(hub, endpoint),
         headers=DEFAULT_HEADERS,
         data=data,
+        idempotent=True,
     )
     response.raise_for_status()
     return response
@@ -82,8 +109,8 @@ def _formal_get_request(hub, endpoint, **params):
     Optional Parameters:
     hub.secret              Subscriber-provided secret string
     """
-    response = requests.get(
-        url=urljoin(hub, endpoint),
+    response = http_client.get(
+        urljoin(hub, endpoint),
         headers=DEFAULT_HEADERS,
         params=params,
     )
@@ -91,15 +118,97 @@ def _formal_get_request(hub, endpoint, **params):
     return response
 
 
-def _parse_detail(query, fuzzy=False):
+class HubDetails:
+    """Subscription details reported by hub
+
+    Timestamps are timezone-aware datetime, or None if not available.
+    last_challenge_error and last_notification_error are (datetime, summary).
+
+    Variables:
+        requests_url {str} -- URL of the details page
+        response_object {requests.Response} -- response of the details page
+        state {str} -- state of the subscription, e.g. verified
+        stat {str} -- aggregate delivery statistics
+        last_challenge {datetime} -- last successful verification
+        expiration {datetime} -- when subscription expires
+        last_subscribe {datetime} -- last subscribe request
+        last_unsubscribe {datetime} -- last unsubscribe request
+        last_challenge_error {tuple} -- last verification error
+        last_notification_error {tuple} -- last delivery error
+        last_notification {datetime} -- last content delivered
+    """
+
+    __slots__ = ["requests_url", "response_object"] + list(DETAILS_LABELS.values())
+
+    def __init__(self, **fields):
+        for field in self.__slots__:
+            setattr(self, field, fields.get(field))
+
+    def __repr__(self):
+        return f"<HubDetails {self.state} until {self.expiration}>"
+
+    def as_dict(self):
+        """Fields in a dict, in the order of __slots__"""
+        return {field: getattr(self, field) for field in self.__slots__}
+
+
+def _parse_timestamp(text):
+    """Parse timestamp in hub format, falling back to dateutil"""
+    if not text or text == "n/a":
+        return None
+    match = TIMESTAMP_PATTERN.match(text)
+    if match and match.group(2) in MONTHS:
+        day, month, year, hour, minute, second, sign, tz_hour, tz_minute = (
+            match.groups()
+        )
+        offset = timedelta(hours=int(tz_hour), minutes=int(tz_minute))
+        return datetime(
+            int(year),
+            MONTHS[month],
+            int(day),
+            int(hour),
+            int(minute),
+            int(second),
+            tzinfo=timezone(-offset if sign == "-" else offset),
+        )
     try:
-        parsed_datetime = parse(query, fuzzy=fuzzy)
-    except ValueError:
-        parsed_datetime = None
-    if not fuzzy or not parsed_datetime:
-        return parsed_datetime
-    summary = re.search(r"\((.*)\)", query).groups()[0]
-    return (parsed_datetime, summary)
+        return parse(text, fuzzy=True)
+    except (ValueError, OverflowError):
+        return None
+
+
+def _parse_summary(text):
+    """Parse "<timestamp> (<summary>)" into (datetime, summary)"""
+    text, _, summary = text.partition(" (")
+    parsed_datetime = _parse_timestamp(text)
+    if not parsed_datetime:
+        return None
+    return (parsed_datetime, summary[:-1] if summary.endswith(")") else summary)
+
+
+def parse_details(text):
+    """Parse subscription-details page of hub
+
+    Arguments:
+        text {str} -- HTML of the page
+
+    Returns:
+        HubDetails -- fields found in page, missing ones are None
+    """
+    fields = {}
+    for term in _details_terms(etree.HTML(text)):
+        field = DETAILS_LABELS.get((term.text or "").strip())
+        description = term.getnext()
+        if field is None or description is None or description.tag != "dd":
+            continue
+        value = (description.text or "").strip("\n ")
+        if field in ("state", "stat"):
+            fields[field] = value
+        elif field in SUMMARY_FIELDS:
+            fields[field] = _parse_summary(value)
+        else:
+            fields[field] = _parse_timestamp(value)
+    return HubDetails(**fields)
 
 
 def subscribe(hub_url, callback_url, topic_url, **kwargs):
@@ -149,23 +258,7 @@ def details(hub_url, callback_url, topic_url, **kwargs):
         "hub.secret": kwargs.get("secret"),
     }
     response = _formal_get_request(hub_url, "subscription-details", **params)
-    parsed = bs4.BeautifulSoup(response.text, "lxml").find_all("dd")
-    results = {
-        "requests_url": response.url,
-        "response_object": response,
-        "state": parsed[1].string,
-        "stat": parsed[8].string.strip("\n "),
-    }
-    FIELDS = [
-        "last_challenge",
-        "expiration",
-        "last_subscribe",
-        "last_unsubscribe",
-        "last_challenge_error",
-        "last_notification_error",
-        "last_notification",
-    ]
-    for key, index in zip(FIELDS, list(range(2, 10)) + [10]):
-        fuzzy = bool(index == 6 or index == 7)
-        results[key] = _parse_detail(parsed[index].string, fuzzy=fuzzy)
-    return results
+    results = parse_details(response.text)
+    results.requests_url = response.url
+    results.response_object = response
+    return results.as_dict()
@@ -0,0 +1,120 @@
+"""Concurrent PubSubHubbub Communication
+
+Run subscribe, unsubscribe or details of many topics at once, on an asyncio
+event loop. Each request is sent by helper.hub through the shared HTTP
+client on a worker thread, while the loop bounds how many requests are in
+flight and spaces requests to the same hub host.
+
+Results are keyed by topic URL and have the same shape as the sync
+functions. A request that raised is represented by its exception, so one
+failed topic does not abort the others.
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from urllib.parse import urlparse
+
+from . import hub
+
+DEFAULT_CONCURRENCY = 10
+
+
+class HostRateLimiter:
+    """Space requests to the same host at most rate per second
+
+    Arguments:
+        rate {float} -- requests per second of each host, None for unlimited
+    """
+
+    def __init__(self, rate=None):
+        self.interval = 1 / rate if rate else 0
+        self._next_slot = {}
+        self._lock = None
+
+    async def acquire(self, url):
+        """Wait until next request to the host of url may be sent"""
+        if not self.interval:
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        host = urlparse(url).netloc
+        async with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+async def _run(func, hub_url, pairs, concurrency, rate, kwargs):
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+    limiter = HostRateLimiter(rate)
+
+    async def _call(callback_url, topic_url):
+        async with semaphore:
+            await limiter.acquire(hub_url)
+            try:
+                return await loop.run_in_executor(
+                    executor,
+                    partial(func, hub_url, callback_url, topic_url, **kwargs),
+                )
+            except Exception as error:
+                return error
+
+    with ThreadPoolExecutor(
+        max_workers=concurrency, thread_name_prefix="tubee-hub"
+    ) as executor:
+        results = await asyncio.gather(
+            *[_call(callback_url, topic_url) for callback_url, topic_url in pairs]
+        )
+    return {topic_url: result for (_, topic_url), result in zip(pairs, results)}
+
+
+def _run_many(func, hub_url, pairs, concurrency, rate, kwargs):
+    pairs = list(pairs)
+    if not pairs:
+        return {}
+    concurrency = max(1, min(concurrency or DEFAULT_CONCURRENCY, len(pairs)))
+    return asyncio.run(_run(func, hub_url, pairs, concurrency, rate, kwargs))
+
+
+def subscribe_many(
+    hub_url, pairs, concurrency=DEFAULT_CONCURRENCY, rate=None, **kwargs
+):
+    """Subscribe many topics concurrently
+
+    Arguments:
+        hub_url {str} -- URL of hub
+        pairs {iterable} -- (callback_url, topic_url) of each subscription
+
+    Keyword Arguments:
+        concurrency {int} -- maximum requests in flight (default: {10})
+        rate {float} -- maximum requests per second to hub (default: {None})
+        **kwargs {dict} -- passed to hub.subscribe
+
+    Returns:
+        dict -- response (or exception) of hub.subscribe, keyed by topic URL
+    """
+    return _run_many(hub.subscribe, hub_url, pairs, concurrency, rate, kwargs)
+
+
+def unsubscribe_many(
+    hub_url, pairs, concurrency=DEFAULT_CONCURRENCY, rate=None, **kwargs
+):
+    """Unsubscribe many topics concurrently, see subscribe_many
+
+    Returns:
+        dict -- response (or exception) of hub.unsubscribe, keyed by topic URL
+    """
+    return _run_many(hub.unsubscribe, hub_url, pairs, concurrency, rate, kwargs)
+
+
+def details_many(hub_url, pairs, concurrency=DEFAULT_CONCURRENCY, rate=None, **kwargs):
+    """Query subscription details of many topics concurrently, see subscribe_many
+
+    Returns:
+        dict -- results (or exception) of hub.details, keyed by topic URL
+    """
+    return _run_many(hub.details, hub_url, pairs, concurrency, rate, kwargs)
@@ -0,0 +1,137 @@
+"""YouTube API Key Pool
+
+Spread requests made with a developer key across the keys of several
+projects, so unauthenticated traffic is not capped by a single project's
+daily quota. A key is chosen per request, weighted by the units it has left
+today, and a key which answers quotaExceeded is taken out of rotation until
+the quota resets at midnight Pacific Time.
+
+Usage is counted in the process, so weights are an estimate when several
+processes share the keys. A key exhausted by another process is found out on
+its first quotaExceeded answer.
+
+Settings are read from config:
+    YOUTUBE_API_DEVELOPER_KEYS {list} -- keys in rotation
+    YOUTUBE_API_KEY_DAILY_LIMIT {int} -- units granted per key per day
+"""
+import json
+import random
+import threading
+from datetime import datetime, timedelta
+
+from dateutil import tz
+from flask import current_app
+
+QUOTA_TIMEZONE = tz.gettz("America/Los_Angeles")
+QUOTA_EXCEEDED_REASONS = frozenset(["quotaExceeded", "dailyLimitExceeded"])
+
+
+def quota_day(now=None):
+    """Day of YouTube quota, which resets at midnight Pacific Time"""
+    return (now or datetime.now(tz.UTC)).astimezone(QUOTA_TIMEZONE).date()
+
+
+def seconds_until_reset(now=None):
+    """Seconds until YouTube quota resets"""
+    now = (now or datetime.now(tz.UTC)).astimezone(QUOTA_TIMEZONE)
+    midnight = datetime.combine(
+        now.date() + timedelta(days=1), datetime.min.time(), tzinfo=QUOTA_TIMEZONE
+    )
+    return (midnight - now).total_seconds()
+
+
+def error_reason(error):
+    """Reason of a googleapiclient HttpError, None if it is not given"""
+    try:
+        return json.loads(error.content)["error"]["errors"][0]["reason"]
+    except (ValueError, KeyError, IndexError, TypeError):
+        return None
+
+
+class KeyPool:
+    """Usage, errors and availability of each developer key"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._day = None
+        self._keys = {}
+
+    def _state(self, key):
+        return self._keys.setdefault(
+            key, {"calls": 0, "units": 0, "errors": 0, "exhausted": False}
+        )
+
+    def _refresh(self):
+        day = quota_day()
+        if day != self._day:
+            # Quota has reset, every key is back in rotation
+            self._day = day
+            self._keys = {}
+        return current_app.config["YOUTUBE_API_DEVELOPER_KEYS"]
+
+    def choose(self, cost=1, exclude=()):
+        """Pick a key weighted by units it has left today, and charge it
+
+        Keyword Arguments:
+            cost {int} -- units of the request (default: {1})
+            exclude {iterable} -- keys already tried by the request
+
+        Returns:
+            str -- the key, None if every key is exhausted
+        """
+        limit = current_app.config["YOUTUBE_API_KEY_DAILY_LIMIT"]
+        with self._lock:
+            candidates = {}
+            for key in self._refresh():
+                state = self._state(key)
+                if key in exclude or state["exhausted"]:
+                    continue
+                # Keep a little weight on keys over estimate, they may still work
+                candidates[key] = max(limit - state["units"], 1)
+            if not candidates:
+                return None
+            key = random.choices(list(candidates), weights=list(candidates.values()))[0]
+            state = self._state(key)
+            state["calls"] += 1
+            state["units"] += cost
+            return key
+
+    def refund(self, key, cost=1):
+        """Give back units charged to a key by choose, for a request not sent"""
+        with self._lock:
+            self._refresh()
+            state = self._state(key)
+            state["calls"] = max(state["calls"] - 1, 0)
+            state["units"] = max(state["units"] - cost, 0)
+
+    def report_error(self, key, error):
+        """Count an error of a key, take it out of rotation on quotaExceeded
+
+        Arguments:
+            key {str} -- key used by the failed request
+            error {googleapiclient.errors.HttpError} -- the error
+
+        Returns:
+            bool -- True if the key is exhausted
+        """
+        reason = error_reason(error)
+        with self._lock:
+            self._refresh()
+            state = self._state(key)
+            state["errors"] += 1
+            if reason in QUOTA_EXCEEDED_REASONS:
+                state["exhausted"] = True
+        if state["exhausted"]:
+            current_app.logger.warning(
+                f"YouTube API key ...{key[-4:]}: {reason}, out of rotation today"
+            )
+        return state["exhausted"]
+
+    def stats(self):
+        """State of each key, identified by its last 4 characters"""
+        with self._lock:
+            keys = self._refresh()
+            return {f"...{key[-4:]}": dict(self._state(key)) for key in keys}
+
+
+key_pool = KeyPool()
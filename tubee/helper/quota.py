@@ -0,0 +1,453 @@
+"""YouTube Data API Quota
+
+Every YouTube Data API request is sent by execute, which charges its cost to
+the token bucket of a work class, and records it in a ledger persisted per
+quota day (which starts at midnight Pacific Time), endpoint, caller and work
+class (QuotaUsage).
+
+Work classes share the daily quota:
+    interactive -- requests made by a user waiting for the response, never
+                   deferred, may overdraw its bucket
+    renewal -- periodic refresh of channel information
+    backfill -- fetching videos of channels
+    action -- video metadata and actions of new videos
+A background request whose bucket is empty raises QuotaExceeded with the
+seconds to wait, so its task can be deferred. Buckets only pace requests of
+a process; the daily share of a work class is checked against units spent
+today by every process, read from the ledger every flush interval.
+
+The work class and caller of a request are taken from quota_context, or
+default to interactive and view endpoint within a request, backfill otherwise.
+
+Requests made with a developer key are sent with a key of the key pool, and
+resent with another key if the first one has run out of quota. Their list
+responses are revalidated with ETag (see helper.etag_cache). Each attempt is
+sent by helper.resilience.call, which retries transient failures and fails
+fast while the API is unhealthy.
+
+Settings are read from config:
+    QUOTA_DAILY_LIMIT {int} -- units granted per day
+    QUOTA_BUDGETS {dict} -- share of daily limit of each work class
+    QUOTA_BURST {float} -- fraction of daily share a bucket can hold
+    QUOTA_FLUSH_INTERVAL {float} -- seconds ledger entries are kept in memory
+
+Variables:
+    QUOTA_COSTS {dict} -- units of each API method, keyed by method id
+"""
+import atexit
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from urllib.parse import parse_qs, urlencode, urlparse
+
+from flask import current_app, has_request_context, request
+from googleapiclient.errors import HttpError
+from sqlalchemy import and_, bindparam, func, select
+
+from .. import db
+from ..exceptions import CircuitOpen, QuotaExceeded
+from .etag_cache import etag_cache
+from .key_pool import key_pool, quota_day, seconds_until_reset
+from .resilience import call, circuit_breaker, latency_histogram
+from .sql import insert_ignore
+
+QUOTA_COSTS = {
+    "youtube.channels.list": 1,
+    "youtube.playlistItems.insert": 50,
+    "youtube.playlistItems.list": 1,
+    "youtube.search.list": 100,
+    "youtube.subscriptions.list": 1,
+    "youtube.videos.list": 1,
+}
+DEFAULT_COST = 1
+WORK_CLASSES = ("interactive", "renewal", "backfill", "action")
+BURN_RATE_WINDOW = 60 * 5
+
+_context = threading.local()
+
+
+@contextmanager
+def quota_context(work_class, caller=None):
+    """Charge YouTube API calls made within to a work class
+
+    Arguments:
+        work_class {str} -- one of WORK_CLASSES
+
+    Keyword Arguments:
+        caller {str} -- name recorded in ledger, default to outer caller
+    """
+    previous = getattr(_context, "value", None)
+    _context.value = (work_class, caller or (previous[1] if previous else None))
+    try:
+        yield
+    finally:
+        _context.value = previous
+
+
+def current_context():
+    """Work class and caller of current thread
+
+    Returns:
+        tuple -- work class and caller
+    """
+    work_class, caller = getattr(_context, "value", None) or (None, None)
+    if has_request_context():
+        return work_class or "interactive", caller or request.endpoint or "request"
+    return work_class or "backfill", caller or "unknown"
+
+
+class TokenBucket:
+    """Tokens refilled at a constant rate up to capacity
+
+    Arguments:
+        rate {float} -- tokens added per second
+        capacity {float} -- maximum tokens held
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def consume(self, amount, overdraw=False):
+        """Take tokens
+
+        Arguments:
+            amount {float} -- tokens to take
+
+        Keyword Arguments:
+            overdraw {bool} -- take tokens even if not enough (default: {False})
+
+        Returns:
+            float -- 0 if taken, otherwise seconds until enough tokens
+        """
+        self._refill()
+        if self.tokens >= amount or overdraw:
+            self.tokens -= amount
+            return 0
+        if not self.rate:
+            return float("inf")
+        return (amount - self.tokens) / self.rate
+
+    def level(self):
+        """Tokens currently held"""
+        self._refill()
+        return self.tokens
+
+
+class QuotaLedger:
+    """Per-process token buckets and buffered ledger of quota usage"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._atexit = False
+        self._buckets = {}
+        self._pending = {}
+        self._events = deque()
+        self._flushed_at = time.monotonic()
+        # Units spent today by every process, as of last read of ledger
+        self._used = {}
+        self._used_day = None
+        self._used_at = 0
+
+    @staticmethod
+    def _budget(work_class):
+        config = current_app.config
+        return config["QUOTA_DAILY_LIMIT"] * config["QUOTA_BUDGETS"][work_class]
+
+    def _bucket(self, work_class):
+        daily = self._budget(work_class)
+        rate = daily / (60 * 60 * 24)
+        capacity = daily * current_app.config["QUOTA_BURST"]
+        bucket = self._buckets.get(work_class)
+        if bucket is None or (bucket.rate, bucket.capacity) != (rate, capacity):
+            bucket = self._buckets[work_class] = TokenBucket(rate, capacity)
+        return bucket
+
+    def charge(self, endpoint, cost, work_class, caller):
+        """Take cost from bucket of work class and record it
+
+        Arguments:
+            endpoint {str} -- API method id
+            cost {int} -- units of the call
+            work_class {str} -- one of WORK_CLASSES
+            caller {str} -- name recorded in ledger
+
+        Raises:
+            QuotaExceeded -- daily share or bucket of a background work class
+                             is exhausted
+        """
+        self._refresh_used()
+        budget = self._budget(work_class)
+        with self._lock:
+            if (
+                work_class != "interactive"
+                and self._used_today(work_class) + cost > budget
+            ):
+                wait = seconds_until_reset()
+            else:
+                wait = self._bucket(work_class).consume(
+                    cost, overdraw=work_class == "interactive"
+                )
+        if wait:
+            raise QuotaExceeded(work_class, wait)
+        self.record(endpoint, cost, work_class, caller)
+
+    def refund(self, endpoint, cost, work_class, caller):
+        """Give back cost taken by charge, for a call which was not sent"""
+        with self._lock:
+            bucket = self._bucket(work_class)
+            bucket.tokens = min(bucket.capacity, bucket.tokens + cost)
+        self.record(endpoint, -cost, work_class, caller, calls=-1)
+
+    def _used_today(self, work_class):
+        """Units spent today by work class, with entries not flushed yet"""
+        pending = sum(
+            units
+            for (date, _, _, entry_class), (_, units) in self._pending.items()
+            if date == self._used_day and entry_class == work_class
+        )
+        return self._used.get(work_class, 0) + pending
+
+    def _refresh_used(self):
+        """Read units spent today by every process, once per flush interval"""
+        from ..models import QuotaUsage
+
+        day = quota_day()
+        now = time.monotonic()
+        with self._lock:
+            if (
+                day == self._used_day
+                and now - self._used_at < current_app.config["QUOTA_FLUSH_INTERVAL"]
+            ):
+                return
+            self._used_at = now
+        try:
+            with db.engine.begin() as connection:
+                rows = connection.execute(
+                    select([QuotaUsage.work_class, func.sum(QuotaUsage.units)])
+                    .where(QuotaUsage.date == day)
+                    .group_by(QuotaUsage.work_class)
+                ).fetchall()
+        except Exception:
+            current_app.logger.exception("Quota ledger: usage of today not read")
+            with self._lock:
+                if day != self._used_day:
+                    # Never hold usage of yesterday against today
+                    self._used_day, self._used = day, {}
+            return
+        with self._lock:
+            self._used_day = day
+            self._used = {work_class: int(units or 0) for work_class, units in rows}
+
+    def record(self, endpoint, cost, work_class, caller, calls=1):
+        """Add a call to ledger, written to database every flush interval"""
+        key = (quota_day(), endpoint, caller[:64], work_class)
+        now = time.monotonic()
+        with self._lock:
+            pending_calls, pending_units = self._pending.get(key, (0, 0))
+            self._pending[key] = (pending_calls + calls, pending_units + cost)
+            self._events.append((now, work_class, cost))
+            while self._events and self._events[0][0] < now - BURN_RATE_WINDOW:
+                self._events.popleft()
+            due = now - self._flushed_at >= current_app.config["QUOTA_FLUSH_INTERVAL"]
+            if not self._atexit:
+                atexit.register(self.close, current_app._get_current_object())
+                self._atexit = True
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Write buffered ledger entries, on a connection of their own
+
+        Returns:
+            int -- number of ledger rows updated
+        """
+        from ..models import QuotaUsage
+
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._flushed_at = time.monotonic()
+        if not pending:
+            return 0
+        table = QuotaUsage.__table__
+        keys = ["date", "endpoint", "caller", "work_class"]
+        rows = [dict(zip(keys, key), calls=0, units=0) for key in pending]
+        increments = [
+            dict({f"_{k}": v for k, v in zip(keys, key)}, _calls=calls, _units=units)
+            for key, (calls, units) in pending.items()
+        ]
+        try:
+            with db.engine.begin() as connection:
+                insert_ignore(table, rows, connection=connection)
+                connection.execute(
+                    table.update()
+                    .where(
+                        and_(*[table.c[key] == bindparam(f"_{key}") for key in keys])
+                    )
+                    .values(
+                        calls=table.c.calls + bindparam("_calls"),
+                        units=table.c.units + bindparam("_units"),
+                    ),
+                    increments,
+                )
+        except Exception:
+            # Ledger is for accounting only, buckets are already charged
+            current_app.logger.exception(
+                f"Quota ledger: {len(rows)} rows dropped, flush failed"
+            )
+            return 0
+        with self._lock:
+            # Written units count until usage of today is read again
+            for (date, _, _, work_class), (_, units) in pending.items():
+                if date == self._used_day:
+                    self._used[work_class] = self._used.get(work_class, 0) + units
+        return len(rows)
+
+    def close(self, app=None):
+        """Write buffered ledger entries, called on interpreter exit"""
+        with (app or current_app._get_current_object()).app_context():
+            self.flush()
+
+    def stats(self):
+        """Bucket level and burn rate of each work class in this process
+
+        Returns:
+            dict -- keyed by work class, units used today by every process,
+                    burn rate in units per minute over the last
+                    BURN_RATE_WINDOW seconds
+        """
+        now = time.monotonic()
+        stats = {}
+        with self._lock:
+            for work_class in WORK_CLASSES:
+                bucket = self._bucket(work_class)
+                spent = sum(
+                    cost
+                    for timestamp, event_class, cost in self._events
+                    if event_class == work_class and timestamp >= now - BURN_RATE_WINDOW
+                )
+                stats[work_class] = {
+                    "used": self._used_today(work_class),
+                    "budget": self._budget(work_class),
+                    "tokens": round(bucket.level(), 2),
+                    "capacity": bucket.capacity,
+                    "burn_rate": spent / (BURN_RATE_WINDOW / 60),
+                }
+        return stats
+
+
+quota_ledger = QuotaLedger()
+
+
+def execute(request, work_class=None, caller=None, cost=None):
+    """Send a YouTube API request, charged to a work class
+
+    Arguments:
+        request {googleapiclient.http.HttpRequest} -- request to be sent
+
+    Keyword Arguments:
+        work_class {str} -- default to current context
+        caller {str} -- default to current context
+        cost {int} -- units of the call, default to QUOTA_COSTS
+
+    Raises:
+        QuotaExceeded -- bucket of a background work class is empty, or every
+                         developer key has run out of quota
+        CircuitOpen -- API is unhealthy, request is not sent
+
+    Returns:
+        dict -- response of the request
+    """
+    retry_after = circuit_breaker.retry_after()
+    if retry_after:
+        # Fail fast before anything is charged
+        raise CircuitOpen(retry_after)
+    context_class, context_caller = current_context()
+    work_class = work_class or context_class
+    caller = caller or context_caller
+    endpoint = getattr(request, "methodId", None)
+    if not isinstance(endpoint, str):
+        endpoint = "unknown"
+    cost = cost or QUOTA_COSTS.get(endpoint, DEFAULT_COST)
+    quota_ledger.charge(endpoint, cost, work_class, caller)
+    try:
+        return _send(request, endpoint, cost, work_class)
+    except CircuitOpen:
+        # Circuit opened since checked, nothing was sent
+        quota_ledger.refund(endpoint, cost, work_class, caller)
+        raise
+
+
+def _send(request, endpoint, cost, work_class):
+    """Execute request, with a key of the pool if it is made with developer key"""
+    uri = urlparse(str(request.uri))
+    query = parse_qs(uri.query)
+    if "key" not in query:
+        # Authorized by user credentials
+        return call(request, endpoint)
+    cache_key = etag_cache.key(request, query)
+    cached = etag_cache.prepare(request, cache_key) if cache_key else None
+    tried = set()
+    while True:
+        key = key_pool.choose(cost, exclude=tried)
+        if key is None:
+            raise QuotaExceeded(work_class, seconds_until_reset())
+        query["key"] = [key]
+        request.uri = uri._replace(query=urlencode(query, doseq=True)).geturl()
+        try:
+            response = call(request, endpoint)
+        except CircuitOpen:
+            key_pool.refund(key, cost)
+            raise
+        except HttpError as error:
+            if cached is not None and error.resp.status == 304:
+                return etag_cache.hit(endpoint, cached)
+            if not key_pool.report_error(key, error):
+                raise
+            tried.add(key)
+            continue
+        if cache_key:
+            return etag_cache.store(endpoint, cache_key, response, cached)
+        return response
+
+
+def usage_report(date=None):
+    """Usage of a day, from ledger of every process
+
+    Keyword Arguments:
+        date {datetime.date} -- day of usage (default: {today in Pacific Time})
+
+    Returns:
+        dict -- units used, limit, average burn rate of the day in units per
+                minute, rows of the ledger, and live state of this process
+    """
+    from ..models import QuotaUsage
+
+    quota_ledger.flush()
+    today = quota_day()
+    date = date or today
+    rows = QuotaUsage.query.filter_by(date=date).order_by(QuotaUsage.units.desc()).all()
+    used = sum(row.units for row in rows)
+    elapsed = 60 * 60 * 24
+    if date == today:
+        elapsed -= seconds_until_reset()
+    return {
+        "date": date.isoformat(),
+        "limit": current_app.config["QUOTA_DAILY_LIMIT"],
+        "used": used,
+        "burn_rate": used / max(elapsed, 60) * 60,
+        "usage": [dict(row, date=row.date.isoformat()) for row in rows],
+        "work_classes": quota_ledger.stats(),
+        "keys": key_pool.stats(),
+        "etag_cache": etag_cache.stats(),
+        "circuit": circuit_breaker.stats(),
+        "latency": latency_histogram.stats(),
+    }
@@ -0,0 +1,245 @@
+"""Resilient YouTube API Calls
+
+Every YouTube Data API request is sent by call, which retries transient
+failures (5xx answers, backendError and alike reasons, network errors) with
+jittered exponential backoff, and times each attempt into a latency
+histogram per endpoint.
+
+Transient failures also feed a circuit breaker shared by the process. After
+a number of consecutive failures the circuit opens, and calls fail fast with
+CircuitOpen instead of waiting on a degraded API. Once the reset timeout has
+passed a single probe call is let through: the circuit closes if it works,
+and opens again otherwise.
+
+Settings are read from config:
+    YOUTUBE_API_RETRIES {int} -- retries of a transient failure
+    YOUTUBE_API_BACKOFF_BASE {float} -- seconds of first backoff, doubled
+                                        every retry
+    YOUTUBE_API_BACKOFF_MAX {float} -- maximum seconds of a backoff
+    YOUTUBE_API_BREAKER_THRESHOLD {int} -- consecutive failures opening the
+                                           circuit, 0 to disable
+    YOUTUBE_API_BREAKER_RESET_TIMEOUT {float} -- seconds the circuit stays
+                                                 open before a probe
+"""
+import bisect
+import random
+import threading
+import time
+
+from flask import current_app
+from googleapiclient.errors import HttpError
+from httplib2 import HttpLib2Error
+
+from ..exceptions import CircuitOpen
+from .key_pool import error_reason
+
+RETRYABLE_STATUSES = frozenset([500, 502, 503, 504])
+RETRYABLE_REASONS = frozenset(
+    ["backendError", "internalError", "rateLimitExceeded", "userRateLimitExceeded"]
+)
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def is_retryable(error):
+    """Whether a failed call may succeed when sent again"""
+    if isinstance(error, HttpError):
+        return (
+            error.resp.status in RETRYABLE_STATUSES
+            or error_reason(error) in RETRYABLE_REASONS
+        )
+    return isinstance(error, (OSError, HttpLib2Error))
+
+
+def backoff_delay(attempt, base, maximum):
+    """Seconds to wait before a retry, with full jitter
+
+    Arguments:
+        attempt {int} -- number of retries already made
+        base {float} -- seconds of first backoff
+        maximum {float} -- maximum seconds
+
+    Returns:
+        float -- random seconds up to base * 2 ** attempt
+    """
+    return random.uniform(0, min(maximum, base * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """Consecutive transient failures of the API in this process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.failures = 0
+        self.opened_at = None
+        self.probe_at = None
+
+    @property
+    def state(self):
+        """closed, open or half_open"""
+        if self.opened_at is None:
+            return "closed"
+        return "open" if self.probe_at is None else "half_open"
+
+    def _wait(self, now):
+        if self.opened_at is None:
+            return 0
+        # Probe is let through once, or again if it never reported back
+        since = now - (self.probe_at or self.opened_at)
+        return max(current_app.config["YOUTUBE_API_BREAKER_RESET_TIMEOUT"] - since, 0)
+
+    def retry_after(self):
+        """Seconds until a call may be sent, without taking the probe
+
+        Returns:
+            float -- 0 if a call may be sent
+        """
+        with self._lock:
+            return self._wait(time.monotonic())
+
+    def allow(self):
+        """Check if a call may be sent, taking the probe if circuit is open
+
+        Returns:
+            float -- 0 if allowed, otherwise seconds until next probe
+        """
+        now = time.monotonic()
+        with self._lock:
+            wait = self._wait(now)
+            if not wait and self.opened_at is not None:
+                self.probe_at = now
+            return wait
+
+    def record(self, healthy):
+        """Report outcome of a call
+
+        Arguments:
+            healthy {bool} -- False if the call failed transiently
+
+        Returns:
+            bool -- True if the circuit is open
+        """
+        threshold = current_app.config["YOUTUBE_API_BREAKER_THRESHOLD"]
+        with self._lock:
+            if healthy:
+                if self.opened_at is not None:
+                    current_app.logger.info("YouTube API circuit closed")
+                self.failures = 0
+                self.opened_at = self.probe_at = None
+                return False
+            self.failures += 1
+            if not threshold or self.failures < threshold:
+                return False
+            if self.opened_at is None or self.probe_at is not None:
+                current_app.logger.warning(
+                    f"YouTube API circuit opened after {self.failures} failures"
+                )
+            self.opened_at = time.monotonic()
+            self.probe_at = None
+            return True
+
+    def stats(self):
+        """State and consecutive failures"""
+        with self._lock:
+            return {"state": self.state, "failures": self.failures}
+
+
+class LatencyHistogram:
+    """Latency of calls bucketed by LATENCY_BUCKETS, per endpoint"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def observe(self, endpoint, seconds):
+        """Count a call of endpoint which took seconds"""
+        with self._lock:
+            histogram = self._endpoints.setdefault(
+                endpoint, {"counts": [0] * (len(LATENCY_BUCKETS) + 1), "sum": 0}
+            )
+            histogram["counts"][bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            histogram["sum"] += seconds
+
+    def stats(self):
+        """Cumulative bucket counts, keyed by upper bound, of each endpoint
+
+        Returns:
+            dict -- count, mean, bucket counts and bucket bounds of median and
+                    95th percentile, keyed by API method id
+        """
+        bounds = [str(bound) for bound in LATENCY_BUCKETS] + ["+Inf"]
+        with self._lock:
+            endpoints = {
+                endpoint: (list(histogram["counts"]), histogram["sum"])
+                for endpoint, histogram in self._endpoints.items()
+            }
+        stats = {}
+        for endpoint, (counts, total) in endpoints.items():
+            count, cumulative, buckets = sum(counts), 0, {}
+            for bound, bucket_count in zip(bounds, counts):
+                cumulative += bucket_count
+                buckets[bound] = cumulative
+            stats[endpoint] = {
+                "count": count,
+                "mean": total / count,
+                "p50": next(b for b, n in buckets.items() if n >= count * 0.5),
+                "p95": next(b for b, n in buckets.items() if n >= count * 0.95),
+                "buckets": buckets,
+            }
+        return stats
+
+
+circuit_breaker = CircuitBreaker()
+latency_histogram = LatencyHistogram()
+
+
+def call(request, endpoint):
+    """Execute a request, retrying transient failures while circuit is closed
+
+    Arguments:
+        request {googleapiclient.http.HttpRequest} -- request to be sent
+        endpoint {str} -- API method id
+
+    Raises:
+        CircuitOpen -- API is unhealthy, request is not sent at all
+
+    Returns:
+        dict -- response of the request
+    """
+    config = current_app.config
+    attempt = 0
+    last_error = None
+    while True:
+        retry_after = circuit_breaker.allow()
+        if retry_after:
+            # Circuit opened during retries, the request was sent already
+            if last_error is not None:
+                raise last_error
+            raise CircuitOpen(retry_after)
+        started = time.monotonic()
+        try:
+            response = request.execute()
+        except Exception as error:
+            latency_histogram.observe(endpoint, time.monotonic() - started)
+            if not is_retryable(error):
+                # Answered, the API itself is healthy
+                circuit_breaker.record(True)
+                raise
+            opened = circuit_breaker.record(False)
+            if opened or attempt >= config["YOUTUBE_API_RETRIES"]:
+                raise
+            delay = backoff_delay(
+                attempt,
+                config["YOUTUBE_API_BACKOFF_BASE"],
+                config["YOUTUBE_API_BACKOFF_MAX"],
+            )
+            attempt += 1
+            last_error = error
+            current_app.logger.warning(
+                f"YouTube API {endpoint}: {error.__class__.__name__}, "
+                f"retry {attempt} in {delay:.2f}s"
+            )
+            time.sleep(delay)
+            continue
+        latency_histogram.observe(endpoint, time.monotonic() - started)
+        circuit_breaker.record(True)
+        return response
@@ -0,0 +1,151 @@
+"""History Retention
+
+Move rows older than a per-table retention period out of the database. Rows
+are appended to gzip-compressed JSON Lines archives (one file per table and
+day of run) before being deleted, in bounded batches so each transaction only
+holds a few locks for a short time.
+
+Policies are read from config:
+    RETENTION_POLICIES {dict} -- keyed by table name, each with
+                                 days {int} -- age of rows to remove
+                                 archive {bool} -- write rows to archive first
+    RETENTION_BATCH_SIZE {int} -- rows archived and deleted per transaction
+    RETENTION_ARCHIVE_DIR {str} -- directory of archives, default to
+                                   instance/archive
+
+Variables:
+    RETENTION_TABLES {dict} -- model and timestamp column of tables which may
+                               have a policy
+"""
+import gzip
+import json
+import os
+import time
+from datetime import datetime, timedelta
+from enum import Enum
+
+from flask import current_app
+
+from .. import db
+from ..models import Callback, Notification
+
+RETENTION_TABLES = {
+    "callback": (Callback, Callback.timestamp),
+    "notification": (Notification, Notification.sent_timestamp),
+}
+
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    raise TypeError(f"{value!r} is not JSON serializable")
+
+
+def archive_path(table_name, now=None):
+    """Path of archive file of a table
+
+    Arguments:
+        table_name {str} -- name of the table
+
+    Keyword Arguments:
+        now {datetime.datetime} -- time of run (default: {utcnow})
+
+    Returns:
+        str -- absolute path of the gzip JSON Lines file
+    """
+    directory = current_app.config.get("RETENTION_ARCHIVE_DIR") or os.path.join(
+        current_app.instance_path, "archive"
+    )
+    date = (now or datetime.utcnow()).strftime("%Y%m%d")
+    return os.path.join(directory, f"{table_name}-{date}.jsonl.gz")
+
+
+def apply_policy(table_name, days, archive=True, batch_size=1000, progress=None):
+    """Archive and delete rows of a table older than retention period
+
+    Arguments:
+        table_name {str} -- key of RETENTION_TABLES
+        days {int} -- rows older than this many days are removed
+
+    Keyword Arguments:
+        archive {bool} -- write rows to archive before deleting (default: {True})
+        batch_size {int} -- rows per transaction (default: {1000})
+        progress {callable} -- called with metrics after each batch
+
+    Returns:
+        dict -- table, cutoff, archive path, rows archived and deleted, batches
+                and seconds taken
+    """
+    model, column = RETENTION_TABLES[table_name]
+    table = model.__table__
+    now = datetime.utcnow()
+    cutoff = now - timedelta(days=days)
+    path = archive_path(table_name, now) if archive else None
+    metrics = {
+        "table": table_name,
+        "cutoff": cutoff.isoformat(),
+        "archive": path,
+        "archived": 0,
+        "deleted": 0,
+        "batches": 0,
+        "seconds": 0.0,
+    }
+    start = time.perf_counter()
+    if path:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    while True:
+        rows = db.session.execute(
+            table.select()
+            .where(column < cutoff)
+            .order_by(column, table.c.id)
+            .limit(batch_size)
+        ).fetchall()
+        if not rows:
+            break
+        if path:
+            # Appending gzip member keeps file readable as one stream
+            with gzip.open(path, "at", encoding="utf-8") as file:
+                for row in rows:
+                    file.write(json.dumps(dict(row), default=_encode) + "\n")
+            metrics["archived"] += len(rows)
+        result = db.session.execute(
+            table.delete().where(table.c.id.in_([row.id for row in rows]))
+        )
+        db.session.commit()
+        metrics["deleted"] += result.rowcount
+        metrics["batches"] += 1
+        metrics["seconds"] = time.perf_counter() - start
+        if progress:
+            progress(dict(metrics))
+        if len(rows) < batch_size:
+            break
+    metrics["seconds"] = time.perf_counter() - start
+    current_app.logger.info(
+        f"Retention <{table_name}>: {metrics['deleted']} rows before {cutoff} "
+        f"removed in {metrics['batches']} batches"
+    )
+    return metrics
+
+
+def apply_policies(progress=None):
+    """Apply every policy in RETENTION_POLICIES
+
+    Keyword Arguments:
+        progress {callable} -- called with metrics after each batch
+
+    Returns:
+        dict -- metrics of each policy, keyed by table name
+    """
+    batch_size = current_app.config["RETENTION_BATCH_SIZE"]
+    return {
+        table_name: apply_policy(
+            table_name,
+            policy["days"],
+            archive=policy.get("archive", True),
+            batch_size=batch_size,
+            progress=progress,
+        )
+        for table_name, policy in current_app.config["RETENTION_POLICIES"].items()
+    }
@@ -0,0 +1,36 @@
+"""SQL Helper Functions
+
+Statements which are expressed differently by each database backend
+"""
+from sqlalchemy.dialects import postgresql
+
+from .. import db
+
+
+def insert_ignore(table, rows, connection=None):
+    """Insert rows, silently skip those conflicting with existing primary key
+
+    Rely on backend upsert syntax (ON CONFLICT DO NOTHING, INSERT OR IGNORE,
+    INSERT IGNORE), so concurrent writers never fail on duplicated key.
+
+    Arguments:
+        table {sqlalchemy.Table} -- table to be inserted into
+        rows {list or dict} -- a row, or multiple rows to be inserted
+
+    Keyword Arguments:
+        connection {sqlalchemy.engine.Connection} -- execute outside of session
+
+    Returns:
+        int -- number of inserted rows, -1 if backend doesn't report it
+    """
+    executor = connection or db.session
+    dialect = (connection or db.session.get_bind()).dialect.name
+    if dialect == "postgresql":
+        statement = postgresql.insert(table).on_conflict_do_nothing()
+    elif dialect == "sqlite":
+        statement = table.insert().prefix_with("OR IGNORE")
+    elif dialect == "mysql":
+        statement = table.insert().prefix_with("IGNORE")
+    else:
+        statement = table.insert()
+    return executor.execute(statement, rows).rowcount
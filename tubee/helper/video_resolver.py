@@ -0,0 +1,148 @@
+"""Micro-batched Video Metadata Resolver
+
+Collect video ids requested by concurrent callers over a short window, and
+resolve them with a single videos.list call of up to 50 ids, so a burst of
+new videos costs a handful of API calls instead of one per video. Each
+caller blocks on, or awaits, the result of its own id.
+
+Behaviour is read from config:
+    VIDEO_RESOLVER_WINDOW {float} -- seconds to wait for more ids after the
+                                     first one of a batch
+    VIDEO_RESOLVER_BATCH_SIZE {int} -- maximum ids per call, at most 50
+    VIDEO_RESOLVER_TIMEOUT {float} -- seconds a caller waits for its result
+"""
+import asyncio
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from flask import current_app
+
+from .quota import execute
+from .youtube import build_youtube_api
+
+MAX_BATCH_SIZE = 50
+
+
+class VideoResolver:
+    """Queue of video ids, resolved in batches by a background thread"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._queue = queue.Queue()
+        self._thread = None
+        self._app = None
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked, requests and thread of parent are not ours
+                self._reset()
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._app = current_app._get_current_object()
+            self._thread = threading.Thread(
+                target=self._run, name="tubee-video-resolver", daemon=True
+            )
+            self._thread.start()
+
+    def submit(self, video_id):
+        """Queue a video id
+
+        Arguments:
+            video_id {str} -- ID of the video
+
+        Returns:
+            concurrent.futures.Future -- snippet of the video, None if it is
+                                         not found
+        """
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((video_id, future))
+        return future
+
+    def resolve(self, video_id, timeout=None):
+        """Snippet of a video, block until its batch is resolved
+
+        Arguments:
+            video_id {str} -- ID of the video
+
+        Keyword Arguments:
+            timeout {float} -- seconds to wait, default to config
+
+        Returns:
+            dict -- snippet of the video, None if it is not found
+        """
+        future = self.submit(video_id)
+        return future.result(timeout or current_app.config["VIDEO_RESOLVER_TIMEOUT"])
+
+    def resolve_async(self, video_id):
+        """Snippet of a video, awaitable in running event loop"""
+        return asyncio.wrap_future(self.submit(video_id))
+
+    @staticmethod
+    def lookup(video_ids):
+        """Snippets of videos in one videos.list call
+
+        Arguments:
+            video_ids {list} -- IDs of videos, at most 50
+
+        Returns:
+            dict -- snippet of each found video, keyed by id
+        """
+        from ..models import Video
+
+        response = execute(
+            build_youtube_api()
+            .videos()
+            .list(part="snippet", id=",".join(video_ids), fields=Video.DETAILS_FIELDS),
+            work_class="action",
+            caller="video_resolver",
+        )
+        return {item["id"]: item["snippet"] for item in response.get("items", [])}
+
+    def _run(self):
+        app = self._app
+        while True:
+            requests = [self._queue.get()]
+            window = app.config["VIDEO_RESOLVER_WINDOW"]
+            batch_size = min(app.config["VIDEO_RESOLVER_BATCH_SIZE"], MAX_BATCH_SIZE)
+            deadline = time.monotonic() + window
+            video_ids = {requests[0][0]}
+            while len(video_ids) < batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                requests.append(request)
+                video_ids.add(request[0])
+            with app.app_context():
+                self._resolve_batch(sorted(video_ids), requests)
+
+    def _resolve_batch(self, video_ids, requests):
+        try:
+            snippets = self.lookup(video_ids)
+        except Exception as error:
+            current_app.logger.exception(
+                f"Video resolver: batch of {len(video_ids)} ids failed"
+            )
+            for _, future in requests:
+                future.set_exception(error)
+            return
+        current_app.logger.debug(
+            f"Video resolver: {len(video_ids)} ids resolved in one call"
+        )
+        for video_id, future in requests:
+            future.set_result(snippets.get(video_id))
+
+
+video_resolver = VideoResolver()
@@ -1,11 +1,40 @@
-"""YouTube Data API Functions"""
+"""YouTube Data API Functions
+
+API clients are cached per process. The discovery document is parsed once,
+the developer key client is shared, and clients with user credentials are kept
+in an LRU cache. Every request is sent with an HTTP transport owned by the
+calling thread, so clients can be shared across threads while connections are
+kept alive.
+
+Stream URLs extracted by youtube_dl are cached per video until shortly before
+their signature expires.
+"""
 import json
+import threading
+import time
+from functools import lru_cache
+from urllib.parse import parse_qs, urlparse
 
 import youtube_dl
 from flask import current_app, url_for
 from google.oauth2.credentials import Credentials
+from google_auth_httplib2 import AuthorizedHttp
 from google_auth_oauthlib.flow import Flow
-from googleapiclient.discovery import build
+from googleapiclient.discovery import DISCOVERY_URI, build_from_document
+from googleapiclient.http import HttpRequest, build_http
+
+from . import try_parse_datetime
+from .cache import TTLCache
+from .extractor import YOUTUBE_DL_OPTIONS, extractor_pool
+
+_thread_local = threading.local()
+_developer_clients = {}
+_developer_clients_lock = threading.Lock()
+_credentials_clients = TTLCache(maxsize=128, ttl=3600)
+_video_file_urls = TTLCache(maxsize=256)
+# Lock of each video being extracted, and number of callers holding it
+_video_file_url_locks = {}
+_video_file_url_locks_lock = threading.Lock()
 
 
 def build_flow(state=None):
@@ -23,32 +52,181 @@ def build_flow(state=None):
     return flow
 
 
+def _thread_http():
+    """HTTP transport of current thread, which keeps connections alive"""
+    if not hasattr(_thread_local, "http"):
+        _thread_local.http = build_http()
+    return _thread_local.http
+
+
+@lru_cache(maxsize=None)
+def _discovery_document(service_name, version):
+    """Discovery document bundled with googleapiclient, download if missing"""
+    try:
+        from googleapiclient.discovery_cache import get_static_doc
+
+        document = get_static_doc(service_name, version)
+    except ImportError:
+        document = None
+    if document is None:
+        response, content = build_http().request(
+            DISCOVERY_URI.format(api=service_name, apiVersion=version)
+        )
+        document = content.decode("utf-8")
+    return json.loads(document)
+
+
+def _build_client(**kwargs):
+    return build_from_document(
+        _discovery_document(
+            current_app.config["YOUTUBE_API_SERVICE_NAME"],
+            current_app.config["YOUTUBE_API_VERSION"],
+        ),
+        **kwargs,
+    )
+
+
+def _developer_client(developer_key):
+    with _developer_clients_lock:
+        if developer_key not in _developer_clients:
+            _developer_clients[developer_key] = _build_client(
+                developerKey=developer_key,
+                http=build_http(),
+                requestBuilder=lambda http, *args, **kwargs: HttpRequest(
+                    _thread_http(), *args, **kwargs
+                ),
+            )
+        return _developer_clients[developer_key]
+
+
+def _credentials_key(credentials):
+    return credentials.get("refresh_token") or credentials.get("token")
+
+
+def cached_credentials(credentials):
+    """Credentials used by the cached client, which may have been refreshed
+
+    Arguments:
+        credentials {dict} -- credentials passed to build_youtube_api
+
+    Returns:
+        google.oauth2.credentials.Credentials -- None if client is not cached
+    """
+    cached = _credentials_clients.get(_credentials_key(credentials), touch=False)
+    return cached[0] if cached else None
+
+
+def discard_youtube_api(credentials):
+    """Remove cached client of credentials, called when credentials is revoked"""
+    _credentials_clients.pop(_credentials_key(credentials))
+
+
+def _credentials_client(credentials):
+    _credentials_clients.maxsize = current_app.config["YOUTUBE_API_CLIENT_CACHE_SIZE"]
+    key = _credentials_key(credentials)
+    cached = _credentials_clients.get(key)
+    if cached:
+        return cached[1]
+    credentials = Credentials(
+        **dict(credentials, expiry=try_parse_datetime(credentials.get("expiry")))
+    )
+    client = _build_client(
+        credentials=credentials,
+        requestBuilder=lambda http, *args, **kwargs: HttpRequest(
+            AuthorizedHttp(credentials, http=_thread_http()), *args, **kwargs
+        ),
+    )
+    _credentials_clients.set(
+        key,
+        (credentials, client),
+        ttl=current_app.config["YOUTUBE_API_CLIENT_CACHE_TTL"],
+    )
+    return client
+
+
 def build_youtube_api(credentials=None):
-    """Build Service with params"""
-    kwargs = {}
+    """Get cached Service with params
+
+    Keyword Arguments:
+        credentials {dict} -- user's credentials, use developer key if not given
+
+    Returns:
+        googleapiclient.discovery.Resource -- API-calling-ready YouTube Service
+    """
     if credentials:
-        kwargs["credentials"] = Credentials(**credentials)
-    else:
-        kwargs["developerKey"] = current_app.config["YOUTUBE_API_DEVELOPER_KEY"]
-
-    return build(
-        current_app.config["YOUTUBE_API_SERVICE_NAME"],
-        current_app.config["YOUTUBE_API_VERSION"],
-        **kwargs
+        return _credentials_client(credentials)
+    # Requests carry a key, which quota.execute replaces with one of the pool
+    keys = current_app.config["YOUTUBE_API_DEVELOPER_KEYS"]
+    return _developer_client(
+        keys[0] if keys else current_app.config["YOUTUBE_API_DEVELOPER_KEY"]
     )
 
 
 def build_youtube_dl(additional_options):
-    options = {
-        "skip_download": True,
-        "ignoreerrors": True,
-        "extract_flat": True,
-    }
-    options.update(additional_options)
-    return youtube_dl.YoutubeDL(options)
+    return youtube_dl.YoutubeDL(dict(YOUTUBE_DL_OPTIONS, **additional_options))
 
 
 def fetch_video_metadata(video_id):
-    service = build_youtube_dl({"format": "best"})
-    metadata = service.extract_info(video_id)
-    return metadata
+    """Extract info of a video in a worker of the extraction pool
+
+    Arguments:
+        video_id {str} -- ID of the video
+
+    Raises:
+        helper.extractor.ExtractorError -- extraction failed or timed out
+
+    Returns:
+        dict -- info dict of the best format, None if youtube_dl failed
+    """
+    return extractor_pool.extract(video_id, {"format": "best"})
+
+
+def _video_file_url_ttl(url):
+    """Seconds a stream URL can be cached, by its expire parameter"""
+    margin = current_app.config["VIDEO_FILE_URL_EXPIRY_MARGIN"]
+    expire = parse_qs(urlparse(url).query).get("expire")
+    if not expire or not expire[0].isdigit():
+        return current_app.config["VIDEO_FILE_URL_DEFAULT_TTL"]
+    return int(expire[0]) - time.time() - margin
+
+
+def fetch_video_file_url(video_id):
+    """Stream URL of a video, extracted once and cached until it expires
+
+    Concurrent calls for the same video share one extraction.
+
+    Arguments:
+        video_id {str} -- ID of the video
+
+    Returns:
+        str -- URL of the best format, None if extraction failed
+    """
+    url = _video_file_urls.get(video_id)
+    if url:
+        return url
+    with _video_file_url_locks_lock:
+        entry = _video_file_url_locks.setdefault(video_id, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            url = _video_file_urls.get(video_id)
+            if url:
+                return url
+            try:
+                url = fetch_video_metadata(video_id)["url"]
+            except Exception:
+                current_app.logger.exception(f"Video <{video_id}>: Extraction failed")
+                return None
+            ttl = _video_file_url_ttl(url)
+            if ttl > 0:
+                _video_file_urls.maxsize = current_app.config[
+                    "VIDEO_FILE_URL_CACHE_SIZE"
+                ]
+                _video_file_urls.set(video_id, url, ttl=ttl)
+            return url
+    finally:
+        with _video_file_url_locks_lock:
+            entry[1] -= 1
+            # Removed by the last caller, so no one waits on a stale lock
+            if not entry[1]:
+                del _video_file_url_locks[video_id]
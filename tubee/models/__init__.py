@@ -6,6 +6,7 @@ from .action import Action, ActionType
 from .callback import Callback
 from .channel import Channel
 from .notification import Notification, Service
+from .quota_usage import QuotaUsage
 from .subscription import Subscription
 from .subscription_tag import SubscriptionTag
 from .tag import Tag
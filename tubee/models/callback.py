@@ -4,6 +4,8 @@ from datetime import datetime
 from flask import current_app
 
 from .. import db
+from ..helper.feed import parse_notification
+from .video import Video
 
 
 class Callback(db.Model):
@@ -44,3 +46,42 @@ class Callback(db.Model):
         ]
         for f in FIELD:
             yield (f, getattr(self, f))
+
+    @staticmethod
+    def process_notification(channel, data):
+        """Parse a hub notification, execute actions if video is new
+
+        Arguments:
+            channel {Channel} -- channel which receives the notification
+            data {str} -- Atom payload received from hub
+
+        Returns:
+            tuple -- Results of executed actions keyed by action id, and list
+                     of IDs of videos in notification, deleted ones excluded
+        """
+        entries = parse_notification(data)
+        if not entries:
+            current_app.logger.info(f"Video ID not Found for {channel}")
+            return {}, []
+
+        response = {}
+        video_ids = []
+        try:
+            for entry in entries:
+                if entry.deleted:
+                    current_app.logger.info(f"Video <{entry.video_id}>: Deleted")
+                    continue
+
+                # Only the request which inserts the video executes actions
+                video_item, created = Video.create_if_absent(entry.video_id, channel)
+                if video_item is None:
+                    current_app.logger.warning(f"Video <{entry.video_id}>: Not found")
+                    continue
+                video_ids.append(video_item.id)
+                if created and video_item.details is not None:
+                    response.update(video_item.execute_actions())
+        except Exception:
+            # Leave session usable for logging the failed callback
+            db.session.rollback()
+            raise
+        return response, video_ids
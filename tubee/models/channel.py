@@ -1,15 +1,18 @@
 """Channel Model"""
 import json
-from datetime import datetime
+from datetime import datetime, timedelta
 from urllib.parse import urlencode
 
 from flask import current_app, url_for
 from googleapiclient.errors import Error as YouTubeAPIError
+from sqlalchemy import or_
 
 from .. import db
 from ..exceptions import APIError, InvalidAction
 from ..helper import try_parse_datetime
 from ..helper.hub import details, subscribe, unsubscribe
+from ..helper.hub_async import details_many, subscribe_many
+from ..helper.quota import execute
 from ..helper.youtube import build_youtube_api
 
 
@@ -21,6 +24,9 @@ class Channel(db.Model):
     """
 
     __tablename__ = "channel"
+    API_MAX_RESULTS = 50
+    # Hub leases are days long, longer ones are clamped to fit in columns
+    MAX_LEASE_SECONDS = 60 * 60 * 24 * 365
     id = db.Column(db.String(32), primary_key=True)
     name = db.Column(db.String(128))
     active = db.Column(db.Boolean, default=False)
@@ -28,6 +34,10 @@ class Channel(db.Model):
     hub_infos = db.Column(db.JSON)
     subscribe_timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     unsubscribe_timestamp = db.Column(db.DateTime)
+    fetch_cursor = db.Column(db.String(16))
+    next_renewal_at = db.Column(db.DateTime, index=True)
+    lease_seconds = db.Column(db.Integer)
+    lease_expiration = db.Column(db.DateTime, index=True)
     actions = db.relationship("Action", back_populates="channel")
     videos = db.relationship(
         "Video", back_populates="channel", lazy="dynamic", cascade="all, delete-orphan"
@@ -46,7 +56,7 @@ class Channel(db.Model):
     )
 
     def __init__(self, channel_id):
-        from ..tasks import channels_fetch_videos, channels_refresh, channels_renew
+        from ..tasks import channels_fetch_videos, channels_refresh
 
         self.id = channel_id
         db.session.add(self)
@@ -67,7 +77,6 @@ class Channel(db.Model):
             countdown=60,
         )
         channels_fetch_videos.apply_async(args=[[channel_id]])
-        channels_renew.apply_async(args=[[channel_id], 345600], countdown=345600)
         self.activate()
 
     def __repr__(self):
@@ -75,6 +84,9 @@ class Channel(db.Model):
 
     @property
     def expiration(self):
+        """When hub subscription expires, granted lease first, then hub details"""
+        if self.lease_expiration:
+            return self.lease_expiration
         try:
             return try_parse_datetime(self.hub_infos["expiration"])
         except (TypeError, KeyError):
@@ -88,6 +100,26 @@ class Channel(db.Model):
     def expiration(self):
         raise ValueError("expiration can not be delete")
 
+    @property
+    def callback_url(self):
+        """URL where hub should deliver notifications of this channel"""
+        return url_for("main.channel_callback", channel_id=self.id, _external=True)
+
+    @property
+    def topic_url(self):
+        """URL of the feed this channel is subscribed to on hub"""
+        return current_app.config["HUB_YOUTUBE_TOPIC"] + urlencode(
+            {"channel_id": self.id}
+        )
+
+    @property
+    def uploads_playlist_id(self):
+        """ID of the playlist which contains every uploaded video"""
+        try:
+            return self.infos["contentDetails"]["relatedPlaylists"]["uploads"]
+        except (TypeError, KeyError):
+            return "UU" + self.id[2:]
+
     def activate(self):
         """Submitting hub Subscription, called when first user subscribe"""
         if self.active:
@@ -97,7 +129,7 @@ class Channel(db.Model):
             raise RuntimeError("Channel activate failed")
         self.active = True
         self.subscribe_timestamp = datetime.utcnow()
-        db.session.commit()
+        self.schedule_renewal()
         current_app.logger.info(f"Channel <{self.id}>: Activate")
         return results
 
@@ -105,14 +137,8 @@ class Channel(db.Model):
         """Submitting hub unsubscription, called when last user unsubscribe"""
         if not self.active:
             raise AttributeError("Channel is already deactivate")
-        callback_url = url_for(
-            "main.channel_callback", channel_id=self.id, _external=True
-        )
-        topic_url = current_app.config["HUB_YOUTUBE_TOPIC"] + urlencode(
-            {"channel_id": self.id}
-        )
         response = unsubscribe(
-            current_app.config["HUB_GOOGLE_HUB"], callback_url, topic_url
+            current_app.config["HUB_GOOGLE_HUB"], self.callback_url, self.topic_url
         )
         if response.success:
             self.active = False
@@ -124,14 +150,61 @@ class Channel(db.Model):
         return response
 
     def refresh(self):
-        """Update hub subscription details, called by task or app"""
-        callback_url = url_for(
-            "main.channel_callback", channel_id=self.id, _external=True
+        """Update hub subscription details, called by audit task or app
+
+        Expiration is recorded from hub challenge (see lease_values), details
+        are only used to audit the subscription state.
+        """
+        results = details(
+            current_app.config["HUB_GOOGLE_HUB"], self.callback_url, self.topic_url
         )
-        topic_url = current_app.config["HUB_YOUTUBE_TOPIC"] + urlencode(
-            {"channel_id": self.id}
+        response = self._apply_hub_details(results)
+        self.schedule_renewal()
+        current_app.logger.info(f"Channel <{self.id}>: Hub info updated")
+        return response
+
+    @classmethod
+    def bulk_refresh(cls, channels):
+        """Update hub subscription details of many channels, called by task
+
+        Details are requested concurrently (see helper.hub_async).
+
+        Arguments:
+            channels {list} -- Channel to be refreshed
+
+        Returns:
+            dict -- details of each channel keyed by id, None if request failed
+        """
+        channels = list(channels)
+        results = details_many(
+            current_app.config["HUB_GOOGLE_HUB"],
+            [(channel.callback_url, channel.topic_url) for channel in channels],
+            concurrency=current_app.config["HUB_CONCURRENCY"],
+            rate=current_app.config["HUB_RATE_LIMIT"],
         )
-        results = details(current_app.config["HUB_GOOGLE_HUB"], callback_url, topic_url)
+        response = {}
+        for channel in channels:
+            result = results[channel.topic_url]
+            if isinstance(result, Exception):
+                current_app.logger.error(
+                    f"Channel <{channel.id}>: Hub info update failed: {result!r}"
+                )
+                response[channel.id] = None
+                continue
+            response[channel.id] = channel._apply_hub_details(result)
+            channel.schedule_renewal()
+            current_app.logger.info(f"Channel <{channel.id}>: Hub info updated")
+        return response
+
+    def _apply_hub_details(self, results):
+        """Store details returned by hub, and notify admin if state changed
+
+        Arguments:
+            results {dict} -- returned by helper.hub.details
+
+        Returns:
+            dict -- details without request objects
+        """
         results.pop("requests_url")
         results.pop("response_object")
         response = results.copy()
@@ -159,18 +232,110 @@ class Channel(db.Model):
             )
 
         self.hub_infos = results
-        db.session.commit()
-        current_app.logger.info(f"Channel <{self.id}>: Hub info updated")
         return response
 
+    @staticmethod
+    def lease_values(mode, lease_seconds=None):
+        """Column values to store for a hub verification challenge
+
+        Arguments:
+            mode {str} -- hub.mode of the challenge
+            lease_seconds {int} -- hub.lease_seconds of the challenge, clamped
+                                   to MAX_LEASE_SECONDS
+
+        Returns:
+            dict -- lease (and next renewal) columns, None if nothing to store
+        """
+        if mode == "subscribe" and lease_seconds and int(lease_seconds) > 0:
+            lease_seconds = min(int(lease_seconds), Channel.MAX_LEASE_SECONDS)
+            expiration = datetime.utcnow() + timedelta(seconds=lease_seconds)
+            return {
+                "lease_seconds": lease_seconds,
+                "lease_expiration": expiration,
+                "next_renewal_at": Channel.renewal_time(expiration),
+            }
+        if mode == "unsubscribe":
+            return {"lease_seconds": None, "lease_expiration": None}
+        return None
+
+    @staticmethod
+    def renewal_time(expiration=None, delay=None):
+        """When subscription should be renewed
+
+        Without delay, renewal is set one margin before hub expiration, or
+        retried later if expiration is unknown or too close.
+
+        Keyword Arguments:
+            expiration {datetime.datetime} -- expiration of hub subscription
+            delay {float} -- seconds from now (default: {None})
+
+        Returns:
+            datetime.datetime -- next renewal time
+        """
+        now = datetime.utcnow()
+        margin = timedelta(seconds=current_app.config["HUB_RENEWAL_MARGIN"])
+        if delay is not None:
+            return now + timedelta(seconds=delay)
+        if expiration and expiration - margin > now:
+            return expiration - margin
+        return now + timedelta(seconds=current_app.config["HUB_RENEWAL_RETRY"])
+
+    def schedule_renewal(self, delay=None):
+        """Set when subscription should be renewed next, called by task or app
+
+        Keyword Arguments:
+            delay {float} -- seconds from now, default to one margin before
+                             expiration (see renewal_time)
+
+        Returns:
+            datetime.datetime -- next renewal time
+        """
+        self.next_renewal_at = self.renewal_time(self.expiration, delay)
+        db.session.commit()
+        current_app.logger.info(
+            f"Channel <{self.id}>: Renewal scheduled at {self.next_renewal_at}"
+        )
+        return self.next_renewal_at
+
+    @classmethod
+    def claim_due_renewals(cls, limit):
+        """Pick channels whose renewal is due, and hold them from other workers
+
+        Claimed channels are postponed by HUB_RENEWAL_CLAIM_TIMEOUT, so they
+        will be picked again if the worker dies before renewing them.
+
+        Arguments:
+            limit {int} -- maximum number of channels to claim
+
+        Returns:
+            list -- IDs of claimed channels
+        """
+        now = datetime.utcnow()
+        channel_ids = [
+            channel_id
+            for (channel_id,) in db.session.query(cls.id)
+            .filter(
+                cls.active.is_(True),
+                or_(cls.next_renewal_at.is_(None), cls.next_renewal_at <= now),
+            )
+            .order_by(cls.next_renewal_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        ]
+        if channel_ids:
+            claim_timeout = current_app.config["HUB_RENEWAL_CLAIM_TIMEOUT"]
+            cls.query.filter(cls.id.in_(channel_ids)).update(
+                {cls.next_renewal_at: now + timedelta(seconds=claim_timeout)},
+                synchronize_session=False,
+            )
+        db.session.commit()
+        return channel_ids
+
     def update(self):
         """Update YouTube metadata, called by task"""
         try:
-            api_result = (
-                build_youtube_api()
-                .channels()
-                .list(part="snippet", id=self.id)
-                .execute()
+            api_result = execute(
+                build_youtube_api().channels().list(part="snippet", id=self.id)
             )
             if "items" not in api_result:
                 if self.name is None:
@@ -182,9 +347,12 @@ class Channel(db.Model):
                     service="YouTube",
                     message=f"Unable to update channel <{self.id}> info",
                 )
-            self.infos = api_result["items"][0]
-            self.name = self.infos["snippet"]["title"]
-            db.session.commit()
+            item = api_result["items"][0]
+            # Unchanged resource keeps its etag, skip writing it again
+            if not self.infos or self.infos.get("etag") != item.get("etag"):
+                self.infos = item
+                self.name = item["snippet"]["title"]
+                db.session.commit()
             current_app.logger.info(f"Channel <{self.id}>: YouTube info updated")
             return self.infos
         except (YouTubeAPIError, KeyError) as error:
@@ -198,51 +366,152 @@ class Channel(db.Model):
                 error_type=error.__class__.__name__,
             )
 
+    @classmethod
+    def bulk_update(cls, channels):
+        """Update YouTube metadata of many channels, called by task
+
+        Channels are requested 50 per API call, and all changes are committed
+        in one transaction.
+
+        Arguments:
+            channels {list} -- Channel to be updated
+
+        Returns:
+            dict -- infos of each channel keyed by id, None if channel is not
+                    returned by YouTube
+
+        Raises:
+            APIError -- Raised when any of the API call failed
+        """
+        channels = {channel.id: channel for channel in channels}
+        channel_ids = list(channels)
+        results = dict.fromkeys(channel_ids)
+        service = build_youtube_api().channels()
+        for offset in range(0, len(channel_ids), cls.API_MAX_RESULTS):
+            batch_ids = channel_ids[offset : offset + cls.API_MAX_RESULTS]
+            try:
+                api_result = execute(
+                    service.list(
+                        part="snippet",
+                        id=",".join(batch_ids),
+                        maxResults=cls.API_MAX_RESULTS,
+                    )
+                )
+            except YouTubeAPIError as error:
+                db.session.rollback()
+                current_app.logger.exception(
+                    f"Channels <{batch_ids[0]}...>: YouTube info update failed"
+                )
+                raise APIError(
+                    service="YouTube",
+                    message=str(error.args),
+                    error_type=error.__class__.__name__,
+                )
+            for item in api_result.get("items", []):
+                channel = channels.get(item["id"])
+                if channel is None:
+                    continue
+                if not channel.infos or channel.infos.get("etag") != item.get("etag"):
+                    channel.infos = item
+                    channel.name = item["snippet"]["title"]
+                results[channel.id] = item
+        db.session.commit()
+        for channel_id, infos in results.items():
+            if infos is None:
+                current_app.logger.warning(
+                    f"Channel <{channel_id}>: YouTube info update failed, "
+                    "doesn't exists"
+                )
+        current_app.logger.info(f"Channels: YouTube info of {len(results)} updated")
+        return results
+
     def subscribe(self):
         """Submitting hub Subscription, called by task or app"""
-        callback_url = url_for(
-            "main.channel_callback", channel_id=self.id, _external=True
-        )
-        topic_url = current_app.config["HUB_YOUTUBE_TOPIC"] + urlencode(
-            {"channel_id": self.id}
-        )
         response = subscribe(
-            current_app.config["HUB_GOOGLE_HUB"], callback_url, topic_url
+            current_app.config["HUB_GOOGLE_HUB"], self.callback_url, self.topic_url
         )
-        current_app.logger.debug(f"Callback URL: {callback_url}")
-        current_app.logger.debug(f"Topic URL   : {topic_url}")
+        current_app.logger.debug(f"Callback URL: {self.callback_url}")
+        current_app.logger.debug(f"Topic URL   : {self.topic_url}")
         current_app.logger.debug(f"Channel ID  : {self.id}")
         current_app.logger.debug(f"Response    : {response.status_code}")
         current_app.logger.info(f"Channel <{self.id}>: Hub Subscribe")
         return response.success
 
+    @classmethod
+    def bulk_subscribe(cls, channels):
+        """Submitting hub Subscription of many channels, called by task
+
+        Requests are sent concurrently (see helper.hub_async).
+
+        Arguments:
+            channels {list} -- Channel to be subscribed
+
+        Returns:
+            dict -- whether subscription is accepted, keyed by channel id
+        """
+        channels = list(channels)
+        results = subscribe_many(
+            current_app.config["HUB_GOOGLE_HUB"],
+            [(channel.callback_url, channel.topic_url) for channel in channels],
+            concurrency=current_app.config["HUB_CONCURRENCY"],
+            rate=current_app.config["HUB_RATE_LIMIT"],
+        )
+        response = {}
+        for channel in channels:
+            result = results[channel.topic_url]
+            if isinstance(result, Exception):
+                current_app.logger.error(
+                    f"Channel <{channel.id}>: Hub Subscribe failed: {result!r}"
+                )
+                response[channel.id] = False
+                continue
+            response[channel.id] = result.success
+            current_app.logger.info(f"Channel <{channel.id}>: Hub Subscribe")
+        return response
+
     def fetch_videos(self, fetch_all=False):
-        """Update videos, Called by task"""
+        """Update videos from uploads playlist, Called by task
+
+        Paging stops at the first video which is already stored, so a routine
+        fetch costs one API call unless the channel has uploaded more than a
+        page of videos since last fetch.
+
+        Keyword Arguments:
+            fetch_all {bool} -- page through the whole playlist (default: {False})
+
+        Returns:
+            dict -- count and IDs of new videos
+        """
         from .video import Video
 
-        search = build_youtube_api().search()
-        request = search.list(
+        playlist_items = build_youtube_api().playlistItems()
+        request = playlist_items.list(
             part="snippet",
-            channelId=self.id,
-            maxResults=50,
-            order="date",
-            type="video",
-            fields=Video.DETAILS_FIELDS,
+            playlistId=self.uploads_playlist_id,
+            maxResults=self.API_MAX_RESULTS,
+            fields=Video.PLAYLIST_ITEMS_FIELDS,
         )
 
         results = {"new_item_appended": 0, "video_ids": []}
+        latest_video_id = None
         while request is not None:
-            api_results = request.execute()
-            for video in api_results["items"]:
-                video_id = video["id"]["videoId"]
-                if not Video.query.get(video_id):
-                    Video(video_id, self, details=video["snippet"])
-                    results["new_item_appended"] += 1
-                    results["video_ids"].append(video_id)
-            if not fetch_all:
-                request = search.list_next(request, api_results)
-            else:
+            api_results = execute(request)
+            page = {}
+            for item in api_results.get("items", []):
+                details = item["snippet"]
+                page[details.pop("resourceId")["videoId"]] = details
+            latest_video_id = latest_video_id or next(iter(page), None)
+            reached_cursor = page.pop(self.fetch_cursor, None) is not None
+            video_ids = Video.bulk_create(self, page)
+            results["new_item_appended"] += len(video_ids)
+            results["video_ids"] += video_ids
+            reached_fetched = reached_cursor or len(video_ids) < len(page)
+            if reached_fetched and not fetch_all:
                 break
+            request = playlist_items.list_next(request, api_results)
 
+        if latest_video_id:
+            self.fetch_cursor = latest_video_id
+            db.session.commit()
         current_app.logger.info(f"Channel <{self.id}>: Video Fetched")
         return results
@@ -2,11 +2,11 @@
 from datetime import datetime
 from enum import Enum
 
-import requests
 from flask import current_app
 from pushover_complete import PushoverAPI
 
 from .. import db
+from ..helper.http import http_client
 
 
 class Service(Enum):
@@ -140,7 +140,7 @@ class Notification(db.Model):
         kwargs = Notification._clean_up_kwargs(self.kwargs.copy(), self.service)
         image_url = kwargs.pop("image_url", None)
         if image_url:
-            kwargs["image"] = requests.get(image_url, stream=True).content
+            kwargs["image"] = http_client.get(image_url).content
         pusher = PushoverAPI(current_app.config["PUSHOVER_TOKEN"])
         return pusher.send_message(self.user.pushover, self.message, **kwargs)
 
@@ -0,0 +1,18 @@
+"""QuotaUsage Model"""
+from .. import db
+
+
+class QuotaUsage(db.Model):
+    """YouTube Data API units spent per day, endpoint, caller and work class"""
+
+    __tablename__ = "quota_usage"
+    date = db.Column(db.Date, primary_key=True)
+    endpoint = db.Column(db.String(64), primary_key=True)
+    caller = db.Column(db.String(64), primary_key=True)
+    work_class = db.Column(db.String(16), primary_key=True)
+    calls = db.Column(db.Integer, nullable=False, default=0)
+    units = db.Column(db.Integer, nullable=False, default=0)
+
+    def __iter__(self):
+        for key in ["date", "endpoint", "caller", "work_class", "calls", "units"]:
+            yield (key, getattr(self, key))
@@ -2,7 +2,6 @@
 import json
 
 import dropbox
-import requests
 from flask import current_app
 from flask_login import UserMixin
 from google.oauth2.credentials import Credentials
@@ -11,7 +10,9 @@ from pushover_complete import PushoverAPI
 
 from .. import bcrypt, db, login_manager, oauth
 from ..exceptions import APIError, InvalidAction, ServiceNotAuth
-from ..helper import youtube
+from ..helper import try_parse_datetime, youtube
+from ..helper.http import http_client
+from ..helper.quota import execute
 
 
 @login_manager.user_loader
@@ -174,6 +175,7 @@ class User(UserMixin, db.Model):
         """
         if not self._youtube_credentials:
             raise ServiceNotAuth("YouTube")
+        self._sync_youtube_credentials()
         return youtube.build_youtube_api(self._youtube_credentials)
 
     @youtube.setter
@@ -198,6 +200,7 @@ class User(UserMixin, db.Model):
             client_id=credentials.client_id,
             client_secret=credentials.client_secret,
             scopes=credentials.scopes,
+            expiry=credentials.expiry.isoformat() if credentials.expiry else None,
         )
         db.session.commit()
 
@@ -212,11 +215,12 @@ class User(UserMixin, db.Model):
             APIError -- Raised when revoke encounter issue
                                 (not necessarily failed)
         """
-        response = requests.post(
+        response = http_client.post(
             "https://oauth2.googleapis.com/revoke",
             params={"token": self._youtube_credentials["token"]},
             headers={"content-type": "application/x-www-form-urlencoded"},
         )
+        youtube.discard_youtube_api(self._youtube_credentials)
         if response.status_code == 200:
             self._youtube_credentials = None
             db.session.commit()
@@ -228,6 +232,33 @@ class User(UserMixin, db.Model):
             raise APIError(service="YouTube", message=error_description)
         raise APIError(service="YouTube", message=error_description)
 
+    def _sync_youtube_credentials(self):
+        """Sync access token between saved credentials and cached YouTube Service
+
+        The token expiring later is the fresher one. A token refreshed by the
+        cached Service is saved, while a cached Service holding an older token
+        than the saved one (refreshed by another process) is discarded.
+
+        Returns:
+            bool -- True if saved token is updated
+        """
+        saved = self._youtube_credentials
+        credentials = youtube.cached_credentials(saved)
+        if not credentials or credentials.token == saved["token"]:
+            return False
+        saved_expiry = try_parse_datetime(saved.get("expiry"))
+        if not credentials.expiry or (
+            saved_expiry and saved_expiry >= credentials.expiry
+        ):
+            youtube.discard_youtube_api(saved)
+            return False
+        self._youtube_credentials = dict(
+            saved, token=credentials.token, expiry=credentials.expiry.isoformat()
+        )
+        db.session.commit()
+        current_app.logger.info(f"User <{self.username}>: YouTube token refreshed")
+        return True
+
     #     ######
     #     #     # #####   ####  #####  #####   ####  #    #
     #     #     # #    # #    # #    # #    # #    #  #  #
@@ -369,11 +400,11 @@ class User(UserMixin, db.Model):
             }
         }
         try:
-            result = (
-                self.youtube.playlistItems()
-                .insert(part="snippet", body=resource)
-                .execute()
+            result = execute(
+                self.youtube.playlistItems().insert(part="snippet", body=resource),
+                work_class="action",
             )
+            self._sync_youtube_credentials()
             current_app.logger.info(
                 f"User <{self.username}>: "
                 f"Insert video <{video_id}> to playlist <{playlist_id}>"
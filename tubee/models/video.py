@@ -2,9 +2,13 @@
 from urllib.parse import urljoin
 
 from dateutil import parser
+from sqlalchemy.exc import IntegrityError
 
 from .. import db
-from ..helper.youtube import build_youtube_api
+from ..helper.sql import insert_ignore
+from ..helper.video_resolver import video_resolver
+from ..helper.youtube import fetch_video_file_url
+from .action import ActionType
 
 
 class Video(db.Model):
@@ -26,6 +30,11 @@ class Video(db.Model):
         "thumbnails(default,medium,high,standard,maxres),"
         "channelTitle,liveBroadcastContent))"
     )
+    PLAYLIST_ITEMS_FIELDS = (
+        "nextPageToken,items(snippet(publishedAt,channelId,title,description,"
+        "thumbnails(default,medium,high,standard,maxres),"
+        "channelTitle,resourceId(videoId)))"
+    )
     THUMBNAIL_SIZES_TUPLE = [
         ("medium", "mqdefault.jpg", 320, 180),
         ("high", "hqdefault.jpg", 480, 360),
@@ -68,6 +77,92 @@ class Video(db.Model):
     def thumbnails(self):
         raise ValueError("thumbnails can not be delete")
 
+    @classmethod
+    def create_if_absent(cls, video_id, channel, fetch_infos=True):
+        """Insert a video unless it is stored, safe under concurrent requests
+
+        The row is inserted with a single insert-or-ignore statement, so only
+        one of the requests racing on the same video creates it.
+
+        Arguments:
+            video_id {str} -- ID of the video
+            channel {Channel} -- channel which uploaded the video
+
+        Keyword Arguments:
+            fetch_infos {bool} -- fetch details from YouTube if created
+                                  (default: {True})
+
+        If details can not be fetched, the inserted row is deleted again, so
+        the video is created by a later request (e.g. redelivery of the
+        notification) instead of being left without details.
+
+        Returns:
+            tuple -- the Video, and whether it is created by this call, Video
+                     is None if details of created video are not found
+        """
+        row = {"id": video_id, "channel_id": channel.id}
+        try:
+            created = insert_ignore(cls.__table__, row) == 1
+            db.session.commit()
+        except IntegrityError:
+            # Backend without insert-or-ignore, other request won the race
+            db.session.rollback()
+            created = False
+        video = cls.query.get(video_id)
+        if created and fetch_infos:
+            try:
+                video.update_infos()
+            except Exception:
+                cls._release(video)
+                raise
+            if video.details is None:
+                cls._release(video)
+                return None, False
+        return video, created
+
+    @classmethod
+    def _release(cls, video):
+        """Delete a video inserted by create_if_absent whose details are missing"""
+        db.session.rollback()
+        cls.query.filter_by(id=video.id).delete(synchronize_session=False)
+        db.session.commit()
+        db.session.expunge(video)
+
+    @classmethod
+    def bulk_create(cls, channel, details):
+        """Insert videos which are not stored yet, in one statement
+
+        Arguments:
+            channel {Channel} -- channel which uploaded the videos
+            details {dict} -- snippet of each video, keyed by video id
+
+        Returns:
+            list -- IDs of inserted videos
+        """
+        if not details:
+            return []
+        stored = {
+            video_id
+            for (video_id,) in db.session.query(cls.id).filter(
+                cls.id.in_(list(details))
+            )
+        }
+        rows = [
+            {
+                "id": video_id,
+                "name": snippet["title"],
+                "channel_id": channel.id,
+                "uploaded_timestamp": parser.parse(snippet["publishedAt"]),
+                "details": snippet,
+            }
+            for video_id, snippet in details.items()
+            if video_id not in stored
+        ]
+        if rows:
+            insert_ignore(cls.__table__, rows)
+            db.session.commit()
+        return [row["id"] for row in rows]
+
     def _process_details(self):
         self.name = self.details["title"]
         self.uploaded_timestamp = parser.parse(self.details["publishedAt"])
@@ -75,14 +170,39 @@ class Video(db.Model):
 
     def update_infos(self):
         try:
-            self.details = (
-                build_youtube_api()
-                .videos()
-                .list(part="snippet", id=self.id, fields=Video.DETAILS_FIELDS)
-                .execute()["items"][0]["snippet"]
-            )
+            # Batched with lookups of other videos created around the same time
+            details = video_resolver.resolve(self.id)
+            if details is None:
+                raise LookupError(f"Video <{self.id}> not found")
+            self.details = details
             self._process_details()
             return True
-        # TODO: Parse API Error
-        except Exception as error:
+        # API errors (e.g. QuotaExceeded) propagate, so the caller can retry
+        except LookupError as error:
             return error
+
+    def execute_actions(self):
+        """Execute actions of every subscriber of the channel
+
+        Returns:
+            dict -- Results of executed actions, keyed by action id
+        """
+        from ..helper.dispatch import dispatch_index
+        from ..helper.executor import action_executor
+
+        actions = [action for _, action in dispatch_index.get(self.channel_id)]
+        # Extraction takes seconds, only Download action needs it
+        if any(action.type is ActionType.Download for action in actions):
+            video_file_url = fetch_video_file_url(self.id)
+        else:
+            video_file_url = None
+        return action_executor.execute(
+            actions,
+            label=self.channel_id,
+            video_id=self.id,
+            video_title=self.name,
+            video_description=self.details["description"],
+            video_thumbnails=self.details["thumbnails"]["medium"]["url"],
+            video_file_url=video_file_url,
+            channel_name=self.channel.name,
+        )
@@ -11,6 +11,7 @@ from flask import (
     Blueprint,
     current_app,
     flash,
+    jsonify,
     redirect,
     render_template,
     request,
@@ -19,6 +20,8 @@ from flask import (
 from flask_login import current_user, login_required
 
 from ..helper import admin_required
+from ..helper.dedup import get_dedup_filter
+from ..helper.quota import usage_report
 from ..models import Callback, Channel, Notification
 
 admin_blueprint = Blueprint("admin", __name__)
@@ -45,6 +48,7 @@ def dashboard():
     for blueprint, rules in links.items():
         rules.sort(key=lambda x: x[1])
     # System Runtime
+    dedup = get_dedup_filter()
     infos = {
         "os_version": platform.platform(),
         "python_version": sys.version,
@@ -52,6 +56,7 @@ def dashboard():
         "flask_version": flask.__version__,
         "gunicorn_version": gunicorn.SERVER_SOFTWARE,
         "tubee_version": current_app.version,
+        "notification_dedup": dedup.stats() if dedup else "Disabled",
         "app_config": current_app.config,
         "os_env": os.environ,
     }
@@ -101,3 +106,10 @@ def notification_push():
         )
         flash(response, "success")
         return redirect(url_for("admin.dashboard"))
+
+
+@admin_blueprint.route("/quota")
+@login_required
+def quota():
+    """YouTube API quota used today, and live burn rate of this process"""
+    return jsonify(usage_report())
@@ -2,6 +2,8 @@
 from flask import Blueprint, jsonify, request
 from flask_login import current_user, login_required
 
+from ..helper.quota import execute
+
 api_blueprint = Blueprint("api", __name__)
 
 
@@ -19,16 +21,14 @@ def user_services():
 def youtube_subscription():
     """For Dynamically Loading User's YouTube Subscription"""
     page_token = request.args.get("page_token")
-    response = (
-        current_user.youtube.subscriptions()
-        .list(
+    response = execute(
+        current_user.youtube.subscriptions().list(
             part="snippet",
             maxResults=50,
             mine=True,
             order="alphabetical",
             pageToken=page_token,
         )
-        .execute()
     )
     for channel in response["items"]:
         channel_id = channel["snippet"]["resourceId"]["channelId"]
@@ -1,11 +1,11 @@
 from datetime import datetime, timedelta
 from random import randrange
-from uuid import uuid4
 
-from flask import Blueprint, jsonify, request, url_for
+from flask import Blueprint, current_app, jsonify, request, url_for
 from flask_login import current_user, login_required
 
 from ..helper import admin_required_decorator as admin_required
+from ..helper.quota import execute
 from ..helper.youtube import build_youtube_api
 from ..models import Callback, Channel
 from ..tasks import channels_renew
@@ -17,11 +17,10 @@ api_channel_blueprint = Blueprint("api_channel", __name__)
 @login_required
 def search():
     query = request.args.get("query")
-    response = (
+    response = execute(
         build_youtube_api()
         .search()
         .list(part="snippet", maxResults=30, q=query, type="channel")
-        .execute()
     )
     results = response
     results = [
@@ -40,7 +39,8 @@ def search():
 def renew_all():
     """Renew Subscription Info, Both Hub and Info"""
     execution = int(request.args.to_dict().get("execution", 0))
-    interval = 60 * 60 * 24 * 4
+    interval = current_app.config["HUB_RENEWAL_INTERVAL"]
+    margin = current_app.config["HUB_RENEWAL_MARGIN"]
     if execution == 0:
         task = channels_renew.apply_async(
             args=[[channel.id for channel in Channel.query.all()]]
@@ -52,28 +52,17 @@ def renew_all():
     else:
         response = {}
         for channel in Channel.query.all():
-            expiration = channel.expiration
-            if expiration is None:
-                # Expiration is not available yet (Channel just init)
-                # Set ETA to four days later
-                countdown = 60 * 60 * 24 * 4
-            elif expiration > datetime.now() + timedelta(days=1):
-                # Expiration is more than one day
-                # Set ETA to one day before expiration
-                countdown = expiration - timedelta(days=1) - datetime.now()
-                countdown = countdown.total_seconds()
+            if execution == -2:
+                # Spread renewal randomly, no later than one day before expiration
+                expiration = channel.expiration or datetime.utcnow() + timedelta(
+                    seconds=interval
+                )
+                window = (expiration - datetime.utcnow()).total_seconds() - margin
+                channel.schedule_renewal(randrange(int(window)) if window > 1 else 0)
             else:
-                # Expiration is less than one day
-                # Set ETA to now
-                countdown = 0
-            if execution == -2 and countdown > 0:
-                countdown = randrange(int(countdown))
-            task = channels_renew.apply_async(
-                args=[[channel.id], interval],
-                countdown=countdown,
-                task_id=f"renew_{channel.id}_{str(uuid4())[:8]}",
-            )
-            response[channel.id] = task.id
+                # One day before expiration
+                channel.schedule_renewal()
+            response[channel.id] = channel.next_renewal_at.isoformat()
     return jsonify(response)
 
 
@@ -1,15 +1,17 @@
 """The Main Routes"""
+import time
 from datetime import datetime, timedelta
 
-import bs4
-from flask import Blueprint, current_app, jsonify, render_template, request
+from flask import Blueprint, abort, current_app, jsonify, render_template, request
 from flask_login import current_user, login_required
 
-from .. import db
 from ..forms import ActionForm, TagForm
 from ..helper import youtube_required
-from ..helper.youtube import fetch_video_metadata
+from ..helper.callback_log import callback_log
+from ..helper.dedup import get_dedup_filter
+from ..helper.feed import parse_notification
 from ..models import Callback, Channel, SubscriptionTag, Tag, Video
+from ..tasks import callback_process
 
 main_blueprint = Blueprint("main", __name__)
 
@@ -59,91 +61,92 @@ def channel(channel_id):
     )
 
 
-# TODO: REBUILD THIS
 @main_blueprint.route("/channel/<channel_id>/callback", methods=["GET", "POST"])
 def channel_callback(channel_id):
     """
     GET: Receive Hub Challenges to sustain subscription
     POST: New Update from Hub
     """
+    start = time.perf_counter()
     channel_item = Channel.query.get_or_404(channel_id)
-    callback_item = Callback(channel_item)
     infos = {
         "method": request.method,
-        "arguments": request.args,
+        "arguments": request.args.to_dict(),
         "user_agent": str(request.user_agent),
     }
     if request.method == "GET":
-        response = request.args.to_dict().get("hub.challenge")
-        if response:
-            callback_item.type = "Hub Challenge"
-            infos["details"] = response
-            callback_item.infos = infos
-        else:
-            response = callback_item.type = "Unknown GET Request"
-        db.session.commit()
-        return response
+        # Answer hub right away, records are written in background
+        arguments = request.args.to_dict()
+        challenge = arguments.get("hub.challenge")
+        if not challenge:
+            callback_log.record(channel_id, "Unknown GET Request", infos)
+            return "Unknown GET Request"
+        mode = arguments.get("hub.mode")
+        if (
+            mode not in ("subscribe", "unsubscribe")
+            or arguments.get("hub.topic") != channel_item.topic_url
+        ):
+            callback_log.record(channel_id, "Denied Hub Challenge", infos)
+            abort(404)
+        infos["details"] = challenge
+        callback_log.record(channel_id, "Hub Challenge", infos)
+        try:
+            lease_seconds = int(arguments.get("hub.lease_seconds", ""))
+        except ValueError:
+            lease_seconds = None
+        lease = Channel.lease_values(mode, lease_seconds)
+        if lease:
+            callback_log.update_channel(channel_id, lease)
+        return challenge
     elif request.method == "POST":
-
-        # Preprocessing
         infos["data"] = request.get_data(as_text=True)
-        soup = bs4.BeautifulSoup(infos["data"], "xml")
-        response = {}
-        # TODO: Inspecting
-
-        tag = soup.find("yt:videoId")
-        if tag is None:
-            current_app.logger.info(f"Video ID not Found for {callback_item}")
-            callback_item.infos = infos
-            db.session.commit()
-            return response
-        video_id = tag.string
-
-        # Update Database Records
-        video_item = Video.query.get(video_id)
-        new_video = not bool(video_item)
-        if new_video:
-            video_item = Video(video_id, channel_item)
-        video_item.callbacks.append(callback_item)
-        callback_item.video = video_item
-        callback_item.type = "Hub Notification"
-        callback_item.infos = infos
-        db.session.commit()
-
-        # Pass actions if not new video
-        if not new_video:
-            return jsonify(response)
-
-        # Fetch Video Infos
-        try:  # TODO
-            video_file_url = fetch_video_metadata(video_id)["url"]
+        dedup = get_dedup_filter()
+        marked = []
+        if dedup:
+            # Drop exact repeats before processing
+            entries = parse_notification(infos["data"])
+            seen = [dedup.seen(entry.video_id, entry.updated) for entry in entries]
+            if seen and all(seen):
+                return "", 204
+            marked = [entry for entry, repeat in zip(entries, seen) if not repeat]
+        try:
+            return _process_notification(channel_item, infos, start)
         except Exception:
-            video_file_url = None
-
-        # List users and execute actions
-        for sub in channel_item.subscriptions:
-            for action in sub.actions:
-                try:
-                    results = action.execute(
-                        video_id=video_id,
-                        video_title=video_item.name,
-                        video_description=video_item.details["description"],
-                        video_thumbnails=video_item.details["thumbnails"]["medium"][
-                            "url"
-                        ],
-                        video_file_url=video_file_url,
-                        channel_name=channel_item.name,
-                    )
-                except Exception as error:
-                    results = {
-                        "error": error.__class__.__name__,
-                        "description": str(error),
-                    }
-                    current_app.logger.exception(f"{channel_id}-{action.id}: {error}")
-                else:
-                    current_app.logger.info(f"{channel_id}-{action.id}")
-                response[action.id] = results
-        return jsonify(response)
+            # Let redelivery by hub through
+            for entry in marked:
+                dedup.forget(entry.video_id, entry.updated)
+            raise
+
+
+def _process_notification(channel_item, infos, start):
+    """Enqueue or process a hub notification received by channel_callback"""
+    # Acknowledge hub first, let worker do the rest
+    if current_app.config["HUB_CALLBACK_ASYNC"]:
+        callback_process.apply_async(
+            kwargs={
+                "channel_id": channel_item.id,
+                "infos": infos,
+                "enqueued_at": time.time(),
+                "response_time": time.perf_counter() - start,
+            }
+        )
+        return "", 204
+
+    video_ids = []
+    try:
+        response, video_ids = Callback.process_notification(channel_item, infos["data"])
+    except Exception as error:
+        infos["error"] = f"{error.__class__.__name__}: {error}"
+        raise
+    finally:
+        # Row and payload are kept even if processing fails, one row per video
+        # so each video is linked to the notification
+        infos["timing"] = {"response": time.perf_counter() - start}
+        for video_id in video_ids or [None]:
+            callback_log.record(
+                channel_item.id, "Hub Notification", infos, video_id=video_id
+            )
+    return jsonify(response)
 
 
 @main_blueprint.route("/youtube/subscription")
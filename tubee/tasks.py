@@ -1,75 +1,225 @@
 """Defines All Async Task for Celery"""
 import logging
+import time
+from datetime import datetime
 
 from flask import current_app
 
 from . import celery
-from .models import Channel
+from .exceptions import APIError, CircuitOpen, QuotaExceeded
+from .helper.callback_log import callback_log
+from .helper.quota import quota_context
+from .helper.retention import apply_policies
+from .models import Callback, Channel
 
 task_logger = logging.getLogger("tubee.task")
 
 
 @celery.task(bind=True)
 def channels_renew(self, channel_ids, next_countdown=-1):
-    results = {}
-    for index, channel_id in enumerate(channel_ids):
+    """Renew hub subscription and update information of channels
+
+    Next renewal is scheduled on each channel (see channels_renew_due), from
+    the lease hub grants in verification challenge.
+    next_countdown is ignored, and only kept for tasks queued by older release.
+    """
+    channels = []
+    for channel_id in channel_ids:
         channel = Channel.query.get(channel_id)
         if not channel:
             task_logger.warning(
                 f"Task <renew_channel>: Channel '{channel_id}' not found, skipped."
             )
             continue
+        channels.append(channel)
+    try:
+        with quota_context("renewal", "channels_renew"):
+            infos = Channel.bulk_update(channels)
+    except APIError:
+        # Including QuotaExceeded and CircuitOpen, hub subscription is renewed anyway
+        task_logger.exception("Channels information update failed")
+        infos = {}
+
+    subscriptions = Channel.bulk_subscribe(channels)
+
+    results = {}
+    for index, channel in enumerate(channels):
         self.update_state(
             state="PROGRESS",
             meta={
                 "current": index + 1,
-                "total": len(channel_ids),
-                "channel_id": channel_id,
+                "total": len(channels),
+                "channel_id": channel.id,
                 "channel_name": getattr(channel, "name"),
             },
         )
-        results[channel_id] = {
-            "subscription": channel.subscribe(),
-            "info": channel.update(),
+        results[channel.id] = {
+            "subscription": subscriptions.get(channel.id, False),
+            "info": infos.get(channel.id),
         }
-        task_logger.info(f"<{channel_id}> subscription renewed")
-        task_logger.info(f"<{channel_id}> information updated")
-    channels_refresh.apply_async(args=[channel_ids], countdown=60)
-    if next_countdown > 0:
-        channels_renew.apply_async(
-            args=[channel_ids, next_countdown], countdown=next_countdown
+        # Lease granted in challenge decides next renewal, retry if it never comes
+        channel.schedule_renewal(
+            None
+            if results[channel.id]["subscription"]
+            else current_app.config["HUB_RENEWAL_RETRY"]
         )
+        task_logger.info(f"<{channel.id}> subscription renewed")
+        if results[channel.id]["info"]:
+            task_logger.info(f"<{channel.id}> information updated")
     return results
 
 
+@celery.task
+def channels_renew_due():
+    """Dispatch renewal of channels which are due, called periodically"""
+    batch_size = current_app.config["HUB_RENEWAL_BATCH_SIZE"]
+    dispatched = []
+    while True:
+        channel_ids = Channel.claim_due_renewals(batch_size)
+        if not channel_ids:
+            break
+        channels_renew.apply_async(args=[channel_ids])
+        dispatched += channel_ids
+        if len(channel_ids) < batch_size:
+            break
+    if dispatched:
+        task_logger.info(f"Renewal of {len(dispatched)} channels dispatched")
+    return dispatched
+
+
+@celery.task
+def channels_audit():
+    """Dispatch hub details refresh of every active channel, called periodically"""
+    batch_size = current_app.config["HUB_RENEWAL_BATCH_SIZE"]
+    channel_ids = [
+        channel_id
+        for (channel_id,) in Channel.query.with_entities(Channel.id)
+        .filter_by(active=True)
+        .order_by(Channel.id)
+    ]
+    for offset in range(0, len(channel_ids), batch_size):
+        channels_refresh.apply_async(args=[channel_ids[offset : offset + batch_size]])
+    task_logger.info(f"Audit of {len(channel_ids)} channels dispatched")
+    return channel_ids
+
+
 @celery.task
 def channels_refresh(channel_ids):
-    results = {}
+    channels = []
     for channel_id in channel_ids:
         channel = Channel.query.get(channel_id)
         if not channel:
             task_logger.warning(f"<{channel_id}> ID not found, skipped.")
             continue
-        results[channel_id] = channel.refresh()
-        task_logger.info(
-            f"<{channel_id}> new hub state: {results[channel_id]['state']}"
-        )
+        channels.append(channel)
+    results = Channel.bulk_refresh(channels)
+    for channel_id, result in results.items():
+        if result:
+            task_logger.info(f"<{channel_id}> new hub state: {result['state']}")
     return results
 
 
-@celery.task
-def channels_fetch_videos(channel_ids):
+@celery.task(bind=True)
+def channels_fetch_videos(self, channel_ids):
+    """Fetch new videos of channels
+
+    Deferred with channels not fetched yet when backfill quota is exhausted,
+    or while YouTube API is unhealthy.
+    """
     results = {}
-    for channel_id in channel_ids:
+    for index, channel_id in enumerate(channel_ids):
         channel = Channel.query.get(channel_id)
         if not channel:
             task_logger.warning(f"<{channel_id}> ID not found, skipped.")
             continue
-        results[channel_id] = channel.fetch_videos()
+        try:
+            with quota_context("backfill", "channels_fetch_videos"):
+                results[channel_id] = channel.fetch_videos()
+        except (QuotaExceeded, CircuitOpen) as error:
+            task_logger.warning(f"<{channel_id}> videos fetch deferred: {error}")
+            raise self.retry(
+                args=[channel_ids[index:]],
+                countdown=error.retry_after,
+                max_retries=None,
+                exc=error,
+            )
         task_logger.info(f"<{channel_id}> videos fetched: {len(results[channel_id])}")
     return results
 
 
+@celery.task(bind=True)
+def callback_process(self, channel_id, infos, enqueued_at, response_time=None):
+    """Process a hub notification which has been acknowledged by the endpoint
+
+    The notification is logged as a Callback row after processing, or with
+    the error if processing fails. Deferred when action quota is exhausted,
+    or while YouTube API is unhealthy.
+
+    Arguments:
+        channel_id {str} -- ID of the channel which receives the notification
+        infos {dict} -- details of the request context, with payload in data
+        enqueued_at {float} -- unix timestamp when this task was enqueued
+
+    Keyword Arguments:
+        response_time {float} -- seconds taken by the endpoint to respond
+    """
+    started_at = time.time()
+    channel = Channel.query.get(channel_id)
+    if not channel:
+        task_logger.warning(f"<{channel_id}> ID not found, skipped.")
+        return {}
+    video_ids = []
+    deferred = False
+    try:
+        with quota_context("action", "callback_process"):
+            results, video_ids = Callback.process_notification(channel, infos["data"])
+    except (QuotaExceeded, CircuitOpen) as error:
+        # Logged by the retried task
+        deferred = True
+        task_logger.warning(f"<{channel_id}> notification deferred: {error}")
+        raise self.retry(countdown=error.retry_after, max_retries=None, exc=error)
+    except Exception as error:
+        infos["error"] = f"{error.__class__.__name__}: {error}"
+        raise
+    finally:
+        if not deferred:
+            infos["timing"] = {
+                "response": response_time,
+                "queue_delay": started_at - enqueued_at,
+                "process": time.time() - started_at,
+            }
+            # One row per video, so each video is linked to the notification
+            for video_id in video_ids or [None]:
+                callback_log.record(
+                    channel_id,
+                    "Hub Notification",
+                    infos,
+                    timestamp=datetime.utcfromtimestamp(enqueued_at),
+                    video_id=video_id,
+                )
+    task_logger.info(f"<{channel_id}> notification processed: {len(results)} actions")
+    return results
+
+
+@celery.task(bind=True)
+def retention_apply(self):
+    """Archive and delete callback and notification history, called periodically
+
+    Progress of current table is reported in task state after each batch.
+    """
+
+    def progress(metrics):
+        self.update_state(state="PROGRESS", meta=metrics)
+
+    results = apply_policies(progress=progress)
+    for table_name, metrics in results.items():
+        task_logger.info(
+            f"<{table_name}> retention: {metrics['archived']} archived, "
+            f"{metrics['deleted']} deleted in {metrics['seconds']:.1f}s"
+        )
+    return results
+
+
 def list_all_tasks():
     worker_scheduled = celery.control.inspect().scheduled()
     if not worker_scheduled:
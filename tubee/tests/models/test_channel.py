@@ -1,7 +1,7 @@
 """Test Cases of Channel Model"""
 import json
 import unittest
-from datetime import datetime
+from datetime import datetime, timedelta
 from os.path import dirname, join
 from unittest import mock
 
@@ -12,7 +12,7 @@ from googleapiclient.http import HttpMockSequence
 
 from tubee import create_app, db
 from tubee.exceptions import APIError, InvalidAction
-from tubee.models import Channel
+from tubee.models import Channel, Video
 
 
 class ChannelModelTestCase(unittest.TestCase):
@@ -175,6 +175,39 @@ class ChannelModelTestCase(unittest.TestCase):
             self.test_channel.hub_infos["last_notification_error"][0], str
         )
 
+    @mock.patch("tubee.helper.notify_admin")
+    @mock.patch("tubee.models.channel.details_many")
+    def test_channel_bulk_refresh(self, mocked_details_many, mocked_notify_admin):
+        self.init_channel()
+        self.test_channel.hub_infos = {"state": "verified"}
+        mocked_details_many.return_value = {
+            self.test_channel.topic_url: {
+                "requests_url": None,
+                "response_object": None,
+                "state": "verified",
+                "expiration": datetime(2020, 1, 1, 10, 30, 0, tzinfo=UTC),
+                "last_challenge_error": None,
+            }
+        }
+        results = Channel.bulk_refresh([self.test_channel])
+        self.assertEqual(results[self.test_channel_id]["state"], "verified")
+        self.assertEqual(
+            self.test_channel.hub_infos["expiration"], "2020-01-01 10:30:00+00:00"
+        )
+        self.assertIsNotNone(self.test_channel.next_renewal_at)
+        args = mocked_details_many.call_args[0]
+        self.assertEqual(
+            args[1], [(self.test_channel.callback_url, self.test_channel.topic_url)]
+        )
+        mocked_notify_admin.assert_not_called()
+
+        mocked_details_many.return_value = {
+            self.test_channel.topic_url: RuntimeError("test")
+        }
+        results = Channel.bulk_refresh([self.test_channel])
+        self.assertIsNone(results[self.test_channel_id])
+        self.assertEqual(self.test_channel.hub_infos["state"], "verified")
+
     @mock.patch("tubee.models.channel.build_youtube_api")
     def test_channel_update(self, mocked_youtube):
         self.init_channel()
@@ -212,33 +245,110 @@ class ChannelModelTestCase(unittest.TestCase):
             self.test_channel.name, test_response["items"][0]["snippet"]["title"]
         )
 
-    @mock.patch("tubee.models.video.Video")
     @mock.patch("tubee.models.channel.build_youtube_api")
-    def test_channel_fetch_videos(self, mocked_youtube, mocked_video):
+    def test_channel_bulk_update(self, mocked_youtube):
+        self.init_channel()
+        missing_channel = mock.MagicMock(id="UCpd0xtuhhWwUug1bk84usiA")
+        with open(
+            join(dirname(__file__), "../data", "youtube_channel_list.json")
+        ) as file:
+            test_response = json.load(file)
+        mocked_list = mocked_youtube.return_value.channels.return_value.list
+
+        mocked_list.return_value.execute.side_effect = YouTubeAPIError()
+        with self.assertRaises(APIError):
+            Channel.bulk_update([self.test_channel, missing_channel])
+
+        mocked_list.reset_mock()
+        mocked_list.return_value.execute.side_effect = None
+        mocked_list.return_value.execute.return_value = test_response
+        channels = [self.test_channel] + [missing_channel] * 60
+        results = Channel.bulk_update(channels)
+        self.assertEqual(mocked_list.call_count, 1)
+        self.assertEqual(
+            mocked_list.call_args[1]["id"],
+            f"{self.test_channel_id},{missing_channel.id}",
+        )
+        self.assertEqual(results[self.test_channel_id], test_response["items"][0])
+        self.assertIsNone(results[missing_channel.id])
+        self.assertEqual(
+            self.test_channel.name, test_response["items"][0]["snippet"]["title"]
+        )
+
+        channels = [self.test_channel] + [
+            mock.MagicMock(id=f"test_channel_{index}")
+            for index in range(Channel.API_MAX_RESULTS)
+        ]
+        mocked_list.reset_mock()
+        Channel.bulk_update(channels)
+        self.assertEqual(mocked_list.call_count, 2)
+
+    @mock.patch("tubee.models.channel.build_youtube_api")
+    def test_channel_fetch_videos(self, mocked_youtube):
         self.init_channel()
+        self.assertEqual(self.test_channel.uploads_playlist_id[:2], "UU")
 
         with open(
-            join(dirname(__file__), "../data", "youtube_fetch_videos_1.json")
+            join(dirname(__file__), "../data", "youtube_playlist_items_1.json")
         ) as file:
             playlist_items_1 = file.read()
         with open(
-            join(dirname(__file__), "../data", "youtube_fetch_videos_2.json")
+            join(dirname(__file__), "../data", "youtube_playlist_items_2.json")
         ) as file:
             playlist_items_2 = file.read()
-        responses = [
-            ({"status": "200"}, playlist_items_1),
-            ({"status": "200"}, playlist_items_2),
+        page_1_ids = [
+            item["snippet"]["resourceId"]["videoId"]
+            for item in json.loads(playlist_items_1)["items"]
+        ]
+        page_2_ids = [
+            item["snippet"]["resourceId"]["videoId"]
+            for item in json.loads(playlist_items_2)["items"]
         ]
 
-        mocked_youtube.return_value = build(
-            self.app.config["YOUTUBE_API_SERVICE_NAME"],
-            self.app.config["YOUTUBE_API_VERSION"],
-            http=HttpMockSequence(responses),
-            developerKey=self.app.config["YOUTUBE_API_DEVELOPER_KEY"],
+        def build_mocked_youtube(*pages):
+            return build(
+                self.app.config["YOUTUBE_API_SERVICE_NAME"],
+                self.app.config["YOUTUBE_API_VERSION"],
+                http=HttpMockSequence([({"status": "200"}, page) for page in pages]),
+                developerKey=self.app.config["YOUTUBE_API_DEVELOPER_KEY"],
+            )
+
+        # Whole playlist is new
+        mocked_youtube.return_value = build_mocked_youtube(
+            playlist_items_1, playlist_items_2
+        )
+        results = self.test_channel.fetch_videos()
+        self.assertEqual(results["new_item_appended"], 100)
+        self.assertEqual(results["video_ids"], page_1_ids + page_2_ids)
+        self.assertEqual(self.test_channel.videos.count(), 100)
+        self.assertEqual(self.test_channel.fetch_cursor, page_1_ids[0])
+        video = Video.query.get(page_1_ids[0])
+        self.assertEqual(video.name, video.details["title"])
+        self.assertIsNotNone(video.uploaded_timestamp)
+
+        # Stop paging after cursor is reached
+        mocked_youtube.return_value = build_mocked_youtube(playlist_items_1)
+        results = self.test_channel.fetch_videos()
+        self.assertEqual(results["new_item_appended"], 0)
+
+        # Stop paging after stored video is reached
+        self.test_channel.fetch_cursor = None
+        Video.query.filter(Video.id.in_(page_1_ids[:10])).delete(
+            synchronize_session=False
         )
-        mocked_video.query.get.side_effect = lambda x: bool(hash(x) % 2)
+        mocked_youtube.return_value = build_mocked_youtube(playlist_items_1)
+        results = self.test_channel.fetch_videos()
+        self.assertEqual(results["video_ids"], page_1_ids[:10])
 
-        self.test_channel.fetch_videos()
+        # Keep paging with fetch_all
+        Video.query.filter(Video.id.in_(page_2_ids[-5:])).delete(
+            synchronize_session=False
+        )
+        mocked_youtube.return_value = build_mocked_youtube(
+            playlist_items_1, playlist_items_2
+        )
+        results = self.test_channel.fetch_videos(fetch_all=True)
+        self.assertEqual(results["video_ids"], page_2_ids[-5:])
 
     @mock.patch("tubee.models.channel.Channel.subscribe")
     def test_channel_activate(self, mocked_subscribe):
@@ -259,6 +369,67 @@ class ChannelModelTestCase(unittest.TestCase):
         with self.assertRaises(AttributeError):
             results = self.test_channel.activate()
 
+    def test_channel_schedule_renewal(self):
+        self.init_channel()
+        now = datetime.utcnow()
+        self.test_channel.hub_infos = {}
+        self.test_channel.schedule_renewal(60)
+        self.assertAlmostEqual(
+            (self.test_channel.next_renewal_at - now).total_seconds(), 60, places=0
+        )
+
+        self.test_channel.schedule_renewal()
+        self.assertAlmostEqual(
+            (self.test_channel.next_renewal_at - now).total_seconds(),
+            self.app.config["HUB_RENEWAL_RETRY"],
+            places=0,
+        )
+
+        expiration = now + timedelta(days=5)
+        self.test_channel.hub_infos = {"expiration": str(expiration)}
+        self.test_channel.schedule_renewal()
+        self.assertEqual(
+            self.test_channel.next_renewal_at,
+            expiration - timedelta(seconds=self.app.config["HUB_RENEWAL_MARGIN"]),
+        )
+
+    def test_channel_lease_values(self):
+        values = Channel.lease_values("subscribe", 432000)
+        self.assertEqual(values["lease_seconds"], 432000)
+        self.assertAlmostEqual(
+            values["lease_expiration"].timestamp(),
+            (datetime.utcnow() + timedelta(seconds=432000)).timestamp(),
+            places=0,
+        )
+        self.assertEqual(
+            values["next_renewal_at"],
+            values["lease_expiration"]
+            - timedelta(seconds=self.app.config["HUB_RENEWAL_MARGIN"]),
+        )
+
+        values = Channel.lease_values("subscribe", Channel.MAX_LEASE_SECONDS + 1)
+        self.assertEqual(values["lease_seconds"], Channel.MAX_LEASE_SECONDS)
+        self.assertIsNone(Channel.lease_values("subscribe", 0))
+        self.assertIsNone(Channel.lease_values("denied", 432000))
+        self.assertEqual(
+            Channel.lease_values("unsubscribe"),
+            {"lease_seconds": None, "lease_expiration": None},
+        )
+
+    def test_channel_claim_due_renewals(self):
+        self.init_channel()
+        self.assertEqual(Channel.claim_due_renewals(10), [])
+
+        self.test_channel.active = True
+        db.session.commit()
+        self.assertEqual(Channel.claim_due_renewals(10), [self.test_channel_id])
+        self.assertGreater(self.test_channel.next_renewal_at, datetime.utcnow())
+        self.assertEqual(Channel.claim_due_renewals(10), [])
+
+        self.test_channel.schedule_renewal(-1)
+        self.assertEqual(Channel.claim_due_renewals(0), [])
+        self.assertEqual(Channel.claim_due_renewals(10), [self.test_channel_id])
+
     @mock.patch("tubee.models.channel.subscribe")
     def test_channel_subscribe(self, mocked_subscribe):
         self.init_channel()
@@ -266,3 +437,19 @@ class ChannelModelTestCase(unittest.TestCase):
         self.assertFalse(self.test_channel.subscribe())
         mocked_subscribe.return_value.success = True
         self.assertTrue(self.test_channel.subscribe())
+
+    @mock.patch("tubee.models.channel.subscribe_many")
+    def test_channel_bulk_subscribe(self, mocked_subscribe_many):
+        self.init_channel()
+        mocked_subscribe_many.return_value = {
+            self.test_channel.topic_url: mock.MagicMock(success=True)
+        }
+        self.assertEqual(
+            Channel.bulk_subscribe([self.test_channel]), {self.test_channel_id: True}
+        )
+        mocked_subscribe_many.return_value = {
+            self.test_channel.topic_url: RuntimeError("test")
+        }
+        self.assertEqual(
+            Channel.bulk_subscribe([self.test_channel]), {self.test_channel_id: False}
+        )
@@ -2,8 +2,11 @@
 import unittest
 from unittest import mock
 
+from sqlalchemy.exc import IntegrityError
+
 from tubee import create_app, db
-from tubee.models import Channel, Video
+from tubee.exceptions import QuotaExceeded
+from tubee.models import ActionType, Channel, Video
 
 
 class UserModelTestCase(unittest.TestCase):
@@ -49,3 +52,109 @@ class UserModelTestCase(unittest.TestCase):
         self.test_video = Video(
             self.test_video_id[1], self.test_channel, fetch_infos=False
         )
+
+    @mock.patch("tubee.models.video.Video.update_infos", autospec=True)
+    def test_video_create_if_absent(self, mocked_update_infos):
+        mocked_update_infos.side_effect = lambda video: setattr(
+            video, "details", {"title": "test_title"}
+        )
+        self.init_channel()
+        video, created = Video.create_if_absent(
+            self.test_video_id[0], self.test_channel
+        )
+        self.assertTrue(created)
+        self.assertEqual(video.channel_id, self.test_channel_id)
+        mocked_update_infos.assert_called_once()
+
+        video, created = Video.create_if_absent(
+            self.test_video_id[0], self.test_channel
+        )
+        self.assertFalse(created)
+        self.assertEqual(video.id, self.test_video_id[0])
+        mocked_update_infos.assert_called_once()
+
+        with mock.patch("tubee.models.video.insert_ignore") as mocked_insert_ignore:
+            mocked_insert_ignore.side_effect = IntegrityError(None, None, None)
+            _, created = Video.create_if_absent(
+                self.test_video_id[0], self.test_channel
+            )
+            self.assertFalse(created)
+        self.assertEqual(Video.query.count(), 1)
+
+    @mock.patch("tubee.models.video.video_resolver")
+    def test_video_create_if_absent_release(self, mocked_video_resolver):
+        self.init_channel()
+        # Claimed row is deleted, so a redelivered notification creates it
+        mocked_video_resolver.resolve.return_value = None
+        self.assertEqual(
+            Video.create_if_absent(self.test_video_id[0], self.test_channel),
+            (None, False),
+        )
+        self.assertEqual(Video.query.count(), 0)
+
+        mocked_video_resolver.resolve.side_effect = QuotaExceeded("action", 30)
+        with self.assertRaises(QuotaExceeded):
+            Video.create_if_absent(self.test_video_id[0], self.test_channel)
+        self.assertEqual(Video.query.count(), 0)
+
+        mocked_video_resolver.resolve.side_effect = None
+        mocked_video_resolver.resolve.return_value = {
+            "title": "test_title",
+            "publishedAt": "2020-08-05T22:58:18Z",
+        }
+        video, created = Video.create_if_absent(
+            self.test_video_id[0], self.test_channel
+        )
+        self.assertTrue(created)
+        self.assertEqual(video.name, "test_title")
+
+    def test_video_bulk_create(self):
+        self.init_channel()
+        details = {
+            video_id: {
+                "title": f"title of {video_id}",
+                "publishedAt": "2020-08-05T22:58:18Z",
+            }
+            for video_id in self.test_video_id
+        }
+        Video(self.test_video_id[0], self.test_channel, fetch_infos=False)
+        results = Video.bulk_create(self.test_channel, details)
+        self.assertEqual(results, self.test_video_id[1:])
+        self.assertEqual(self.test_channel.videos.count(), 2)
+        self.assertIsNone(Video.query.get(self.test_video_id[0]).name)
+        self.assertEqual(
+            Video.query.get(self.test_video_id[1]).name,
+            f"title of {self.test_video_id[1]}",
+        )
+        self.assertEqual(Video.bulk_create(self.test_channel, details), [])
+        self.assertEqual(Video.bulk_create(self.test_channel, {}), [])
+
+    @mock.patch("tubee.helper.executor.action_executor.execute")
+    @mock.patch("tubee.helper.dispatch.dispatch_index.get")
+    @mock.patch("tubee.models.video.fetch_video_file_url")
+    def test_video_execute_actions(
+        self, mocked_fetch_video_file_url, mocked_get, mocked_execute
+    ):
+        self.init_channel()
+        video = Video(
+            self.test_video_id[0],
+            self.test_channel,
+            details={
+                "title": "test_title",
+                "description": "test_description",
+                "publishedAt": "2020-08-05T22:58:18Z",
+                "thumbnails": {"medium": {"url": "test_thumbnail"}},
+            },
+        )
+        notification = mock.MagicMock(type=ActionType.Notification)
+        mocked_get.return_value = [(None, notification)]
+        video.execute_actions()
+        mocked_fetch_video_file_url.assert_not_called()
+        self.assertIsNone(mocked_execute.call_args[1]["video_file_url"])
+
+        mocked_fetch_video_file_url.return_value = "test_url"
+        download = mock.MagicMock(type=ActionType.Download)
+        mocked_get.return_value = [(None, notification), (None, download)]
+        video.execute_actions()
+        mocked_fetch_video_file_url.assert_called_once_with(self.test_video_id[0])
+        self.assertEqual(mocked_execute.call_args[1]["video_file_url"], "test_url")
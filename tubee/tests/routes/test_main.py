@@ -1,9 +1,10 @@
 """Test Cases of Main Routes"""
 import unittest
+from os.path import dirname, join
 from unittest import mock
 
 from tubee import create_app, db
-from tubee.models import User
+from tubee.models import Callback, Channel, User
 
 
 class MainRoutesTestCase(unittest.TestCase):
@@ -54,3 +55,142 @@ class MainRoutesTestCase(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         for channel_id in self.test_channel_ids:
             self.assertIn(channel_id, response.get_data(as_text=True))
+
+    @mock.patch("tubee.models.channel.Channel.activate")
+    @mock.patch("tubee.tasks.channels_renew")
+    @mock.patch("tubee.tasks.channels_fetch_videos")
+    @mock.patch("tubee.tasks.channels_refresh")
+    @mock.patch("tubee.models.channel.Channel.update")
+    def init_channel(self, *mocked_functions):
+        self.test_channel = Channel(channel_id=self.test_channel_ids[0])
+
+    def test_main_channel_callback_challenge(self):
+        self.init_channel()
+        url = f"/channel/{self.test_channel.id}/callback"
+        response = self.client.get(url, query_string={"hub.challenge": "test"})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(Callback.query.one().type, "Denied Hub Challenge")
+
+        response = self.client.get(
+            url,
+            query_string={
+                "hub.challenge": "test_challenge",
+                "hub.mode": "subscribe",
+                "hub.topic": self.test_channel.topic_url,
+            },
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_data(as_text=True), "test_challenge")
+        callback = Callback.query.order_by(Callback.id.desc()).first()
+        self.assertEqual(callback.type, "Hub Challenge")
+        self.assertEqual(callback.channel_id, self.test_channel.id)
+        self.assertIsNone(self.test_channel.lease_expiration)
+
+        response = self.client.get(
+            url,
+            query_string={
+                "hub.challenge": "test_challenge",
+                "hub.mode": "subscribe",
+                "hub.topic": self.test_channel.topic_url,
+                "hub.lease_seconds": "432000",
+            },
+        )
+        self.assertEqual(response.get_data(as_text=True), "test_challenge")
+        channel = Channel.query.get(self.test_channel_ids[0])
+        self.assertEqual(channel.lease_seconds, 432000)
+        self.assertEqual(channel.expiration, channel.lease_expiration)
+        self.assertLess(channel.next_renewal_at, channel.lease_expiration)
+
+        response = self.client.get(url)
+        self.assertEqual(response.get_data(as_text=True), "Unknown GET Request")
+        self.assertEqual(Callback.query.count(), 4)
+
+    def test_main_channel_callback_lease_overflow(self):
+        self.init_channel()
+        url = f"/channel/{self.test_channel.id}/callback"
+        for lease_seconds in ["9" * 400, "-1", "\u00b2", "abc"]:
+            response = self.client.get(
+                url,
+                query_string={
+                    "hub.challenge": "test_challenge",
+                    "hub.mode": "subscribe",
+                    "hub.topic": self.test_channel.topic_url,
+                    "hub.lease_seconds": lease_seconds,
+                },
+            )
+            self.assertEqual(response.status_code, 200)
+        channel = Channel.query.get(self.test_channel.id)
+        self.assertEqual(channel.lease_seconds, Channel.MAX_LEASE_SECONDS)
+
+    @mock.patch("tubee.routes.main.callback_process")
+    def test_main_channel_callback_async(self, mocked_callback_process):
+        self.init_channel()
+        self.app.config["HUB_CALLBACK_ASYNC"] = True
+        response = self.client.post(
+            f"/channel/{self.test_channel.id}/callback", data="<feed></feed>"
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(Callback.query.count(), 0)
+        kwargs = mocked_callback_process.apply_async.call_args[1]["kwargs"]
+        self.assertEqual(kwargs["channel_id"], self.test_channel.id)
+        self.assertEqual(kwargs["infos"]["data"], "<feed></feed>")
+
+    @mock.patch("tubee.models.callback.Callback.process_notification")
+    def test_main_channel_callback_sync(self, mocked_process):
+        self.init_channel()
+        mocked_process.return_value = ({1: "test_result"}, [])
+        response = self.client.post(
+            f"/channel/{self.test_channel.id}/callback", data="<feed></feed>"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json(), {"1": "test_result"})
+        self.assertIn("response", Callback.query.one().infos["timing"])
+
+        # Logged with payload even if processing fails
+        mocked_process.side_effect = RuntimeError("failed")
+        response = self.client.post(
+            f"/channel/{self.test_channel.id}/callback", data="<feed></feed>"
+        )
+        self.assertEqual(response.status_code, 500)
+        callback = Callback.query.order_by(Callback.id.desc()).first()
+        self.assertEqual(callback.infos["data"], "<feed></feed>")
+        self.assertEqual(callback.infos["error"], "RuntimeError: failed")
+
+    @mock.patch("tubee.helper.dedup._filter", None)
+    @mock.patch("tubee.models.callback.Callback.process_notification")
+    def test_main_channel_callback_dedup(self, mocked_process):
+        self.init_channel()
+        self.app.config["NOTIFICATION_DEDUP_SIZE"] = 10
+        mocked_process.return_value = ({}, [])
+        with open(
+            join(dirname(dirname(__file__)), "data", "youtube_notification.xml")
+        ) as file:
+            data = file.read()
+        url = f"/channel/{self.test_channel.id}/callback"
+        self.assertEqual(self.client.post(url, data=data).status_code, 200)
+        response = self.client.post(url, data=data)
+        self.assertEqual(response.status_code, 204)
+        mocked_process.assert_called_once()
+        self.assertEqual(Callback.query.count(), 1)
+
+    @mock.patch("tubee.helper.dedup._filter", None)
+    @mock.patch("tubee.routes.main.callback_process")
+    def test_main_channel_callback_dedup_failure(self, mocked_callback_process):
+        self.app.config["NOTIFICATION_DEDUP_SIZE"] = 10
+        self.app.config["HUB_CALLBACK_ASYNC"] = True
+        with open(
+            join(dirname(dirname(__file__)), "data", "youtube_notification.xml")
+        ) as file:
+            data = file.read()
+        url = f"/channel/{self.test_channel_ids[0]}/callback"
+        # Unknown channel is rejected before dedup
+        self.assertEqual(self.client.post(url, data=data).status_code, 404)
+
+        self.init_channel()
+        mocked_callback_process.apply_async.side_effect = [RuntimeError, None]
+        self.assertEqual(self.client.post(url, data=data).status_code, 500)
+        # Redelivery is processed
+        self.assertEqual(self.client.post(url, data=data).status_code, 204)
+        self.assertEqual(mocked_callback_process.apply_async.call_count, 2)
+        self.assertEqual(self.client.post(url, data=data).status_code, 204)
+        self.assertEqual(mocked_callback_process.apply_async.call_count, 2)
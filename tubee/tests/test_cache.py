@@ -0,0 +1,35 @@
+"""Test Cases of helper.cache"""
+import unittest
+from unittest import mock
+
+from tubee.helper.cache import TTLCache
+
+
+class TTLCacheTestCase(unittest.TestCase):
+    """Test Cases of TTL Cache"""
+
+    def test_cache_lru_eviction(self):
+        cache = TTLCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        self.assertEqual(cache.get("a"), 1)
+        cache.set("c", 3)
+        self.assertIn("a", cache)
+        self.assertNotIn("b", cache)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.pop("a"), 1)
+        self.assertIsNone(cache.pop("a"))
+
+    @mock.patch("tubee.helper.cache.time")
+    def test_cache_expiration(self, mocked_time):
+        mocked_time.monotonic.return_value = 100
+        cache = TTLCache(maxsize=10, ttl=10)
+        cache.set("a", None)
+        cache.set("b", 2, ttl=30)
+        self.assertIn("a", cache)
+        mocked_time.monotonic.return_value = 110
+        self.assertNotIn("a", cache)
+        self.assertEqual(cache.get("a", "default"), "default")
+        self.assertEqual(cache.get("b"), 2)
+        cache.clear()
+        self.assertEqual(len(cache), 0)
@@ -0,0 +1,171 @@
+"""Test Cases of helper.callback_log"""
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from datetime import datetime
+from unittest import mock
+
+from tubee import create_app, db
+from tubee.helper.callback_log import CallbackLog
+from tubee.models import Callback, Channel
+
+
+class CallbackLogTestCase(unittest.TestCase):
+    """Test Cases of Buffered Callback Log"""
+
+    def setUp(self):
+        self.app = create_app("testing")
+        self.app.config["CALLBACK_LOG_DURABILITY"] = "buffered"
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.test_channel_id = "UCBR8-60-B28hp2BmDPdntcQ"
+        db.session.execute(Channel.__table__.insert(), [{"id": self.test_channel_id}])
+        db.session.commit()
+        self.callback_log = CallbackLog()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    @mock.patch("tubee.helper.callback_log.CallbackLog._ensure_writer")
+    def test_callback_log_flush(self, mocked_ensure_writer):
+        self.app.config["CALLBACK_LOG_BATCH_SIZE"] = 2
+        for index in range(3):
+            self.callback_log.record(
+                self.test_channel_id, "Hub Challenge", {"details": str(index)}
+            )
+        expiration = datetime(2020, 1, 1)
+        self.callback_log.update_channel(
+            self.test_channel_id, {"lease_seconds": 10, "lease_expiration": expiration}
+        )
+        self.assertEqual(Callback.query.count(), 0)
+
+        self.assertEqual(self.callback_log.flush(), 4)
+        self.assertEqual(self.callback_log.flush(), 0)
+        self.assertEqual(
+            [callback.infos["details"] for callback in Callback.query.all()],
+            ["0", "1", "2"],
+        )
+        channel = Channel.query.get(self.test_channel_id)
+        self.assertEqual(channel.lease_seconds, 10)
+        self.assertEqual(channel.lease_expiration, expiration)
+
+    def test_callback_log_background_writer(self):
+        self.app.config["CALLBACK_LOG_FLUSH_INTERVAL"] = 0.01
+        self.callback_log.record(self.test_channel_id, "Hub Challenge", {})
+        deadline = time.monotonic() + 5
+        while not Callback.query.count() and time.monotonic() < deadline:
+            db.session.rollback()
+            time.sleep(0.01)
+        self.assertEqual(Callback.query.one().channel_id, self.test_channel_id)
+
+    def test_callback_log_sync(self):
+        self.app.config["CALLBACK_LOG_DURABILITY"] = "sync"
+        self.callback_log.record(self.test_channel_id, "Hub Challenge", {})
+        self.assertIsNone(self.callback_log._thread)
+        self.assertEqual(Callback.query.count(), 1)
+
+    @mock.patch("tubee.helper.callback_log._is_running", return_value=False)
+    def test_callback_log_journal(self, mocked_is_running):
+        journal_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, journal_dir)
+        self.app.config["CALLBACK_LOG_DURABILITY"] = "journal"
+        self.app.config["CALLBACK_LOG_JOURNAL_DIR"] = journal_dir
+        self.app.config["CALLBACK_LOG_FLUSH_INTERVAL"] = 60
+        # Left by a crashed process, and by a process crashed while replaying
+        for name, details in [
+            ("callback-log.1.jsonl", "crashed"),
+            ("callback-log.2.jsonl.replay-3", "crashed replaying"),
+        ]:
+            with open(os.path.join(journal_dir, name), "w") as file:
+                record = [
+                    "callback",
+                    {
+                        "channel_id": self.test_channel_id,
+                        "video_id": None,
+                        "type": "Hub Challenge",
+                        "infos": {"details": details},
+                        "timestamp": {"$datetime": "2020-01-01T00:00:00"},
+                    },
+                ]
+                file.write(json.dumps(record) + "\n")
+
+        self.callback_log.record(
+            self.test_channel_id, "Hub Challenge", {"details": "queued"}
+        )
+        # Replayed once by writer thread
+        deadline = time.monotonic() + 5
+        while Callback.query.count() < 2 and time.monotonic() < deadline:
+            db.session.rollback()
+            time.sleep(0.01)
+        self.assertEqual(
+            [callback.timestamp for callback in Callback.query.all()],
+            [datetime(2020, 1, 1)] * 2,
+        )
+        journal = os.path.join(journal_dir, f"callback-log.{os.getpid()}.jsonl")
+        with open(journal) as file:
+            self.assertIn("queued", file.read())
+
+        self.callback_log.close()
+        self.assertEqual(
+            sorted(callback.infos["details"] for callback in Callback.query.all()),
+            ["crashed", "crashed replaying", "queued"],
+        )
+        self.assertEqual(os.listdir(journal_dir), [os.path.basename(journal)])
+        self.assertEqual(os.path.getsize(journal), 0)
+
+    @mock.patch("tubee.helper.callback_log._is_running", return_value=False)
+    def test_callback_log_replay_claimed(self, mocked_is_running):
+        journal_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, journal_dir)
+        self.app.config["CALLBACK_LOG_DURABILITY"] = "journal"
+        self.app.config["CALLBACK_LOG_JOURNAL_DIR"] = journal_dir
+        open(os.path.join(journal_dir, "callback-log.1.jsonl"), "w").close()
+        # Renamed by another process between listing and claiming
+        with mock.patch("os.rename", side_effect=FileNotFoundError):
+            self.assertEqual(self.callback_log.replay(), 0)
+        self.assertEqual(os.listdir(journal_dir), ["callback-log.1.jsonl"])
+
+    def test_callback_log_journal_compact(self):
+        journal_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, journal_dir)
+        self.app.config["CALLBACK_LOG_DURABILITY"] = "journal"
+        self.app.config["CALLBACK_LOG_JOURNAL_DIR"] = journal_dir
+        journal = os.path.join(journal_dir, f"callback-log.{os.getpid()}.jsonl")
+
+        def open_journal():
+            if self.callback_log._journal is None:
+                self.callback_log._journal = open(journal, "a")
+
+        with mock.patch.object(
+            self.callback_log, "_ensure_writer", side_effect=open_journal
+        ):
+            for index in range(3):
+                self.callback_log.record(
+                    self.test_channel_id, "Hub Challenge", {"details": str(index)}
+                )
+            # Unknown column, can never be written
+            self.callback_log.update_channel(self.test_channel_id, {"bogus": 1})
+
+            # Written records are cut from journal
+            self.callback_log._write_batch(self.callback_log._drain(1))
+            with open(journal) as file:
+                lines = file.readlines()
+            self.assertEqual(len(lines), 3)
+            self.assertNotIn('"0"', "".join(lines))
+
+            # Bad record is moved aside, the others are written
+            self.assertEqual(self.callback_log.flush(), 3)
+        self.callback_log._journal.close()
+        self.assertEqual(os.path.getsize(journal), 0)
+        rejected = os.path.join(
+            journal_dir, f"callback-log-rejected.{os.getpid()}.jsonl"
+        )
+        with open(rejected) as file:
+            self.assertIn("bogus", file.read())
+        self.assertEqual(Callback.query.count(), 3)
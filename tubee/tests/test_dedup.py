@@ -0,0 +1,48 @@
+"""Test Cases of helper.dedup"""
+import unittest
+from unittest import mock
+
+from tubee import create_app
+from tubee.helper.dedup import DedupFilter
+
+
+class DedupFilterTestCase(unittest.TestCase):
+    """Test Cases of Notification Dedup Filter"""
+
+    def setUp(self):
+        self.app = create_app("testing")
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+
+    def tearDown(self):
+        self.app_context.pop()
+
+    def test_dedup_filter_seen(self):
+        dedup = DedupFilter(maxsize=10)
+        self.assertFalse(dedup.seen("video", "2020-01-01T00:00:00+00:00"))
+        self.assertTrue(dedup.seen("video", "2020-01-01T00:00:00+00:00"))
+        self.assertFalse(dedup.seen("video", "2020-01-02T00:00:00+00:00"))
+        # Entries without timestamp can not be told apart
+        self.assertFalse(dedup.seen("video", None))
+        self.assertFalse(dedup.seen("video", None))
+        dedup.forget("video", "2020-01-01T00:00:00+00:00")
+        self.assertFalse(dedup.seen("video", "2020-01-01T00:00:00+00:00"))
+        stats = dedup.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 3)
+        self.assertEqual(stats["hit_ratio"], 0.25)
+        self.assertEqual(stats["size"], 2)
+
+    def test_dedup_filter_backend(self):
+        backend = mock.MagicMock()
+        backend.add.side_effect = [False, Exception]
+        dedup = DedupFilter(maxsize=10, backend=backend)
+        # Seen by another worker
+        self.assertTrue(dedup.seen("video", "1"))
+        self.assertTrue(dedup.seen("video", "1"))
+        backend.add.assert_called_once_with("video:1")
+        # Backend failure never drops a notification
+        self.assertFalse(dedup.seen("video", "2"))
+        self.assertEqual(dedup.stats()["errors"], 1)
+        dedup.forget("video", "1")
+        backend.discard.assert_called_once_with("video:1")
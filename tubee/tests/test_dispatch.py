@@ -0,0 +1,92 @@
+"""Test Cases of helper.dispatch"""
+import unittest
+from unittest import mock
+
+from tubee import create_app, db
+from tubee.helper.dispatch import dispatch_index
+from tubee.models import Action, Channel, Subscription, Tag, User
+
+
+class DispatchIndexTestCase(unittest.TestCase):
+    """Test Cases of Action Dispatch Index"""
+
+    def setUp(self):
+        self.app = create_app("testing")
+        self.app.config["SERVER_NAME"] = "test_host"
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        dispatch_index.invalidate()
+        self.test_channel_ids = ["UCBR8-60-B28hp2BmDPdntcQ", "UCpd0xtuhhWwUug1bk84usiA"]
+        self.test_usernames = ["test_user_1", "test_user_2"]
+        for channel_id in self.test_channel_ids:
+            self.init_channel(channel_id)
+        for username in self.test_usernames:
+            User(username, "test_password")
+            for channel_id in self.test_channel_ids:
+                Subscription(username, channel_id)
+
+    @mock.patch("tubee.models.channel.Channel.activate")
+    @mock.patch("tubee.tasks.channels_renew")
+    @mock.patch("tubee.tasks.channels_fetch_videos")
+    @mock.patch("tubee.tasks.channels_refresh")
+    @mock.patch("tubee.models.channel.Channel.update")
+    def init_channel(self, channel_id, *mocked_functions):
+        Channel(channel_id)
+
+    def tearDown(self):
+        dispatch_index.invalidate()
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def create_action(self, username, channel_id=None, tag=None):
+        return Action(
+            username,
+            {
+                "channel_id": channel_id,
+                "tag": tag,
+                "action_name": "test_action",
+                "action_type": "Playlist",
+                "playlist": {"playlist_id": "WL"},
+            },
+        )
+
+    def test_dispatch_index_resolve(self):
+        channel_id = self.test_channel_ids[0]
+        channel_action = self.create_action(self.test_usernames[0], channel_id)
+        self.create_action(self.test_usernames[0], self.test_channel_ids[1])
+        Subscription.query.get((self.test_usernames[1], channel_id)).add_tag("tag")
+        tag_action = self.create_action(self.test_usernames[1], tag="tag")
+
+        pairs = dispatch_index.get(channel_id)
+        self.assertEqual(
+            [(user.username, action.id) for user, action in pairs],
+            [
+                (self.test_usernames[0], channel_action.id),
+                (self.test_usernames[1], tag_action.id),
+            ],
+        )
+        for subscription in Channel.query.get(channel_id).subscriptions:
+            for action in subscription.actions:
+                self.assertIn(action, [action for _, action in pairs])
+
+    def test_dispatch_index_invalidate(self):
+        channel_id = self.test_channel_ids[0]
+        self.assertEqual(dispatch_index.get(channel_id), [])
+
+        action = self.create_action(self.test_usernames[0], channel_id)
+        self.assertEqual(dispatch_index.get(channel_id), [(action.user, action)])
+
+        Subscription.query.get((self.test_usernames[1], channel_id)).add_tag("tag")
+        tag_action = self.create_action(self.test_usernames[1], tag="tag")
+        self.assertEqual(len(dispatch_index.get(channel_id)), 2)
+
+        Tag.query.filter_by(name="tag").one().subscription_tags.delete()
+        db.session.delete(Tag.query.filter_by(name="tag").one())
+        db.session.commit()
+        self.assertIsNone(Action.query.get(tag_action.id))
+        self.assertEqual(dispatch_index.get(channel_id), [(action.user, action)])
+
+        action.delete()
+        self.assertEqual(dispatch_index.get(channel_id), [])
@@ -0,0 +1,98 @@
+"""Test Cases of helper.etag_cache"""
+import copy
+import unittest
+from unittest import mock
+
+from googleapiclient.errors import HttpError
+from httplib2 import Response
+
+from tubee import create_app, db
+from tubee.helper.etag_cache import ETagCache
+from tubee.helper.key_pool import KeyPool
+from tubee.helper.quota import QuotaLedger, execute
+
+
+class ETagCacheTestCase(unittest.TestCase):
+    """Test Cases of ETag Cache of YouTube API Reads"""
+
+    def setUp(self):
+        self.app = create_app("testing")
+        self.app.config["YOUTUBE_API_DEVELOPER_KEYS"] = ["key_a", "key_b"]
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.etag_cache = ETagCache()
+        for target, value in [
+            ("tubee.helper.quota.etag_cache", self.etag_cache),
+            ("tubee.helper.quota.key_pool", KeyPool()),
+            ("tubee.helper.quota.quota_ledger", QuotaLedger()),
+        ]:
+            patcher = mock.patch(target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    @staticmethod
+    def build_request(query="id=a&key=key_x"):
+        return mock.MagicMock(
+            method="GET",
+            headers={},
+            methodId="youtube.channels.list",
+            uri=f"https://www.googleapis.com/youtube/v3/channels?{query}",
+        )
+
+    def test_etag_cache_not_modified(self):
+        response = {"etag": "etag_1", "items": [{"id": "a", "etag": "item_1"}]}
+        not_modified = HttpError(Response({"status": 304}), b"")
+        request = self.build_request()
+        request.execute.side_effect = [copy.deepcopy(response)]
+        result = execute(request, work_class="interactive")
+        self.assertEqual(result, response)
+        self.assertNotIn("If-None-Match", request.headers)
+
+        # Cached regardless of developer key, and copied in and out
+        result["items"].clear()
+        request = self.build_request("key=key_y&id=a")
+        request.execute.side_effect = [not_modified]
+        result = execute(request, work_class="interactive")
+        self.assertEqual(result, response)
+        result["items"].clear()
+        self.assertEqual(request.headers["If-None-Match"], "etag_1")
+
+        changed = {"etag": "etag_2", "items": []}
+        request = self.build_request()
+        request.execute.side_effect = [changed]
+        self.assertEqual(execute(request, work_class="interactive"), changed)
+        request = self.build_request()
+        request.execute.side_effect = [not_modified]
+        self.assertEqual(execute(request, work_class="interactive"), changed)
+        self.assertEqual(request.headers["If-None-Match"], "etag_2")
+
+        stats = self.etag_cache.stats()["youtube.channels.list"]
+        self.assertEqual(stats["hits"], 2)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["changed"], 1)
+        self.assertEqual(stats["hit_rate"], 0.5)
+
+    def test_etag_cache_skipped(self):
+        # Requests authorized by user credentials
+        request = self.build_request("id=a")
+        request.execute.return_value = {"etag": "etag_1"}
+        execute(request, work_class="interactive")
+
+        request = self.build_request()
+        request.method = "POST"
+        request.execute.return_value = {"etag": "etag_1"}
+        execute(request, work_class="interactive")
+
+        self.app.config["YOUTUBE_API_ETAG_CACHE_SIZE"] = 0
+        request = self.build_request()
+        request.execute.return_value = {"etag": "etag_1"}
+        execute(request, work_class="interactive")
+        execute(request, work_class="interactive")
+        self.assertNotIn("If-None-Match", request.headers)
+        self.assertEqual(self.etag_cache.stats(), {})
@@ -0,0 +1,102 @@
+"""Test Cases of helper.executor"""
+import threading
+import time
+import unittest
+from unittest import mock
+
+from tubee import create_app, db
+from tubee.helper.executor import ActionExecutor
+from tubee.models import Action, Channel, Subscription, User
+
+
+class ActionExecutorTestCase(unittest.TestCase):
+    """Test Cases of Concurrent Action Executor"""
+
+    def setUp(self):
+        self.app = create_app("testing")
+        self.app.config["SERVER_NAME"] = "test_host"
+        self.app.config["ACTION_EXECUTOR_LIMITS"] = {"Download": 2, "Pushover": 1}
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.test_channel_id = "UCBR8-60-B28hp2BmDPdntcQ"
+        self.test_usernames = [f"test_user_{i}" for i in range(6)]
+        self.init_channel()
+        for username in self.test_usernames:
+            User(username, "test_password")
+            Subscription(username, self.test_channel_id)
+        self.executor = ActionExecutor()
+        self.running = {}
+        self.peak = {}
+        self.lock = threading.Lock()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    @mock.patch("tubee.models.channel.Channel.activate")
+    @mock.patch("tubee.tasks.channels_renew")
+    @mock.patch("tubee.tasks.channels_fetch_videos")
+    @mock.patch("tubee.tasks.channels_refresh")
+    @mock.patch("tubee.models.channel.Channel.update")
+    def init_channel(self, *mocked_functions):
+        Channel(self.test_channel_id)
+
+    def create_action(self, username, action_type, details):
+        return Action(
+            username,
+            {
+                "channel_id": self.test_channel_id,
+                "tag": None,
+                "action_name": "test_action",
+                "action_type": action_type,
+                action_type.lower(): details,
+            },
+        )
+
+    def mocked_execute(self, action, **parameters):
+        key = self.executor.service_key(action) or action.type.value
+        with self.lock:
+            self.running[key] = self.running.get(key, 0) + 1
+            self.peak[key] = max(self.peak.get(key, 0), self.running[key])
+        time.sleep(0.05)
+        with self.lock:
+            self.running[key] -= 1
+        if action.username == self.test_usernames[0]:
+            raise RuntimeError("test_error")
+        return parameters["video_id"]
+
+    def test_executor_execute(self):
+        actions = [
+            self.create_action(username, "Download", {"file_path": "/"})
+            for username in self.test_usernames
+        ] + [
+            self.create_action(username, "Notification", {"service": "Pushover"})
+            for username in self.test_usernames[:3]
+        ]
+        with mock.patch.object(Action, "execute", autospec=True) as mocked:
+            mocked.side_effect = self.mocked_execute
+            results = self.executor.execute(actions, video_id="test_video")
+
+        self.assertEqual(set(results), {action.id for action in actions})
+        for action in actions:
+            if action.username == self.test_usernames[0]:
+                self.assertEqual(results[action.id]["error"], "RuntimeError")
+                self.assertEqual(results[action.id]["description"], "test_error")
+            else:
+                self.assertEqual(results[action.id], "test_video")
+        self.assertEqual(self.peak["Download"], 2)
+        self.assertEqual(self.peak["Pushover"], 1)
+
+    def test_executor_execute_sequential(self):
+        self.app.config["ACTION_EXECUTOR_MAX_WORKERS"] = 1
+        actions = [
+            self.create_action(username, "Playlist", {"playlist_id": "WL"})
+            for username in self.test_usernames
+        ]
+        with mock.patch.object(Action, "execute", autospec=True) as mocked:
+            mocked.side_effect = self.mocked_execute
+            results = self.executor.execute(actions, video_id="test_video")
+        self.assertEqual(len(results), len(actions))
+        self.assertEqual(self.peak["Playlist"], 1)
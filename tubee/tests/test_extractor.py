@@ -0,0 +1,73 @@
+"""Test Cases of helper.extractor"""
+import sys
+import threading
+import time
+import unittest
+
+from tubee.helper.extractor import (
+    ExtractorBusy,
+    ExtractorError,
+    ExtractorPool,
+    ExtractorTimeout,
+)
+
+# Answer with pid of worker, hang on "sleep", fail on "fail"
+FAKE_WORKER = """
+import json, os, sys, time
+for line in sys.stdin:
+    url = json.loads(line)["url"]
+    if url == "sleep":
+        time.sleep(60)
+    response = {"error": "failed"} if url == "fail" else {"result": os.getpid()}
+    sys.stdout.write(json.dumps(response) + "\\n")
+    sys.stdout.flush()
+"""
+
+
+class ExtractorPoolTestCase(unittest.TestCase):
+    """Test Cases of Extraction Process Pool"""
+
+    def setUp(self):
+        self.pool = ExtractorPool(
+            command=[sys.executable, "-c", FAKE_WORKER],
+            pool_size=1,
+            timeout=5,
+            max_queue=0,
+            max_calls=2,
+        )
+        self.addCleanup(self.pool.close)
+
+    def test_extractor_pool_recycle(self):
+        pid = self.pool.extract("video")
+        self.assertEqual(self.pool.extract("video"), pid)
+        self.assertEqual(self.pool.stats()["idle"], 0)
+        # Recycled after max_calls
+        self.assertNotEqual(self.pool.extract("video"), pid)
+        with self.assertRaisesRegex(ExtractorError, "failed"):
+            self.pool.extract("fail")
+        self.assertEqual(self.pool.stats(), {"idle": 0, "busy": 0, "waiting": 0})
+
+    def test_extractor_pool_timeout(self):
+        pid = self.pool.extract("video")
+        with self.assertRaises(ExtractorTimeout):
+            self.pool.extract("sleep", timeout=0.2)
+        self.assertNotEqual(self.pool.extract("video"), pid)
+
+    def test_extractor_pool_busy(self):
+        deadline = time.monotonic() + 5
+        errors = []
+
+        def hang():
+            try:
+                self.pool.extract("sleep", timeout=1)
+            except ExtractorTimeout as error:
+                errors.append(error)
+
+        thread = threading.Thread(target=hang)
+        thread.start()
+        while not self.pool.stats()["busy"] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        with self.assertRaises(ExtractorBusy):
+            self.pool.extract("video")
+        thread.join()
+        self.assertEqual(len(errors), 1)
@@ -0,0 +1,54 @@
+"""Test Cases of helper.feed"""
+import unittest
+from os.path import dirname, join
+
+from tubee.helper.feed import parse_notification
+
+TEST_CHANNEL_ID = "UCBR8-60-B28hp2BmDPdntcQ"
+
+
+def read_data(filename):
+    with open(join(dirname(__file__), "data", filename), "rb") as file:
+        return file.read()
+
+
+class FeedPackageTestCase(unittest.TestCase):
+    """Test Cases of Feed Parser"""
+
+    def test_parse_notification(self):
+        entries = parse_notification(read_data("youtube_notification.xml"))
+        self.assertEqual(len(entries), 2)
+        self.assertEqual(entries[0].video_id, "lvSkIw2MLGM")
+        self.assertEqual(entries[1].video_id, "uZqZxbKhgu8")
+        for entry in entries:
+            self.assertEqual(entry.channel_id, TEST_CHANNEL_ID)
+            self.assertFalse(entry.deleted)
+            self.assertIsNotNone(entry.title)
+            self.assertTrue(entry.published.startswith("2020-08-0"))
+            self.assertTrue(entry.updated.startswith("2020-08-0"))
+
+    def test_parse_notification_text(self):
+        entries = parse_notification(
+            read_data("youtube_notification.xml").decode("utf-8")
+        )
+        self.assertEqual(entries[0].title[:6], "Easton")
+
+    def test_parse_notification_deleted(self):
+        entries = parse_notification(read_data("youtube_notification_deleted.xml"))
+        self.assertEqual(len(entries), 1)
+        self.assertTrue(entries[0].deleted)
+        self.assertEqual(entries[0].video_id, "lvSkIw2MLGM")
+        self.assertEqual(entries[0].channel_id, TEST_CHANNEL_ID)
+        self.assertEqual(entries[0].updated, "2020-08-07T01:32:12.371522+00:00")
+        self.assertIsNone(entries[0].published)
+
+    def test_parse_notification_invalid(self):
+        self.assertEqual(parse_notification(""), [])
+        self.assertEqual(parse_notification("not xml"), [])
+        self.assertEqual(parse_notification("<feed></feed>"), [])
+
+    def test_parse_notification_truncated(self):
+        data = read_data("youtube_notification.xml")
+        second_entry = data.index(b"<entry>", data.index(b"</entry>"))
+        entries = parse_notification(data[: second_entry + 20])
+        self.assertEqual([entry.video_id for entry in entries], ["lvSkIw2MLGM"])
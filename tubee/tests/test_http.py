@@ -0,0 +1,67 @@
+"""Test Cases of helper.http"""
+import unittest
+from unittest import mock
+
+import requests
+
+from tubee.helper.http import HTTPClient
+
+TEST_URL = "https://pubsubhubbub.appspot.com/subscribe"
+
+
+class HTTPClientTestCase(unittest.TestCase):
+    """Test Cases of Outbound HTTP Client"""
+
+    def setUp(self):
+        self.client = HTTPClient(retries=2, retry_backoff=0)
+        self.mocked_request = mock.MagicMock()
+        self.client._session = mock.MagicMock(request=self.mocked_request)
+
+    def test_http_default_timeout(self):
+        self.mocked_request.return_value = mock.MagicMock(status_code=200)
+        self.client.get(TEST_URL)
+        self.mocked_request.assert_called_once_with(
+            "GET", TEST_URL, timeout=self.client.timeout
+        )
+        self.client.get(TEST_URL, timeout=1)
+        self.assertEqual(self.mocked_request.call_args[1]["timeout"], 1)
+
+    def test_http_retry_idempotent(self):
+        self.mocked_request.side_effect = [
+            requests.ConnectionError(),
+            mock.MagicMock(status_code=503),
+            mock.MagicMock(status_code=202),
+        ]
+        response = self.client.get(TEST_URL)
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(self.mocked_request.call_count, 3)
+        stats = self.client.stats()["pubsubhubbub.appspot.com"]
+        self.assertEqual(stats["requests"], 3)
+        self.assertEqual(stats["errors"], 2)
+        self.assertEqual(stats["retries"], 2)
+
+        self.mocked_request.side_effect = requests.Timeout()
+        with self.assertRaises(requests.Timeout):
+            self.client.get(TEST_URL)
+
+    def test_http_no_retry_non_idempotent(self):
+        self.mocked_request.side_effect = requests.ConnectionError()
+        with self.assertRaises(requests.ConnectionError):
+            self.client.post(TEST_URL)
+        self.assertEqual(self.mocked_request.call_count, 1)
+
+        self.mocked_request.reset_mock()
+        self.mocked_request.side_effect = None
+        self.mocked_request.return_value = mock.MagicMock(status_code=503)
+        self.assertEqual(self.client.post(TEST_URL).status_code, 503)
+        self.assertEqual(self.mocked_request.call_count, 1)
+        self.client.post(TEST_URL, idempotent=True)
+        self.assertEqual(self.mocked_request.call_count, 4)
+
+    def test_http_configure(self):
+        session = self.client._session
+        self.client.configure(read_timeout=5)
+        session.close.assert_called_once()
+        self.assertEqual(self.client.timeout[1], 5)
+        self.assertIsInstance(self.client.session, requests.Session)
+        self.assertIs(self.client.session, self.client.session)
@@ -1,6 +1,7 @@
 """Test Cases of helper.hub"""
 import unittest
 import uuid
+from datetime import datetime, timedelta, timezone
 from os.path import dirname, join
 from unittest import mock
 from urllib.parse import urljoin
@@ -78,3 +79,44 @@ class HubPackageTestCase(unittest.TestCase):
         self.assertEqual(
             results["requests_url"], urljoin(GOOGLE_HUB, "subscription-details")
         )
+
+    def test_hub_parse_details(self):
+        with open(join(dirname(__file__), "data", "Pubsubhubbub Details.html")) as file:
+            results = hub.parse_details(file.read())
+        self.assertIsInstance(results, hub.HubDetails)
+        self.assertFalse(hasattr(results, "__dict__"))
+        self.assertEqual(results.state, "verified")
+        self.assertEqual(
+            results.stat,
+            "0 delivery request(s) per second to tubee.tomy.me, 0% errors",
+        )
+        self.assertEqual(
+            results.expiration, datetime(2020, 7, 24, 10, 34, 22, tzinfo=timezone.utc)
+        )
+        self.assertIsNone(results.last_unsubscribe)
+        self.assertEqual(
+            results.last_challenge_error,
+            (
+                datetime(2020, 7, 16, 11, 30, 48, tzinfo=timezone.utc),
+                "Bad response code 504",
+            ),
+        )
+        self.assertEqual(
+            results.last_notification,
+            datetime(2020, 7, 19, 10, 34, 26, tzinfo=timezone.utc),
+        )
+        self.assertIsNone(hub.parse_details("<html></html>").state)
+
+    def test_hub_parse_timestamp(self):
+        offset = timezone(-timedelta(hours=1, minutes=30))
+        self.assertEqual(
+            hub._parse_timestamp("Sun, 19 Jul 2020 10:34:26 -0130"),
+            datetime(2020, 7, 19, 10, 34, 26, tzinfo=offset),
+        )
+        # Fallback to dateutil
+        self.assertEqual(
+            hub._parse_timestamp("2020-07-19T10:34:26Z"),
+            datetime(2020, 7, 19, 10, 34, 26, tzinfo=timezone.utc),
+        )
+        self.assertIsNone(hub._parse_timestamp("n/a"))
+        self.assertIsNone(hub._parse_summary("n/a (HTTP 500)"))
@@ -0,0 +1,60 @@
+"""Test Cases of helper.hub_async"""
+import asyncio
+import time
+import unittest
+from unittest import mock
+
+from tubee.helper import hub_async
+
+GOOGLE_HUB = "https://pubsubhubbub.appspot.com/"
+TEST_PAIRS = [
+    (
+        f"https://tubee.tubee/channel/{channel_id}/callback",
+        f"https://www.youtube.com/xml/feeds/videos.xml?channel_id={channel_id}",
+    )
+    for channel_id in [
+        "UCBR8-60-B28hp2BmDPdntcQ",
+        "UCpd0xtuhhWwUug1bk84usiA",
+        "UCnIQPPwWpO_EFEqLny6TFTw",
+    ]
+]
+
+
+class HubAsyncTestCase(unittest.TestCase):
+    """Test Cases of Concurrent Hub Communication"""
+
+    @mock.patch("tubee.helper.hub.subscribe")
+    def test_hub_subscribe_many(self, mocked_subscribe):
+        def mock_subscribe(hub_url, callback_url, topic_url, **kwargs):
+            if topic_url == TEST_PAIRS[1][1]:
+                raise RuntimeError("test")
+            return mock.MagicMock(success=True, topic_url=topic_url)
+
+        mocked_subscribe.side_effect = mock_subscribe
+        results = hub_async.subscribe_many(GOOGLE_HUB, TEST_PAIRS, lease_seconds=300)
+        self.assertEqual(list(results), [topic for _, topic in TEST_PAIRS])
+        self.assertTrue(results[TEST_PAIRS[0][1]].success)
+        self.assertEqual(results[TEST_PAIRS[2][1]].topic_url, TEST_PAIRS[2][1])
+        self.assertIsInstance(results[TEST_PAIRS[1][1]], RuntimeError)
+        for call in mocked_subscribe.call_args_list:
+            self.assertEqual(call[0][0], GOOGLE_HUB)
+            self.assertEqual(call[1], {"lease_seconds": 300})
+        self.assertEqual(hub_async.subscribe_many(GOOGLE_HUB, []), {})
+
+    @mock.patch("tubee.helper.hub.details")
+    def test_hub_details_many(self, mocked_details):
+        mocked_details.return_value = {"state": "verified"}
+        results = hub_async.details_many(GOOGLE_HUB, TEST_PAIRS, concurrency=2)
+        self.assertEqual(len(results), len(TEST_PAIRS))
+        self.assertEqual(mocked_details.call_count, len(TEST_PAIRS))
+
+    def test_hub_rate_limiter(self):
+        limiter = hub_async.HostRateLimiter(rate=50)
+
+        async def acquire_many():
+            for _ in range(4):
+                await limiter.acquire(GOOGLE_HUB)
+
+        start = time.monotonic()
+        asyncio.run(acquire_many())
+        self.assertGreaterEqual(time.monotonic() - start, 0.05)
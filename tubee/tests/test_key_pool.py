@@ -0,0 +1,138 @@
+"""Test Cases of helper.key_pool"""
+import json
+import unittest
+from datetime import datetime
+from unittest import mock
+
+from dateutil import tz
+from googleapiclient.errors import HttpError
+from httplib2 import Response
+
+from tubee import create_app, db
+from tubee.exceptions import CircuitOpen, QuotaExceeded
+from tubee.helper.key_pool import KeyPool, quota_day, seconds_until_reset
+from tubee.helper.quota import QuotaLedger, execute
+from tubee.helper.youtube import build_youtube_api
+
+
+def build_error(reason):
+    content = {"error": {"errors": [{"reason": reason}], "code": 403}}
+    return HttpError(Response({"status": 403}), json.dumps(content).encode())
+
+
+class KeyPoolTestCase(unittest.TestCase):
+    """Test Cases of YouTube API Key Pool"""
+
+    def setUp(self):
+        self.app = create_app("testing")
+        self.app.config["YOUTUBE_API_DEVELOPER_KEYS"] = ["key_a", "key_b"]
+        self.app.config["YOUTUBE_API_KEY_DAILY_LIMIT"] = 100
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.key_pool = KeyPool()
+        self.ledger = QuotaLedger()
+        for target, value in [
+            ("tubee.helper.quota.key_pool", self.key_pool),
+            ("tubee.helper.quota.quota_ledger", self.ledger),
+        ]:
+            patcher = mock.patch(target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_quota_day(self):
+        now = datetime(2020, 1, 2, 7, 30, tzinfo=tz.UTC)
+        self.assertEqual(quota_day(now).isoformat(), "2020-01-01")
+        self.assertEqual(seconds_until_reset(now), 30 * 60)
+
+    @mock.patch("tubee.helper.key_pool.random.choices")
+    def test_key_pool_choose(self, mocked_choices):
+        mocked_choices.side_effect = lambda keys, weights: [keys[0]]
+        self.assertEqual(self.key_pool.choose(cost=60), "key_a")
+        self.assertEqual(self.key_pool.choose(cost=60), "key_a")
+        # Weighted by units left, never below 1
+        self.assertEqual(self.key_pool.choose(), "key_a")
+        self.assertEqual(mocked_choices.call_args[1]["weights"], [1, 100])
+        self.assertEqual(self.key_pool.choose(exclude=["key_a"]), "key_b")
+
+        self.assertFalse(
+            self.key_pool.report_error("key_a", build_error("backendError"))
+        )
+        self.assertTrue(
+            self.key_pool.report_error("key_a", build_error("quotaExceeded"))
+        )
+        self.assertEqual(self.key_pool.choose(), "key_b")
+        self.assertIsNone(self.key_pool.choose(exclude=["key_b"]))
+        stats = self.key_pool.stats()
+        self.assertEqual(stats["...ey_a"]["errors"], 2)
+        self.assertTrue(stats["...ey_a"]["exhausted"])
+
+    def test_quota_execute_rotate_key(self):
+        request = mock.MagicMock(
+            methodId="youtube.videos.list",
+            uri="https://www.googleapis.com/youtube/v3/videos?id=a&key=key_x",
+        )
+        request.execute.side_effect = [
+            build_error("quotaExceeded"),
+            {"items": []},
+            build_error("quotaExceeded"),
+        ]
+        self.assertEqual(execute(request, work_class="interactive"), {"items": []})
+        self.assertEqual(request.execute.call_count, 2)
+        self.assertIn("id=a", request.uri)
+        exhausted = [
+            key for key, state in self.key_pool.stats().items() if state["exhausted"]
+        ]
+        self.assertEqual(len(exhausted), 1)
+        self.assertNotIn(exhausted[0][-4:], request.uri)
+
+        with self.assertRaises(QuotaExceeded):
+            execute(request, work_class="interactive")
+
+    @mock.patch("tubee.helper.quota.call")
+    def test_quota_execute_developer_client(self, mocked_call):
+        # Only the list of keys is configured
+        self.app.config["YOUTUBE_API_DEVELOPER_KEY"] = None
+        mocked_call.side_effect = lambda request, endpoint: {"uri": request.uri}
+        request = build_youtube_api().videos().list(part="snippet", id="a")
+        uri = execute(request, work_class="interactive")["uri"]
+        self.assertRegex(uri, r"[?&]key=key_[ab](&|$)")
+        self.assertEqual(
+            sum(state["calls"] for state in self.key_pool.stats().values()), 1
+        )
+
+    def test_quota_execute_circuit_open(self):
+        request = mock.MagicMock(
+            methodId="youtube.videos.list",
+            uri="https://www.googleapis.com/youtube/v3/videos?id=a&key=key_x",
+        )
+        circuit_breaker = mock.MagicMock()
+        for target in ["quota", "resilience"]:
+            patcher = mock.patch(
+                f"tubee.helper.{target}.circuit_breaker", circuit_breaker
+            )
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        # Open circuit is checked before charging
+        circuit_breaker.retry_after.return_value = 10
+        with self.assertRaises(CircuitOpen):
+            execute(request, work_class="backfill")
+
+        # Opened after check, charge is given back
+        circuit_breaker.retry_after.return_value = 0
+        circuit_breaker.allow.return_value = 10
+        with self.assertRaises(CircuitOpen):
+            execute(request, work_class="backfill")
+
+        request.execute.assert_not_called()
+        stats = self.ledger.stats()["backfill"]
+        self.assertEqual(stats["used"], 0)
+        self.assertEqual(stats["tokens"], stats["capacity"])
+        for state in self.key_pool.stats().values():
+            self.assertEqual((state["calls"], state["units"]), (0, 0))
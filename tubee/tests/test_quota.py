@@ -0,0 +1,113 @@
+"""Test Cases of helper.quota"""
+import unittest
+from datetime import timedelta
+from unittest import mock
+
+from tubee import create_app, db
+from tubee.exceptions import QuotaExceeded
+from tubee.helper.key_pool import quota_day
+from tubee.helper.quota import (
+    QuotaLedger,
+    TokenBucket,
+    current_context,
+    execute,
+    quota_context,
+    usage_report,
+)
+from tubee.models import QuotaUsage
+
+
+class QuotaTestCase(unittest.TestCase):
+    """Test Cases of YouTube API Quota Ledger"""
+
+    def setUp(self):
+        self.app = create_app("testing")
+        self.app.config["QUOTA_DAILY_LIMIT"] = 4000
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        patcher = mock.patch("tubee.helper.quota.quota_ledger", QuotaLedger())
+        self.ledger = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    @mock.patch("tubee.helper.quota.time")
+    def test_token_bucket(self, mocked_time):
+        mocked_time.monotonic.return_value = 100
+        bucket = TokenBucket(rate=2, capacity=10)
+        self.assertEqual(bucket.consume(8), 0)
+        self.assertEqual(bucket.consume(4), 1)
+        mocked_time.monotonic.return_value = 101
+        self.assertEqual(bucket.consume(4), 0)
+        self.assertEqual(bucket.consume(1, overdraw=True), 0)
+        self.assertEqual(bucket.level(), -1)
+        mocked_time.monotonic.return_value = 200
+        self.assertEqual(bucket.level(), 10)
+
+    def test_quota_context(self):
+        self.assertEqual(current_context(), ("backfill", "unknown"))
+        with quota_context("renewal", "test_task"):
+            with quota_context("action"):
+                self.assertEqual(current_context(), ("action", "test_task"))
+            self.assertEqual(current_context(), ("renewal", "test_task"))
+        with self.app.test_request_context("/"):
+            self.assertEqual(current_context(), ("interactive", "main.dashboard"))
+
+    def test_quota_execute(self):
+        request = mock.MagicMock(methodId="youtube.search.list")
+        request.execute.return_value = {"items": []}
+        with quota_context("action", "test_task"):
+            self.assertEqual(execute(request), {"items": []})
+            execute(request)
+        usage = QuotaUsage.query.one()
+        self.assertEqual(usage.endpoint, "youtube.search.list")
+        self.assertEqual(usage.caller, "test_task")
+        self.assertEqual((usage.calls, usage.units), (2, 200))
+
+        # Burst of action is 4000 * 0.2 * 0.25 = 200 units
+        with self.assertRaises(QuotaExceeded) as context:
+            execute(request, work_class="action")
+        self.assertGreater(context.exception.retry_after, 0)
+        self.assertEqual(request.execute.call_count, 2)
+
+        # Interactive request is never deferred, burst is 300 units
+        for _ in range(4):
+            execute(request, work_class="interactive")
+        report = usage_report()
+        self.assertEqual(report["used"], 600)
+        self.assertLess(report["work_classes"]["interactive"]["tokens"], 0)
+        self.assertEqual(report["work_classes"]["interactive"]["burn_rate"], 80)
+
+    def test_quota_daily_budget(self):
+        # Spent today by other processes, backfill share is 4000 * 0.3 = 1200
+        db.session.add(
+            QuotaUsage(
+                date=quota_day(),
+                endpoint="youtube.search.list",
+                caller="other_worker",
+                work_class="backfill",
+                calls=11,
+                units=1150,
+            )
+        )
+        db.session.commit()
+        request = mock.MagicMock(methodId="youtube.search.list")
+        request.execute.return_value = {"items": []}
+        with self.assertRaises(QuotaExceeded) as context:
+            execute(request, work_class="backfill")
+        retry_after = timedelta(seconds=context.exception.retry_after)
+        self.assertLessEqual(retry_after, timedelta(days=1))
+        request.execute.assert_not_called()
+
+        execute(request, work_class="backfill", cost=50)
+        with self.assertRaises(QuotaExceeded):
+            execute(request, work_class="backfill", cost=1)
+        # Interactive request is never deferred
+        execute(request, work_class="interactive")
+        stats = self.ledger.stats()
+        self.assertEqual(stats["backfill"]["used"], 1200)
+        self.assertEqual(stats["backfill"]["budget"], 1200)
@@ -0,0 +1,113 @@
+"""Test Cases of helper.resilience"""
+import json
+import unittest
+from unittest import mock
+
+from googleapiclient.errors import HttpError
+from httplib2 import Response
+
+from tubee import create_app
+from tubee.exceptions import CircuitOpen
+from tubee.helper.resilience import (
+    CircuitBreaker,
+    LatencyHistogram,
+    backoff_delay,
+    call,
+    is_retryable,
+)
+
+
+def build_error(status, reason):
+    content = {"error": {"errors": [{"reason": reason}], "code": status}}
+    return HttpError(Response({"status": status}), json.dumps(content).encode())
+
+
+class ResilienceTestCase(unittest.TestCase):
+    """Test Cases of Resilient YouTube API Calls"""
+
+    def setUp(self):
+        self.app = create_app("testing")
+        self.app.config["YOUTUBE_API_RETRIES"] = 2
+        self.app.config["YOUTUBE_API_BREAKER_THRESHOLD"] = 3
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.circuit_breaker = CircuitBreaker()
+        self.latency_histogram = LatencyHistogram()
+        for target, value in [
+            ("tubee.helper.resilience.circuit_breaker", self.circuit_breaker),
+            ("tubee.helper.resilience.latency_histogram", self.latency_histogram),
+        ]:
+            patcher = mock.patch(target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch("tubee.helper.resilience.time.sleep")
+        self.mocked_sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.app_context.pop()
+
+    def test_is_retryable(self):
+        self.assertTrue(is_retryable(build_error(503, "backendError")))
+        self.assertTrue(is_retryable(build_error(403, "userRateLimitExceeded")))
+        self.assertTrue(is_retryable(ConnectionResetError()))
+        self.assertFalse(is_retryable(build_error(403, "quotaExceeded")))
+        self.assertFalse(is_retryable(build_error(404, "notFound")))
+        self.assertFalse(is_retryable(KeyError()))
+
+    def test_backoff_delay(self):
+        for attempt in range(6):
+            delay = backoff_delay(attempt, 0.5, 4)
+            self.assertGreaterEqual(delay, 0)
+            self.assertLessEqual(delay, min(4, 0.5 * 2 ** attempt))
+
+    def test_call_retry(self):
+        request = mock.MagicMock()
+        request.execute.side_effect = [
+            build_error(503, "backendError"),
+            build_error(500, "internalError"),
+            {"items": []},
+        ]
+        self.assertEqual(call(request, "youtube.videos.list"), {"items": []})
+        self.assertEqual(self.mocked_sleep.call_count, 2)
+        self.assertEqual(self.circuit_breaker.stats()["failures"], 0)
+        stats = self.latency_histogram.stats()["youtube.videos.list"]
+        self.assertEqual(stats["count"], 3)
+        self.assertEqual(stats["buckets"]["+Inf"], 3)
+
+        # Not retried
+        request.execute.side_effect = [build_error(404, "notFound")]
+        with self.assertRaises(HttpError):
+            call(request, "youtube.videos.list")
+        self.assertEqual(self.mocked_sleep.call_count, 2)
+
+        request.execute.side_effect = [build_error(503, "backendError")] * 3
+        with self.assertRaises(HttpError):
+            call(request, "youtube.videos.list")
+        self.assertEqual(request.execute.call_count, 7)
+
+    def test_call_circuit_breaker(self):
+        request = mock.MagicMock()
+        request.execute.side_effect = [build_error(503, "backendError")] * 3
+        with self.assertRaises(HttpError):
+            call(request, "youtube.channels.list")
+        self.assertEqual(self.circuit_breaker.stats()["state"], "open")
+
+        # Fail fast while open
+        with self.assertRaises(CircuitOpen) as context:
+            call(request, "youtube.channels.list")
+        self.assertGreater(context.exception.retry_after, 0)
+        self.assertEqual(request.execute.call_count, 3)
+
+        # Failed probe opens circuit again, without retry
+        self.app.config["YOUTUBE_API_BREAKER_RESET_TIMEOUT"] = 0
+        request.execute.side_effect = [build_error(503, "backendError")]
+        with self.assertRaises(HttpError):
+            call(request, "youtube.channels.list")
+        self.assertEqual(self.circuit_breaker.stats()["state"], "open")
+
+        request.execute.side_effect = [{"items": []}]
+        self.assertEqual(call(request, "youtube.channels.list"), {"items": []})
+        self.assertEqual(
+            self.circuit_breaker.stats(), {"state": "closed", "failures": 0}
+        )
@@ -0,0 +1,79 @@
+"""Test Cases of helper.retention"""
+import gzip
+import json
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from tubee import create_app, db
+from tubee.helper.retention import apply_policies, apply_policy
+from tubee.models import Callback, Channel, Notification
+
+
+class RetentionTestCase(unittest.TestCase):
+    """Test Cases of History Retention"""
+
+    def setUp(self):
+        self.app = create_app("testing")
+        self.archive_dir = tempfile.mkdtemp()
+        self.app.config["RETENTION_ARCHIVE_DIR"] = self.archive_dir
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.test_channel_id = "UCBR8-60-B28hp2BmDPdntcQ"
+        db.session.execute(Channel.__table__.insert(), [{"id": self.test_channel_id}])
+        now = datetime.utcnow()
+        db.session.execute(
+            Callback.__table__.insert(),
+            [
+                {
+                    "channel_id": self.test_channel_id,
+                    "type": "Hub Notification",
+                    "infos": {"data": str(days)},
+                    "timestamp": now - timedelta(days=days),
+                }
+                for days in [1, 31, 32, 33, 40, 60]
+            ],
+        )
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        shutil.rmtree(self.archive_dir)
+
+    def test_retention_apply_policy(self):
+        batches = []
+        metrics = apply_policy("callback", 30, batch_size=2, progress=batches.append)
+        self.assertEqual(metrics["archived"], 5)
+        self.assertEqual(metrics["deleted"], 5)
+        self.assertEqual(metrics["batches"], 3)
+        self.assertEqual([batch["deleted"] for batch in batches], [2, 4, 5])
+        self.assertEqual(Callback.query.one().infos["data"], "1")
+
+        with gzip.open(metrics["archive"], "rt") as file:
+            rows = [json.loads(line) for line in file]
+        self.assertEqual(
+            [row["infos"]["data"] for row in rows], ["60", "40", "33", "32", "31"]
+        )
+        self.assertEqual(rows[0]["channel_id"], self.test_channel_id)
+
+        # Nothing left to remove, archive is appended on next run
+        self.assertEqual(apply_policy("callback", 30)["batches"], 0)
+        apply_policy("callback", 0)
+        with gzip.open(metrics["archive"], "rt") as file:
+            self.assertEqual(len(file.readlines()), 6)
+
+    def test_retention_apply_policies(self):
+        self.app.config["RETENTION_POLICIES"] = {
+            "callback": {"days": 35, "archive": False},
+            "notification": {"days": 30},
+        }
+        results = apply_policies()
+        self.assertEqual(results["callback"]["deleted"], 2)
+        self.assertIsNone(results["callback"]["archive"])
+        self.assertEqual(results["notification"]["deleted"], 0)
+        self.assertEqual(Callback.query.count(), 4)
+        self.assertEqual(Notification.query.count(), 0)
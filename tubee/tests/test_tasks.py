@@ -1,9 +1,20 @@
 """Test Cases of Celery Tasks"""
+import time
 import unittest
 from unittest import mock
 
 from tubee import create_app, db
-from tubee.tasks import channels_fetch_videos, channels_refresh, channels_renew
+from tubee.exceptions import QuotaExceeded
+from tubee.models import Channel
+from tubee.tasks import (
+    callback_process,
+    channels_audit,
+    channels_fetch_videos,
+    channels_refresh,
+    channels_renew,
+    channels_renew_due,
+    retention_apply,
+)
 
 
 class BasicsTestCase(unittest.TestCase):
@@ -37,6 +48,36 @@ class BasicsTestCase(unittest.TestCase):
         mocked_channel.query.get.return_value = mock.MagicMock()
         channels_renew(self.test_channel_ids)
 
+    @mock.patch("tubee.tasks.channels_renew")
+    @mock.patch("tubee.tasks.Channel")
+    def test_channels_renew_due(self, mocked_channel, mocked_channels_renew):
+        self.app.config["HUB_RENEWAL_BATCH_SIZE"] = 2
+        mocked_channel.claim_due_renewals.side_effect = [
+            self.test_channel_ids[:2],
+            self.test_channel_ids[2:],
+            [],
+        ]
+        self.assertEqual(channels_renew_due(), self.test_channel_ids)
+        self.assertEqual(mocked_channels_renew.apply_async.call_count, 2)
+        for call in mocked_channels_renew.apply_async.call_args_list:
+            self.assertNotIn("countdown", call[1])
+
+    @mock.patch("tubee.tasks.channels_refresh")
+    def test_channels_audit(self, mocked_channels_refresh):
+        self.assertEqual(channels_audit(), [])
+        mocked_channels_refresh.apply_async.assert_not_called()
+
+        self.app.config["HUB_RENEWAL_BATCH_SIZE"] = 2
+        db.session.execute(
+            Channel.__table__.insert(),
+            [
+                {"id": channel_id, "active": index != 0}
+                for index, channel_id in enumerate(self.test_channel_ids)
+            ],
+        )
+        self.assertEqual(channels_audit(), sorted(self.test_channel_ids[1:]))
+        self.assertEqual(mocked_channels_refresh.apply_async.call_count, 2)
+
     @mock.patch("tubee.tasks.Channel")
     def test_channels_refresh(self, mocked_channel):
 
@@ -53,3 +94,95 @@ class BasicsTestCase(unittest.TestCase):
 
         mocked_channel.query.get.return_value = mock.MagicMock()
         channels_fetch_videos(self.test_channel_ids)
+
+    @mock.patch("tubee.tasks.channels_fetch_videos.retry")
+    @mock.patch("tubee.tasks.Channel")
+    def test_channels_fetch_videos_deferred(self, mocked_channel, mocked_retry):
+        channel = mocked_channel.query.get.return_value
+        channel.fetch_videos.side_effect = [{}, QuotaExceeded("backfill", 30)]
+        mocked_retry.return_value = RuntimeError("Retry")
+        with self.assertRaisesRegex(RuntimeError, "Retry"):
+            channels_fetch_videos(self.test_channel_ids)
+        kwargs = mocked_retry.call_args[1]
+        self.assertEqual(kwargs["args"], [self.test_channel_ids[1:]])
+        self.assertEqual(kwargs["countdown"], 30)
+
+    @mock.patch("tubee.tasks.callback_log")
+    @mock.patch("tubee.tasks.Callback")
+    @mock.patch("tubee.tasks.Channel")
+    def test_callback_process_notification(
+        self, mocked_channel, mocked_callback, mocked_callback_log
+    ):
+        infos = {"data": "<feed></feed>"}
+        mocked_channel.query.get.return_value = None
+        self.assertEqual(
+            callback_process(
+                channel_id=self.test_channel_ids[0],
+                infos=infos,
+                enqueued_at=time.time(),
+            ),
+            {},
+        )
+        mocked_callback_log.record.assert_not_called()
+
+        mocked_channel.query.get.return_value = mock.MagicMock()
+        mocked_callback.process_notification.return_value = (
+            {1: None},
+            ["test_video", "test_video_2"],
+        )
+        results = callback_process(
+            channel_id=self.test_channel_ids[0],
+            infos=infos,
+            enqueued_at=time.time(),
+            response_time=0.1,
+        )
+        self.assertEqual(results, {1: None})
+        self.assertEqual(mocked_callback_log.record.call_count, 2)
+        args, kwargs = mocked_callback_log.record.call_args_list[0]
+        self.assertEqual(args[0], self.test_channel_ids[0])
+        self.assertEqual(args[2]["timing"]["response"], 0.1)
+        self.assertEqual(kwargs["video_id"], "test_video")
+        self.assertEqual(
+            mocked_callback_log.record.call_args[1]["video_id"], "test_video_2"
+        )
+
+        # Logged with payload even if processing fails
+        mocked_callback_log.reset_mock()
+        mocked_callback.process_notification.side_effect = RuntimeError("failed")
+        with self.assertRaises(RuntimeError):
+            callback_process(
+                channel_id=self.test_channel_ids[0],
+                infos=infos,
+                enqueued_at=time.time(),
+            )
+        args, kwargs = mocked_callback_log.record.call_args
+        self.assertEqual(args[2]["data"], "<feed></feed>")
+        self.assertEqual(args[2]["error"], "RuntimeError: failed")
+        self.assertIsNone(kwargs["video_id"])
+
+    @mock.patch("tubee.tasks.callback_process.retry")
+    @mock.patch("tubee.tasks.callback_log")
+    @mock.patch("tubee.tasks.Callback")
+    @mock.patch("tubee.tasks.Channel")
+    def test_callback_process_deferred(
+        self, mocked_channel, mocked_callback, mocked_callback_log, mocked_retry
+    ):
+        mocked_callback.process_notification.side_effect = QuotaExceeded("action", 30)
+        mocked_retry.return_value = RuntimeError("Retry")
+        with self.assertRaisesRegex(RuntimeError, "Retry"):
+            callback_process(
+                channel_id=self.test_channel_ids[0],
+                infos={"data": "<feed></feed>"},
+                enqueued_at=time.time(),
+            )
+        self.assertEqual(mocked_retry.call_args[1]["countdown"], 30)
+        # Logged once by the retried task
+        mocked_callback_log.record.assert_not_called()
+
+    @mock.patch("tubee.tasks.apply_policies")
+    def test_retention_apply(self, mocked_apply_policies):
+        metrics = {"archived": 1, "deleted": 1, "seconds": 0.1}
+        mocked_apply_policies.return_value = {"callback": metrics}
+        self.assertEqual(retention_apply(), {"callback": metrics})
+        progress = mocked_apply_policies.call_args[1]["progress"]
+        self.assertTrue(callable(progress))
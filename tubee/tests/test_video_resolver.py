@@ -0,0 +1,65 @@
+"""Test Cases of helper.video_resolver"""
+import asyncio
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from tubee import create_app
+from tubee.helper.video_resolver import VideoResolver
+
+
+class VideoResolverTestCase(unittest.TestCase):
+    """Test Cases of Micro-batched Video Resolver"""
+
+    def setUp(self):
+        self.app = create_app("testing")
+        self.app.config["VIDEO_RESOLVER_WINDOW"] = 0.5
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.resolver = VideoResolver()
+
+    def tearDown(self):
+        self.app_context.pop()
+
+    @mock.patch("tubee.helper.video_resolver.VideoResolver.lookup")
+    def test_video_resolver_batch(self, mocked_lookup):
+        mocked_lookup.side_effect = lambda video_ids: {
+            video_id: {"title": video_id}
+            for video_id in video_ids
+            if video_id != "gone"
+        }
+        video_ids = ["a", "b", "a", "gone"]
+
+        def resolve(video_id):
+            with self.app.app_context():
+                return self.resolver.resolve(video_id)
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(resolve, video_ids))
+        self.assertEqual(
+            results, [{"title": "a"}, {"title": "b"}, {"title": "a"}, None]
+        )
+        mocked_lookup.assert_called_once_with(["a", "b", "gone"])
+
+        async def resolve_async():
+            return await self.resolver.resolve_async("c")
+
+        self.assertEqual(asyncio.run(resolve_async()), {"title": "c"})
+
+    @mock.patch("tubee.helper.video_resolver.VideoResolver.lookup")
+    def test_video_resolver_error(self, mocked_lookup):
+        self.app.config["VIDEO_RESOLVER_WINDOW"] = 0
+        mocked_lookup.side_effect = RuntimeError("quota")
+        with self.assertRaisesRegex(RuntimeError, "quota"):
+            self.resolver.resolve("a")
+
+    @mock.patch("tubee.helper.video_resolver.build_youtube_api")
+    def test_video_resolver_lookup(self, mocked_build_youtube_api):
+        mocked_list = mocked_build_youtube_api.return_value.videos.return_value.list
+        mocked_list.return_value.execute.return_value = {
+            "items": [{"id": "a", "snippet": {"title": "title of a"}}]
+        }
+        self.assertEqual(
+            VideoResolver.lookup(["a", "b"]), {"a": {"title": "title of a"}}
+        )
+        self.assertEqual(mocked_list.call_args[1]["id"], "a,b")
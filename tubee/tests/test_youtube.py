@@ -0,0 +1,140 @@
+"""Test Cases of helper.youtube"""
+import threading
+import time
+import unittest
+from datetime import datetime
+from unittest import mock
+
+from google_auth_httplib2 import AuthorizedHttp
+
+from tubee import create_app, db
+from tubee.helper import youtube
+from tubee.models import User
+
+TEST_CREDENTIALS = {
+    "token": "test_token",
+    "refresh_token": "test_refresh_token",
+    "token_uri": "https://oauth2.googleapis.com/token",
+    "client_id": "test_client_id",
+    "client_secret": "test_client_secret",
+}
+
+
+class YouTubePackageTestCase(unittest.TestCase):
+    """Test Cases of YouTube API Client Cache"""
+
+    def setUp(self):
+        self.app = create_app("testing")
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+    def tearDown(self):
+        youtube.discard_youtube_api(TEST_CREDENTIALS)
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_build_youtube_api(self):
+        service = youtube.build_youtube_api()
+        self.assertIs(service, youtube.build_youtube_api())
+        request = service.channels().list(part="snippet", id="test_channel")
+        self.assertIs(request.http, youtube._thread_http())
+
+    def test_build_youtube_api_with_credentials(self):
+        self.assertIsNone(youtube.cached_credentials(TEST_CREDENTIALS))
+        service = youtube.build_youtube_api(TEST_CREDENTIALS)
+        self.assertIs(service, youtube.build_youtube_api(dict(TEST_CREDENTIALS)))
+        request = service.playlistItems().insert(part="snippet", body={})
+        self.assertIsInstance(request.http, AuthorizedHttp)
+        self.assertEqual(
+            youtube.cached_credentials(TEST_CREDENTIALS).token, "test_token"
+        )
+        youtube.discard_youtube_api(TEST_CREDENTIALS)
+        self.assertIsNot(service, youtube.build_youtube_api(TEST_CREDENTIALS))
+
+    def test_user_sync_youtube_credentials(self):
+        user = User("test_user", "test_password")
+        user._youtube_credentials = TEST_CREDENTIALS
+        db.session.commit()
+        self.assertIsNotNone(user.youtube)
+        self.assertFalse(user._sync_youtube_credentials())
+
+        cached = youtube.cached_credentials(TEST_CREDENTIALS)
+        cached.token = "refreshed_token"
+        cached.expiry = datetime(2020, 1, 1, 1)
+        self.assertTrue(user._sync_youtube_credentials())
+        self.assertEqual(user._youtube_credentials["token"], "refreshed_token")
+        self.assertEqual(user._youtube_credentials["expiry"], "2020-01-01T01:00:00")
+        self.assertEqual(
+            user._youtube_credentials["refresh_token"], "test_refresh_token"
+        )
+
+    def test_user_sync_youtube_credentials_saved_newer(self):
+        user = User("test_user", "test_password")
+        user._youtube_credentials = dict(TEST_CREDENTIALS, expiry="2020-01-01T02:00:00")
+        db.session.commit()
+        self.assertIsNotNone(user.youtube)
+        self.assertEqual(
+            youtube.cached_credentials(TEST_CREDENTIALS).expiry,
+            datetime(2020, 1, 1, 2),
+        )
+
+        cached = youtube.cached_credentials(TEST_CREDENTIALS)
+        cached.token = "stale_token"
+        cached.expiry = datetime(2020, 1, 1, 1)
+        self.assertFalse(user._sync_youtube_credentials())
+        self.assertEqual(user._youtube_credentials["token"], "test_token")
+        self.assertIsNone(youtube.cached_credentials(TEST_CREDENTIALS))
+        self.assertIsNotNone(user.youtube)
+        self.assertEqual(
+            youtube.cached_credentials(TEST_CREDENTIALS).token, "test_token"
+        )
+
+    @mock.patch("tubee.helper.youtube.fetch_video_metadata")
+    def test_fetch_video_file_url(self, mocked_fetch_video_metadata):
+        expire = int(time.time()) + 6 * 60 * 60
+        url = f"https://test.googlevideo.com/videoplayback?expire={expire}&id=1"
+        mocked_fetch_video_metadata.return_value = {"url": url}
+        self.assertEqual(youtube.fetch_video_file_url("test_video"), url)
+        self.assertEqual(youtube.fetch_video_file_url("test_video"), url)
+        mocked_fetch_video_metadata.assert_called_once_with("test_video")
+        self.assertGreater(youtube._video_file_url_ttl(url), 5 * 60 * 60)
+
+        # Expired URL is not cached, failure is not cached
+        expired = "https://test.googlevideo.com/videoplayback?expire=1"
+        mocked_fetch_video_metadata.return_value = {"url": expired}
+        self.assertEqual(youtube.fetch_video_file_url("expired_video"), expired)
+        mocked_fetch_video_metadata.side_effect = Exception
+        self.assertIsNone(youtube.fetch_video_file_url("expired_video"))
+        self.assertNotIn("expired_video", youtube._video_file_urls)
+        youtube._video_file_urls.clear()
+
+    @mock.patch("tubee.helper.youtube.fetch_video_metadata")
+    def test_fetch_video_file_url_single_flight(self, mocked_fetch_video_metadata):
+        running = []
+        concurrency = []
+
+        def extract(video_id):
+            running.append(video_id)
+            concurrency.append(len(running))
+            time.sleep(0.05)
+            running.remove(video_id)
+            # Not cachable, every caller extracts in turn
+            return {"url": "https://test.googlevideo.com/videoplayback?expire=1"}
+
+        def fetch():
+            with self.app.app_context():
+                youtube.fetch_video_file_url("test_video")
+
+        mocked_fetch_video_metadata.side_effect = extract
+        threads = []
+        for _ in range(4):
+            threads.append(threading.Thread(target=fetch))
+            threads[-1].start()
+            time.sleep(0.03)
+        for thread in threads:
+            thread.join()
+        self.assertEqual(mocked_fetch_video_metadata.call_count, 4)
+        self.assertEqual(max(concurrency), 1)
+        self.assertEqual(youtube._video_file_url_locks, {})